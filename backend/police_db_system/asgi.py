@@ -3,6 +3,10 @@ ASGI config for police_db_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn police_db_system.asgi:application``)
+to use the watchlist alert stream at /api/watchlist/stream/: under WSGI the
+long-lived Server-Sent Events responses would each hold a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
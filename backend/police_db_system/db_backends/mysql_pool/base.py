@@ -0,0 +1,28 @@
+"""
+MySQL backend with a per-process connection pool.
+
+Use it as the ENGINE ``police_db_system.db_backends.mysql_pool`` and tune the
+pool with a ``POOL`` dict in the database settings (see pool.DEFAULT_POOL).
+Django still "closes" connections at the end of each request; here that
+returns them to the pool instead of tearing down the TCP connection.
+"""
+from django.db.backends.mysql import base
+
+from .pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        pool = get_pool(
+            self.alias,
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            self.settings_dict.get('POOL', {}),
+        )
+        try:
+            return pool.acquire()
+        except PoolTimeout as exc:
+            raise base.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is not None:
+            get_pool(self.alias, None, {}).release(self.connection, discard=self.errors_occurred)
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_POOL = {
+    'MIN_SIZE': 2,            # idle connections kept open even when quiet
+    'MAX_SIZE': 20,           # open connections per process, idle or checked out
+    'MAX_LIFETIME': 1800,     # seconds before a connection is replaced
+    'IDLE_TIMEOUT': 300,      # seconds an idle connection above MIN_SIZE is kept
+    'TIMEOUT': 10,            # seconds to wait for a free connection
+    'PING_AFTER': 1,          # ping connections idle for longer than this on checkout
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Checkout prefers the most recently returned connection (it is the one
+    least likely to have been dropped), pings it if it sat idle for longer
+    than PING_AFTER and replaces connections older than MAX_LIFETIME.
+    Callers block for up to TIMEOUT seconds when MAX_SIZE connections are
+    already checked out.
+    """
+    def __init__(self, factory, **config):
+        config = {**DEFAULT_POOL, **config}
+        self.factory = factory
+        self.min_size = config['MIN_SIZE']
+        self.max_size = config['MAX_SIZE']
+        self.max_lifetime = config['MAX_LIFETIME']
+        self.idle_timeout = config['IDLE_TIMEOUT']
+        self.timeout = config['TIMEOUT']
+        self.ping_after = config['PING_AFTER']
+
+        self._condition = threading.Condition()
+        self._idle = deque()  # (connection, created_at, returned_at)
+        self._created_at = {}  # id(connection) -> created_at, for checked out connections
+        self._size = 0
+        self._pid = os.getpid()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+        }
+
+    def acquire(self):
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No database connection available within {self.timeout}s '
+                            f'({self.max_size} in use)'
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    connection, created_at, returned_at = self._idle.pop()
+                else:
+                    connection = None
+                    self._size += 1
+
+            created = connection is None
+            if created:
+                try:
+                    connection = self.factory()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                created_at = time.monotonic()
+            else:
+                now = time.monotonic()
+                expired = now - created_at > self.max_lifetime
+                if expired or (now - returned_at > self.ping_after and not self._is_alive(connection)):
+                    self._discard(connection)
+                    continue
+
+            self._record_checkout(connection, created_at, started, waited, created)
+            return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection; broken or expired ones are closed instead"""
+        with self._condition:
+            created_at = self._created_at.pop(id(connection), None)
+        if self._pid != os.getpid() or created_at is None:
+            # Checked out before a fork, or not ours: just drop it
+            return
+        if not discard:
+            try:
+                # Never hand the next caller an open transaction
+                connection.rollback()
+            except Exception:
+                discard = True
+        if discard or time.monotonic() - created_at > self.max_lifetime:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._prune_idle()
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle))
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def _prune_idle(self):
+        """Close connections idle past IDLE_TIMEOUT while more than MIN_SIZE are open (lock held)"""
+        now = time.monotonic()
+        while self._size > self.min_size and self._idle and now - self._idle[0][2] > self.idle_timeout:
+            connection, _, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._close_quietly(connection)
+
+    def _discard(self, connection):
+        with self._condition:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._condition.notify()
+        self._close_quietly(connection)
+
+    def _record_checkout(self, connection, created_at, started, waited, created):
+        wait = time.monotonic() - started
+        with self._condition:
+            self._created_at[id(connection)] = created_at
+            if created:
+                self._stats['created'] += 1
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+            self._stats['wait_time_total'] += wait
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait)
+
+    def _check_fork(self):
+        # A forked worker must not share sockets with its parent
+        if self._pid != os.getpid():
+            with self._condition:
+                self._idle = deque()
+                self._created_at = {}
+                self._size = 0
+                self._pid = os.getpid()
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            connection.ping()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory, config):
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(factory, **config)
+    return pool
+
+
+def pool_stats():
+    """Stats for every pool in this process, keyed by database alias"""
+    return {alias: pool.stats() for alias, pool in _pools.items()}
@@ -0,0 +1,157 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to a healthy replica from
+``DATABASE_REPLICAS`` unless the current request is pinned to the primary:
+unsafe requests are, and so is every request from a client that wrote within
+the last ``REPLICA_STICKY_SECONDS`` (see ReplicaRoutingMiddleware), so
+officers always read their own edits.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+_pinned = ContextVar('db_pinned_to_primary', default=False)
+
+
+def pin_to_primary(pinned=True):
+    """Pin reads in the current context to the primary; returns a reset token"""
+    return _pinned.set(pinned)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+@contextmanager
+def use_primary():
+    token = pin_to_primary()
+    try:
+        yield
+    finally:
+        unpin(token)
+
+
+class ReplicaHealth:
+    """
+    Per-process view of replica health. A background thread checks every
+    replica each REPLICA_HEALTH_CHECK_INTERVAL seconds and requests only read
+    its last result, so a slow or unreachable replica never holds one up. A
+    replica that hasn't been checked yet, or whose last check is more than
+    three intervals old because the probe is stuck, counts as unhealthy.
+    """
+    def __init__(self):
+        self._status = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _interval(self):
+        return getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 5)
+
+    def is_healthy(self, alias):
+        self.ensure_probing()
+        checked_at, healthy = self._status.get(alias, (None, False))
+        if checked_at is None:
+            return False
+        return healthy and time.monotonic() - checked_at < 3 * self._interval()
+
+    def ensure_probing(self):
+        """Start the probe thread in this process; threads don't survive a fork"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._probe_forever, name='replica-health', daemon=True)
+            self._thread.start()
+
+    def probe(self):
+        """Check every replica once and record the results"""
+        for alias in getattr(settings, 'DATABASE_REPLICAS', []):
+            healthy = self.check(alias)
+            self._status[alias] = (time.monotonic(), healthy)
+
+    def _probe_forever(self):
+        while True:
+            try:
+                self.probe()
+            except Exception:
+                logger.exception('Checking replica health failed')
+            time.sleep(self._interval())
+
+    def check(self, alias):
+        """A replica is healthy if reachable and no more than REPLICA_MAX_LAG_SECONDS behind"""
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+        try:
+            lag = self.lag(alias)
+        except DatabaseError:
+            # Reconnect on the next check instead of reusing a broken connection
+            try:
+                connections[alias].close()
+            except DatabaseError:
+                pass
+            return False
+        return lag is not None and lag <= max_lag
+
+    def lag(self, alias):
+        """Seconds behind the primary, None if replication is broken"""
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor != 'mysql':
+                cursor.execute('SELECT 1')
+                return 0
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except DatabaseError:
+                # MySQL before 8.0.22
+                cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                # Not replicating from anything: a plain copy is never behind
+                return 0
+            status = dict(zip([column[0] for column in cursor.description], row))
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return None if lag is None else int(lag)
+
+
+health = ReplicaHealth()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or _pinned.get():
+            return PRIMARY
+        # Reads inside a write transaction must see its uncommitted rows
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+
+        healthy = [alias for alias in replicas if health.is_healthy(alias)]
+        return random.choice(healthy) if healthy else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data, so objects may relate across them
+        databases = {PRIMARY, *getattr(settings, 'DATABASE_REPLICAS', [])}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
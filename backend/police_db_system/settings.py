@@ -51,6 +51,19 @@ SESSION_COOKIE_SAMESITE = 'Lax'
 CSRF_COOKIE_SAMESITE = 'Lax'
 CSRF_COOKIE_HTTPONLY = False
 SESSION_COOKIE_HTTPONLY = True
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTH_IDENTITY_CACHE = 'default'  # must be shared by all workers; identities aren't cached on LocMem unless DEBUG
+AUTH_IDENTITY_CACHE_TIMEOUT = 3600  # seconds an officer identity stays cached
+
+# Login throttling (checked before password hashing)
+LOGIN_THROTTLE = {
+    'CACHE': 'default',    # must be shared by all workers; logins are refused on LocMem unless DEBUG
+    'WINDOW': 300,         # sliding window in seconds
+    'USERNAME_LIMIT': 5,   # attempts per username from one client IP per window
+    'IP_LIMIT': 30,        # attempts per client IP per window
+    'BACKOFF_BASE': 30,    # first lockout in seconds, doubled on each repeat
+    'BACKOFF_MAX': 3600,   # longest lockout in seconds
+}
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -85,6 +98,8 @@ INSTALLED_APPS = [
 # Middleware - MAKE SURE CORS IS AT THE TOP
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  
+    'police_profiling.middleware.CompressionMiddleware',
+    'police_profiling.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,6 +109,80 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Cache (use Redis or Memcached when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'police-db',
+    }
+}
+
+# Dashboard overview counters are shared by all officers for this many seconds
+DASHBOARD_CACHE_SECONDS = 5
+
+# Seconds an assembled dossier stays cached (entries are keyed by the record's state, so never stale)
+DOSSIER_CACHE_TIMEOUT = 3600
+
+# Descriptor search bitmaps pick up records changed by other processes at most this often (seconds)
+DESCRIPTOR_INDEX_MAX_AGE = 30
+
+# Phone numbers written without an international prefix are taken to be Namibian
+CONTACT_DEFAULT_COUNTRY_CODE = '264'
+
+# Release digests list releases due within this many days (queue releases.build_digests nightly)
+RELEASE_DIGEST_DAYS = 30
+
+# Mugshot matches may differ in at most this many of the 64 pHash bits
+MUGSHOT_MATCH_DISTANCE = 10
+# Image hashes younger than this (seconds) are re-read on the next search, in
+# case a transaction holding a lower id had not committed yet
+MUGSHOT_INDEX_SETTLE_SECONDS = 2
+
+# Full-text indexing of documents and evidence (install pypdf for better PDF extraction)
+FULLTEXT = {
+    'MAX_CHARS': 1_000_000,  # characters of text kept and indexed per file
+    'MAX_PDF_BYTES': 50 * 1024 * 1024,  # PDF bytes read without pypdf
+    'CHUNK_SIZE': 64 * 1024,  # bytes per read of plain-text files
+}
+
+# Modus-operandi similarity index: rebuilt from scratch this often (seconds) to
+# drop descriptions of deleted crimes; other edits are applied from the change feed
+MO_INDEX_REBUILD_SECONDS = 3600
+
+# Response compression (gzip always; brotli/zstd when the packages are installed)
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies are sent uncompressed
+COMPRESSION_CACHE_TIMEOUT = 300  # seconds compressed payloads stay cached
+
+# Audit trail: entries are written in batches by a background thread
+AUDIT_LOG = {
+    'ASYNC': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,  # seconds between background flushes
+    'RETRIES': 3,  # attempts per batch before it is spilled to disk
+    'SPILL_DIR': BASE_DIR / 'audit_spill',  # replayed once the database accepts writes again
+}
+
+# Background jobs, run by `manage.py run_workers` from the database queue
+JOB_QUEUE = {
+    'POLL_INTERVAL': 1.0,  # seconds an idle worker thread waits before polling again
+    'VISIBILITY_TIMEOUT': 300,  # seconds before a job whose worker vanished is retried
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 10,  # seconds before the first retry, doubling per attempt
+    'BACKOFF_MAX': 3600,
+}
+
+# Watchlist alerts over Server-Sent Events (/api/watchlist/stream/, ASGI only)
+WATCHLIST_STREAM = {
+    'POLL_INTERVAL': 1.0,  # seconds between change feed polls, per process
+    'QUEUE_SIZE': 100,  # alerts buffered per client before the oldest are dropped
+    'HEARTBEAT': 15,  # seconds between keep-alive comments
+    'SUBSCRIPTION_REFRESH': 60,  # seconds before an open stream reloads its rules
+}
+
+# Closed and convicted cases committed longer ago than this are moved to the
+# archive table by `manage.py archive_cases`
+CRIME_ARCHIVE_AFTER_DAYS = 730
+
 # URL Configuration
 ROOT_URLCONF = 'police_db_system.urls'
 
@@ -118,15 +207,37 @@ WSGI_APPLICATION = 'police_db_system.wsgi.application'
 # Database (MySQL)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'police_db_system.db_backends.mysql_pool',
         'NAME': 'police_db',
         'USER': 'root',
         'PASSWORD': 'admin123',
         'HOST': 'localhost',
         'PORT': '3306',
+        # Per-process connection pool; Django returns connections to it at
+        # the end of each request instead of reconnecting every time
+        'POOL': {
+            'MIN_SIZE': 2,
+            'MAX_SIZE': 20,
+            'MAX_LIFETIME': 1800,  # seconds; keep below MySQL's wait_timeout
+            'TIMEOUT': 10,  # seconds to wait for a free connection
+        },
     }
 }
 
+# Read replicas (optional): comma-separated hosts in DB_REPLICA_HOSTS that share
+# the default credentials. Safe reads go to a healthy replica; writes, and a
+# client's reads for REPLICA_STICKY_SECONDS after it writes, go to the primary.
+DATABASE_REPLICAS = []
+for index, host in enumerate(h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['police_db_system.db_routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 15
+REPLICA_MAX_LAG_SECONDS = 10  # replicas further behind are skipped
+REPLICA_HEALTH_CHECK_INTERVAL = 5  # seconds between background lag checks of the replicas
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
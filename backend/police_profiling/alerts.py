@@ -0,0 +1,235 @@
+"""
+Watchlist alerts pushed over Server-Sent Events.
+
+Each ASGI process runs one poller that reads new Crime inserts from the change
+feed and fans them out to the streams connected to that process. Streams are
+indexed by what they watch (criminal id, threat level, escape risk), so
+matching an alert touches only the interested clients. Every client has a
+bounded queue: when a slow client falls behind, its oldest alerts are dropped
+and it is told how many were lost, so one stalled dashboard can never hold
+memory or delay the others.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from police_db_system.db_routers import use_primary
+
+from . import changefeed
+from .models import Crime, WatchlistSubscription
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCHLIST_STREAM = {
+    'POLL_INTERVAL': 1.0,
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT': 15,
+    'SUBSCRIPTION_REFRESH': 60,
+}
+
+
+def config():
+    return {**DEFAULT_WATCHLIST_STREAM, **getattr(settings, 'WATCHLIST_STREAM', {})}
+
+
+class Client:
+    """One connected stream: its watch rules and a bounded, drop-oldest queue"""
+    def __init__(self, officer_id, queue_size):
+        self.officer_id = officer_id
+        self.criminal_ids = set()
+        self.threat_levels = set()
+        self.escape_risk = False
+        self.pending = deque()
+        self.capacity = queue_size
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def deliver(self, event):
+        if len(self.pending) >= self.capacity:
+            self.pending.popleft()
+            self.dropped += 1
+        self.pending.append(event)
+        self.ready.set()
+
+    def drain(self):
+        events, dropped = list(self.pending), self.dropped
+        self.pending.clear()
+        self.dropped = 0
+        self.ready.clear()
+        return events, dropped
+
+
+class Broker:
+    """Per-process registry of connected clients and the poller feeding them"""
+    def __init__(self):
+        self.clients = set()
+        self.by_criminal = defaultdict(set)
+        self.by_threat_level = defaultdict(set)
+        self.escape_risk = set()
+        self.last_seq = None
+        self._poller = None
+
+    async def connect(self, officer_id):
+        client = Client(officer_id, config()['QUEUE_SIZE'])
+        await self.refresh(client)
+        self.clients.add(client)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        return client
+
+    def disconnect(self, client):
+        self._unindex(client)
+        self.clients.discard(client)
+
+    async def refresh(self, client):
+        """Reload the client's subscriptions from the database"""
+        subscriptions = await sync_to_async(list)(
+            WatchlistSubscription.objects.filter(officer_id=client.officer_id)
+            .values('criminal_id', 'threat_levels', 'escape_risk')
+        )
+        self._unindex(client)
+        client.criminal_ids = {str(s['criminal_id']) for s in subscriptions if s['criminal_id']}
+        client.threat_levels = {level for s in subscriptions if not s['criminal_id'] for level in s['threat_levels']}
+        client.escape_risk = any(s['escape_risk'] for s in subscriptions if not s['criminal_id'])
+        for criminal_id in client.criminal_ids:
+            self.by_criminal[criminal_id].add(client)
+        for level in client.threat_levels:
+            self.by_threat_level[level].add(client)
+        if client.escape_risk:
+            self.escape_risk.add(client)
+
+    def _unindex(self, client):
+        for criminal_id in client.criminal_ids:
+            self.by_criminal[criminal_id].discard(client)
+            if not self.by_criminal[criminal_id]:
+                del self.by_criminal[criminal_id]
+        for level in client.threat_levels:
+            self.by_threat_level[level].discard(client)
+        self.escape_risk.discard(client)
+
+    def publish(self, event):
+        criminal = event['criminal']
+        recipients = set(self.by_criminal.get(criminal['id'], ()))
+        recipients |= self.by_threat_level.get(criminal['threat_level'], set())
+        if criminal['escape_risk']:
+            recipients |= self.escape_risk
+        for client in recipients:
+            client.deliver(event)
+        return len(recipients)
+
+    async def _poll(self):
+        interval = config()['POLL_INTERVAL']
+        try:
+            if self.last_seq is None:
+                # Only alert on crimes recorded after the first client connected
+                self.last_seq = await sync_to_async(changefeed.head_token)()
+            while self.clients:
+                try:
+                    events, self.last_seq = await sync_to_async(new_crime_events)(self.last_seq)
+                except Exception:
+                    logger.exception("Watchlist poller failed to read the change feed")
+                    events = []
+                for event in events:
+                    self.publish(event)
+                await asyncio.sleep(interval)
+        finally:
+            self._poller = None
+
+
+def new_crime_events(since):
+    """Alert payloads for crimes inserted after change feed token since; returns (events, new token)"""
+    with use_primary():
+        return _new_crime_events(since)
+
+
+def _new_crime_events(since):
+    entries = list(
+        changefeed.settled_entries(since)
+        .filter(model_name='crime')
+        .values_list('seq', 'object_id', 'action')[:1000]
+    )
+    if not entries:
+        return [], since
+
+    inserted = {object_id: seq for seq, object_id, action in entries if action == 'INSERT'}
+    crimes = (
+        Crime.objects.filter(pk__in=list(inserted))
+        .select_related('criminal')
+        .only(
+            'id', 'crime_type', 'date_committed', 'location', 'status',
+            'criminal__id', 'criminal__first_name', 'criminal__last_name',
+            'criminal__threat_level', 'criminal__escape_risk',
+        )
+    )
+    events = sorted((
+        {
+            'seq': inserted[str(crime.pk)],
+            'crime': {
+                'id': str(crime.pk),
+                'crime_type': crime.crime_type,
+                'date_committed': crime.date_committed.isoformat(),
+                'location': crime.location,
+                'status': crime.status,
+            },
+            'criminal': {
+                'id': str(crime.criminal.pk),
+                'name': str(crime.criminal),
+                'threat_level': crime.criminal.threat_level,
+                'escape_risk': crime.criminal.escape_risk,
+            },
+        }
+        for crime in crimes
+    ), key=lambda event: event['seq'])
+    return events, entries[-1][0]
+
+
+broker = Broker()
+
+
+def sse(event=None, data=None, event_id=None, comment=None):
+    """Format one Server-Sent Events message"""
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+async def stream(officer_id):
+    """Yield SSE messages for an officer's watchlist until the client disconnects"""
+    stream_config = config()
+    heartbeat = stream_config['HEARTBEAT']
+    # Registered on first iteration, so a client that never reads is never leaked
+    client = await broker.connect(officer_id)
+    refreshed_at = time.monotonic()
+    try:
+        yield sse(comment='connected') + f'retry: {int(heartbeat * 1000)}\n\n'.encode()
+        while True:
+            try:
+                await asyncio.wait_for(client.ready.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield sse(comment='ping')
+            else:
+                events, dropped = client.drain()
+                if dropped:
+                    # The client fell behind; it should re-fetch the lists it shows
+                    yield sse('overflow', {'dropped': dropped})
+                for event in events:
+                    yield sse('crime', event, event_id=event['seq'])
+
+            # Pick up subscriptions added or removed since the stream opened
+            if time.monotonic() - refreshed_at >= stream_config['SUBSCRIPTION_REFRESH']:
+                await broker.refresh(client)
+                refreshed_at = time.monotonic()
+    finally:
+        broker.disconnect(client)
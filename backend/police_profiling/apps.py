@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PoliceProfilingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'police_profiling'
+    
+    def ready(self):
+        from . import checks, signals, tasks  # noqa: F401
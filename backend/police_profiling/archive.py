@@ -0,0 +1,70 @@
+"""
+Hot/cold archival of finished cases.
+
+Closed and convicted crimes older than CRIME_ARCHIVE_AFTER_DAYS are moved from
+Crime into ArchivedCrime in small batches, each in its own short transaction,
+so archiving can run while the system is in use. Rows being edited are
+skipped (SKIP LOCKED) and picked up by the next run. Archiving is not a
+delete: the change feed and the audit log get one ARCHIVE entry per crime
+instead of a DELETE, and the daily rollups (which count both tables) are
+left as they are.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import audit, changefeed, rollups
+from .models import ArchivedCrime, Crime
+
+ARCHIVABLE_STATUSES = ('CLOSED', 'CONVICTED')
+
+# Fields copied verbatim from Crime to ArchivedCrime
+COPIED_FIELDS = [field.attname for field in Crime._meta.concrete_fields]
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'CRIME_ARCHIVE_AFTER_DAYS', 730)
+    return timezone.localdate() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return Crime.objects.filter(status__in=ARCHIVABLE_STATUSES, date_committed__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to batch_size archivable crimes; returns how many were moved"""
+    with transaction.atomic():
+        queryset = archivable(cutoff).order_by('date_committed', 'id')
+        if connections[router.db_for_write(Crime)].features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        rows = list(queryset.values(*COPIED_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        ids = [row['id'] for row in rows]
+        archived_at = timezone.now()
+        with changefeed.suspended(), rollups.suspended(), audit.suspended():
+            ArchivedCrime.objects.bulk_create([ArchivedCrime(archived_at=archived_at, **row) for row in rows])
+            Crime.objects.filter(pk__in=ids).delete()
+        changefeed.record_many(Crime, ids, 'ARCHIVE')
+        audit.record_archive(Crime, ids, archived_at)
+    return len(rows)
+
+
+def archive_cases(cutoff, batch_size=500, pause=0.0, progress=None):
+    """Archive everything older than cutoff, batch by batch; returns the total moved"""
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if progress:
+            progress(total)
+        if moved < batch_size:
+            return total
+        if pause:
+            # Give replication and other writers room between batches
+            time.sleep(pause)
+
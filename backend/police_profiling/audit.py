@@ -0,0 +1,385 @@
+"""
+Field-level audit trail for criminal records.
+
+Changes are captured as unsaved AuditLogEntry rows at request time and handed
+to a background writer once the surrounding transaction commits. The writer
+inserts them in batches with bulk_create, so auditing adds no INSERTs to the
+request path. Pending entries are flushed when the process exits.
+
+A batch the database rejects is retried, then spilled to a JSON-lines file
+under SPILL_DIR and written back once the database accepts writes again.
+Deletes are recorded by a post_delete receiver, so rows removed by a cascade
+or a queryset delete are audited along with the one the officer deleted.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import changefeed, contacts, rollups
+from .descriptors import parse_height, parse_weight
+from .models import AuditLogEntry, Crime, Criminal, location_area
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUDIT_LOG = {
+    'ASYNC': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+    'RETRIES': 3,
+    'SPILL_DIR': None,
+}
+
+# Bookkeeping fields that change on every save and carry no history
+IGNORED_FIELDS = {'updated_at'}
+
+# AuditLogEntry columns written to and read back from spill files
+SPILL_FIELDS = ('model_name', 'object_id', 'action', 'field_name', 'old_value', 'new_value', 'changed_by_id', 'changed_at')
+
+_acting_officer = ContextVar('audit_acting_officer', default=None)
+_suspended = ContextVar('audit_suspended', default=False)
+
+
+@contextmanager
+def acting_as(officer):
+    """Attribute deletes made in the block, cascades included, to officer"""
+    token = _acting_officer.set(officer)
+    try:
+        yield
+    finally:
+        _acting_officer.reset(token)
+
+
+@contextmanager
+def suspended():
+    """Don't record deletes made in the block (data moves that are audited by the caller)"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class AuditWriter:
+    """Background thread that drains queued entries into the database in batches"""
+    def __init__(self, batch_size, flush_interval, retries=3, spill_dir=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.spill_dir = spill_dir
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._spilled = True  # check for files left by an earlier process on start
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+
+    def enqueue(self, entries):
+        self._ensure_started()
+        for entry in entries:
+            self.queue.put(entry)
+
+    def stop(self, timeout=10):
+        """Stop the writer thread and write everything still queued"""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def flush(self):
+        """Write all queued entries from the calling thread"""
+        while True:
+            batch = self._take(self.batch_size, timeout=0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                batch = self._take(self.batch_size, timeout=self.flush_interval)
+                if batch and not self._write(batch):
+                    continue
+                if self._spilled:
+                    self.replay_spilled()
+        finally:
+            connection.close()
+
+    def _take(self, limit, timeout):
+        """Collect up to limit entries, waiting at most timeout seconds in total"""
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < limit:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Insert batch, retrying with backoff and spilling it to disk if the database keeps refusing it"""
+        for attempt in range(self.retries):
+            try:
+                AuditLogEntry.objects.bulk_create(batch)
+                return True
+            except DatabaseError:
+                logger.warning("Failed to write %d audit log entries (attempt %d)", len(batch), attempt + 1, exc_info=True)
+                if not connection.in_atomic_block:
+                    # A dropped connection is the usual cause; reconnect on the next attempt
+                    connection.close()
+                if attempt + 1 < self.retries:
+                    time.sleep(min(0.5 * 2 ** attempt, 10))
+        self._spill(batch)
+        return False
+
+    def _spill_path(self, pid=None):
+        return os.path.join(self.spill_dir, f'{pid or os.getpid()}.jsonl')
+
+    def _spill(self, batch):
+        if not self.spill_dir:
+            logger.error("Dropped %d audit log entries: no SPILL_DIR configured", len(batch))
+            return
+        with self._spill_lock:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(), 'a', encoding='utf-8') as spill:
+                for entry in batch:
+                    row = {name: getattr(entry, name) for name in SPILL_FIELDS}
+                    row['changed_at'] = entry.changed_at.isoformat()
+                    spill.write(json.dumps(row) + '\n')
+            self._spilled = True
+        logger.error("Spilled %d audit log entries to %s", len(batch), self._spill_path())
+
+    def _claim_spill_files(self):
+        """Rename this process's spill file, and those of processes that have exited, to claim them"""
+        me = os.getpid()
+        claimed = []
+        for path in glob.glob(os.path.join(self.spill_dir, '*.jsonl*')):
+            owner, _, claimant = os.path.basename(path).partition('.jsonl')
+            claimant = claimant.lstrip('.')
+            if not owner.isdigit() or (claimant and not claimant.isdigit()):
+                continue
+            holder = int(claimant or owner)
+            if holder != me and _pid_alive(holder):
+                continue
+            target = f'{self._spill_path(owner)}.{me}'
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue  # claimed by another process in the meantime
+            claimed.append(target)
+        return claimed
+
+    def replay_spilled(self):
+        """Write spilled entries back into the database; returns how many were written"""
+        if not self.spill_dir:
+            return 0
+        written = 0
+        with self._spill_lock:
+            self._spilled = False
+            for path in self._claim_spill_files():
+                with open(path, encoding='utf-8') as spill:
+                    rows = [json.loads(line) for line in spill if line.strip()]
+                entries = [
+                    AuditLogEntry(**{**row, 'changed_at': datetime.fromisoformat(row['changed_at'])})
+                    for row in rows
+                ]
+                try:
+                    with transaction.atomic():
+                        AuditLogEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+                except DatabaseError:
+                    # The claimed file stays put and is picked up by the next replay
+                    logger.warning("Failed to replay %d spilled audit log entries", len(entries), exc_info=True)
+                    self._spilled = True
+                    break
+                os.remove(path)
+                written += len(entries)
+        return written
+
+
+def _config():
+    return {**DEFAULT_AUDIT_LOG, **getattr(settings, 'AUDIT_LOG', {})}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = _config()
+                _writer = AuditWriter(
+                    config['BATCH_SIZE'], config['FLUSH_INTERVAL'],
+                    retries=config['RETRIES'], spill_dir=config['SPILL_DIR'],
+                )
+    return _writer
+
+
+def submit(entries):
+    """Queue entries for writing once the current transaction commits"""
+    if not entries:
+        return
+    if _config()['ASYNC']:
+        transaction.on_commit(lambda: get_writer().enqueue(entries))
+    else:
+        transaction.on_commit(lambda: AuditLogEntry.objects.bulk_create(entries))
+
+
+def _audited_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in IGNORED_FIELDS
+    ]
+
+
+def _render(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, dict, bool, int, float)):
+        return json.dumps(value)
+    return str(value)
+
+
+def snapshot(instance):
+    """Current field values of an instance, keyed by field name"""
+    values = {
+        field.name: _render(field.value_from_object(instance))
+        for field in _audited_fields(type(instance))
+    }
+    # Criminal's narrative fields are properties backed by CriminalNarrative
+    for name in getattr(type(instance), 'AUDITED_PROPERTIES', ()):
+        values[name] = _render(getattr(instance, name))
+    return values
+
+
+def _entry(model, pk, action, officer, field_name='', old_value=None, new_value=None, changed_at=None):
+    return AuditLogEntry(
+        model_name=model.__name__,
+        object_id=str(pk),
+        action=action,
+        field_name=field_name,
+        old_value=old_value,
+        new_value=new_value,
+        changed_by_id=officer.pk if officer else None,
+        changed_at=changed_at or timezone.now(),
+    )
+
+
+def record_create(instance, officer=None):
+    submit([_entry(type(instance), instance.pk, 'CREATE', officer)])
+
+
+def record_delete(instance, officer=None):
+    if _suspended.get():
+        return
+    if officer is None:
+        officer = _acting_officer.get()
+    submit([_entry(type(instance), instance.pk, 'DELETE', officer)])
+
+
+def record_archive(model, pks, changed_at=None):
+    """Record rows moved out of the active tables by archival"""
+    changed_at = changed_at or timezone.now()
+    submit([_entry(model, pk, 'ARCHIVE', None, changed_at=changed_at) for pk in pks])
+
+
+def record_update(instance, before, officer=None):
+    """Record one entry per field whose value differs from the snapshot taken before saving"""
+    after = snapshot(instance)
+    changed_at = timezone.now()
+    submit([
+        _entry(type(instance), instance.pk, 'UPDATE', officer, name, before.get(name), value, changed_at)
+        for name, value in after.items()
+        if before.get(name) != value
+    ])
+
+
+def audited_update(queryset, officer=None, **changes):
+    """QuerySet.update() that records the per-row field diffs it makes"""
+    model = queryset.model
+    if model is Criminal:
+        # Criminal.save() derives these; a bulk update has to do it here
+        for name, column, parse in (('height', 'height_cm', parse_height), ('weight', 'weight_kg', parse_weight)):
+            if name in changes and not hasattr(changes[name], 'resolve_expression'):
+                changes[column] = parse(changes[name])
+    if model is Crime and 'location' in changes and not hasattr(changes['location'], 'resolve_expression'):
+        changes['area'] = location_area(changes['location'])
+    # QuerySet.update() skips auto_now; dossier fingerprints rely on updated_at moving
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False) and field.name not in changes:
+            changes[field.name] = timezone.now()
+    fields = {field.name: field for field in _audited_fields(model)}
+    columns = [fields[name].attname for name in changes if name in fields]
+
+    with transaction.atomic():
+        before = list(queryset.select_for_update().values('pk', *columns))
+        updated_rows = model._default_manager.filter(pk__in=[row['pk'] for row in before])
+        # Bulk updates bypass the signals that keep the daily rollups current
+        track_rollups = model is Crime and bool(set(changes) & set(rollups.FIELDS))
+        if track_rollups:
+            rollup_counts = rollups.count_keys(updated_rows)
+        updated = queryset.update(**changes)
+        if track_rollups:
+            rollups.apply(rollups.diff(rollup_counts, rollups.count_keys(updated_rows)))
+        after = updated_rows.values('pk', *columns)
+        after = {row['pk']: row for row in after}
+
+        changed_at = timezone.now()
+        entries = []
+        for row in before:
+            new_row = after.get(row['pk'], {})
+            for name in changes:
+                if name not in fields:
+                    continue
+                attname = fields[name].attname
+                old, new = _render(row[attname]), _render(new_row.get(attname))
+                if old != new:
+                    entries.append(_entry(model, row['pk'], 'UPDATE', officer, name, old, new, changed_at))
+        submit(entries)
+        if model in changefeed.TRACKED_MODELS:
+            changefeed.record_many(model, [row['pk'] for row in before], 'UPDATE')
+        if model is Criminal and set(changes) & set(contacts.CONTACT_FIELDS):
+            contacts.sync_many([row['pk'] for row in before])
+    return updated
@@ -0,0 +1,335 @@
+"""
+Benchmark suites for ``python manage.py benchmark <suite>``.
+
+Each suite seeds whatever rows it needs inside a transaction that is rolled
+back afterwards, so running a benchmark never leaves data behind.
+"""
+import os
+import random
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import Criminal
+
+SUITES = {}
+
+
+def suite(name):
+    """Register a benchmark function under the given suite name"""
+    def register(func):
+        SUITES[name] = func
+        return func
+    return register
+
+
+def best_of(func, repeat):
+    """Run func repeat times and return (best seconds, last result)"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_criminals(count, batch_size=1000):
+    """Bulk insert synthetic criminals with a realistic mix of optional fields"""
+    threat_levels = [choice for choice, _ in Criminal.THREAT_LEVELS]
+    genders = [choice for choice, _ in Criminal.GENDER_CHOICES]
+    rows = [
+        Criminal(
+            id=uuid.uuid4(),
+            first_name=f'First{i}',
+            last_name=f'Last{i}',
+            alias=f'Alias{i}' if i % 3 == 0 else None,
+            date_of_birth=date(1960 + i % 45, 1 + i % 12, 1 + i % 28) if i % 7 else None,
+            gender=genders[i % len(genders)],
+            threat_level=threat_levels[i % len(threat_levels)],
+            is_incarcerated=bool(i % 2),
+            nationality='Namibian',
+        )
+        for i in range(count)
+    ]
+    Criminal.objects.bulk_create(rows, batch_size=batch_size)
+    return rows
+
+
+@suite('list_serialization')
+def list_serialization(options, write):
+    """CriminalListSerializer vs the values() fast path, rendered to bytes"""
+    from .renderers import FastJSONRenderer
+    from .serializers import CriminalListSerializer, criminal_list_rows, serialize_criminal_rows
+    from rest_framework.renderers import JSONRenderer
+    
+    with rolled_back():
+        seed_criminals(options['rows'])
+        queryset = Criminal.objects.all().order_by('-created_at')
+        
+        slow_time, slow = best_of(
+            lambda: JSONRenderer().render(CriminalListSerializer(queryset, many=True).data),
+            options['repeat'],
+        )
+        fast_time, fast = best_of(
+            lambda: FastJSONRenderer().render(serialize_criminal_rows(criminal_list_rows(queryset))),
+            options['repeat'],
+        )
+    
+    write(f'rows:              {options["rows"]}')
+    write(f'ModelSerializer:   {slow_time * 1000:.1f} ms')
+    write(f'fast path:         {fast_time * 1000:.1f} ms')
+    write(f'speedup:           {slow_time / fast_time:.1f}x')
+    write(f'byte-identical:    {slow == fast}')
+
+
+@suite('station_snapshot')
+def station_snapshot(options, write):
+    """Snapshot build time and file size for synthetic criminals (two crimes each)"""
+    from .snapshots import write_snapshot
+    
+    rows = options['rows']
+    rng = random.Random(42)
+    thumbnail = bytes(rng.getrandbits(8) for _ in range(2500))  # typical 96px JPEG size
+    
+    def criminals():
+        for i in range(rows):
+            yield (
+                str(uuid.uuid4()), f'First{i}', f'Last{i}', f'Alias{i}' if i % 3 == 0 else None,
+                (date(1960, 1, 1) + timedelta(days=i % 16000)).isoformat(), 'MFOU'[i % 4], 'Namibian',
+                f'{150 + i % 50}cm', f'{50 + i % 60}kg', 'BROWN', 'BLACK', 'AVERAGE', 'DARK',
+                f'FP{i:010d}', f'DNA{i:012d}', ('LOW', 'MEDIUM', 'HIGH', 'EXTREME')[i % 4],
+                i % 11 == 0, i % 7 == 0, i % 2, 'Windhoek Central' if i % 2 else None, None,
+                '2025-01-01T00:00:00+00:00', thumbnail if i % 2 else None,
+            )
+    
+    def crimes():
+        for i in range(rows * 2):
+            yield (
+                str(uuid.uuid4()), str(uuid.UUID(int=i // 2)), 'THEFT',
+                'Broke into a vehicle parked outside the station at night', '2024-03-01', 'Windhoek', 'OPEN',
+            )
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'snapshot.sqlite3')
+        start = time.perf_counter()
+        write_snapshot(path, criminals(), crimes(), token=0)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    
+    write(f'criminals:         {rows}')
+    write(f'crimes:            {rows * 2}')
+    write(f'build time:        {elapsed:.1f} s')
+    write(f'file size:         {size / 1024 / 1024:.1f} MB (thumbnails on half the rows)')
+
+
+@suite('connection_pool')
+def connection_pool(options, write):
+    """Per-request connect/query/close latency with and without the pool, under concurrency"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.db import connections
+    from django.db.backends.mysql.base import DatabaseWrapper as PlainWrapper
+
+    from police_db_system.db_backends.mysql_pool.base import DatabaseWrapper as PooledWrapper
+    from police_db_system.db_backends.mysql_pool.pool import pool_stats
+
+    if connections['default'].vendor != 'mysql':
+        write('connection_pool needs the MySQL database')
+        return
+
+    requests = options['rows']
+    threads = 16
+    settings_dict = connections['default'].settings_dict
+
+    def run(wrapper_class, alias):
+        local = threading.local()
+
+        def one_request(_):
+            # One wrapper per thread, like Django's per-thread connections
+            if not hasattr(local, 'wrapper'):
+                local.wrapper = wrapper_class(settings_dict, alias)
+            start = time.perf_counter()
+            with local.wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            local.wrapper.close()
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(threads) as executor:
+            return sorted(executor.map(one_request, range(requests)))
+
+    def percentile(samples, p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+    for label, wrapper_class, alias in (
+        ('no pool', PlainWrapper, 'benchmark_plain'),
+        ('pooled', PooledWrapper, 'benchmark_pooled'),
+    ):
+        _, samples = best_of(lambda: run(wrapper_class, alias), options['repeat'])
+        write(f'{label + ":":<19}p50 {percentile(samples, 0.5):.2f} ms, p95 {percentile(samples, 0.95):.2f} ms, '
+              f'p99 {percentile(samples, 0.99):.2f} ms')
+
+    stats = pool_stats()['benchmark_pooled']
+    write(f'requests:          {requests} on {threads} threads')
+    write(f'pool:              {stats["created"]} connections created, {stats["waits"]} waits, '
+          f'max wait {stats["wait_time_max"] * 1000:.1f} ms')
+
+
+@suite('narrative_split')
+def narrative_split(options, write):
+    """Full-row list and search loads with the narrative columns split out vs joined back in"""
+    from django.db.models import Q
+    
+    from .models import CriminalNarrative
+    
+    paragraph = 'Subject has a long record of burglary and assault in the Khomas region. ' * 25
+    with rolled_back():
+        rows = seed_criminals(options['rows'])
+        CriminalNarrative.objects.bulk_create([
+            CriminalNarrative(
+                criminal_id=criminal.pk,
+                criminal_history=paragraph,
+                modus_operandi=paragraph[:600],
+                medical_conditions=paragraph[:300],
+                psychological_profile=paragraph,
+            )
+            for criminal in rows
+        ], batch_size=1000)
+        criminals = Criminal.objects.order_by('-created_at')
+        search = criminals.filter(Q(first_name__icontains='1') | Q(alias__icontains='2'))
+        
+        # Joining the narrative back in reads what every SELECT * read before the split
+        timings = [
+            (label, best_of(lambda: len(list(queryset.all())), options['repeat'])[0])
+            for label, queryset in (
+                ('list, split', criminals),
+                ('list, wide', criminals.select_related('narrative')),
+                ('search, split', search),
+                ('search, wide', search.select_related('narrative')),
+            )
+        ]
+    
+    write(f'rows:              {options["rows"]} (~4 KB of narrative each)')
+    for label, seconds in timings:
+        write(f'{label + ":":<19}{seconds * 1000:.1f} ms')
+    write(f'list speedup:      {timings[1][1] / timings[0][1]:.1f}x')
+    write(f'search speedup:    {timings[3][1] / timings[2][1]:.1f}x')
+
+
+@suite('uuid_keys')
+def uuid_keys(options, write):
+    """Bulk insert rate and table/index size: random vs time-ordered keys, hex text vs binary"""
+    from django.db import connection
+    
+    from .ids import uuid7
+    
+    binary_type = {'mysql': 'binary(16)', 'postgresql': 'bytea'}.get(connection.vendor, 'blob')
+    variants = (
+        ('uuid4, char(32)', uuid.uuid4, 'char(32)', lambda key: key.hex),
+        ('uuid7, char(32)', uuid7, 'char(32)', lambda key: key.hex),
+        ('uuid4, binary(16)', uuid.uuid4, binary_type, lambda key: key.bytes),
+        ('uuid7, binary(16)', uuid7, binary_type, lambda key: key.bytes),
+    )
+    rows = options['rows']
+    quote = connection.ops.quote_name
+    
+    write(f'rows:              {rows} (primary key plus an indexed foreign-key-like column)')
+    for label, generate, column_type, encode in variants:
+        table = 'benchmark_uuid_keys'
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {quote(table)}')
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (id {column_type} NOT NULL PRIMARY KEY, '
+                f'parent_id {column_type} NOT NULL, name varchar(100) NOT NULL)'
+            )
+            cursor.execute(f'CREATE INDEX benchmark_uuid_keys_parent ON {quote(table)} (parent_id)')
+        try:
+            parents = [encode(generate()) for _ in range(max(rows // 10, 1))]
+            start = time.perf_counter()
+            for offset in range(0, rows, 1000):
+                batch = [
+                    (encode(generate()), parents[(offset + i) % len(parents)], f'Row {offset + i}')
+                    for i in range(min(1000, rows - offset))
+                ]
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.executemany(
+                        f'INSERT INTO {quote(table)} (id, parent_id, name) VALUES (%s, %s, %s)', batch
+                    )
+            elapsed = time.perf_counter() - start
+            size = _table_size(connection, table)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {quote(table)}')
+        write(f'{label + ":":<19}{rows / elapsed:,.0f} rows/s, {size}')
+
+
+def _table_size(connection, table):
+    """'data X MB, indexes Y MB' where the backend can tell, else 'size n/a'"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'ANALYZE TABLE {connection.ops.quote_name(table)}')
+            cursor.fetchall()
+            cursor.execute(
+                'SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+            )
+            data, indexes = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute('SELECT name, SUM(pgsize) FROM dbstat WHERE tbl_name = %s GROUP BY name', [table])
+            except Exception:
+                return 'size n/a (SQLite built without dbstat)'
+            sizes = dict(cursor.fetchall())
+            data = sizes.get(table, 0)
+            indexes = sum(sizes.values()) - data
+        else:
+            return 'size n/a'
+    return f'data {data / 1024 / 1024:.1f} MB, indexes {indexes / 1024 / 1024:.1f} MB'
+
+
+@suite('mo_similarity')
+def mo_similarity(options, write):
+    """Modus-operandi index build time and top-20 query latency (numpy when installed)"""
+    from .models import CriminalNarrative
+    from .similarity import SimilarityIndex, numpy
+    
+    vocabulary = (
+        'forced rear window door crowbar screwdriver night daylight taxi driver armed knife machete '
+        'pistol firearm shop till cash safe vehicle hijacking livestock cattle fence cut tools alarm '
+        'disabled accomplice lookout getaway motorbike pickpocket crowd market fraud cheque card '
+        'identity forged documents tourist lodge farm shebeen bottle store atm cellphone laptop'
+    ).split()
+    generator = random.Random(0)
+    queries = [' '.join(generator.sample(vocabulary, 6)) for _ in range(20)]
+    with rolled_back():
+        rows = seed_criminals(options['rows'])
+        CriminalNarrative.objects.bulk_create([
+            CriminalNarrative(
+                criminal_id=criminal.pk,
+                modus_operandi=' '.join(generator.choices(vocabulary, k=20)),
+                weapons_preference=generator.choice(vocabulary),
+            )
+            for criminal in rows
+        ], batch_size=1000)
+        index = SimilarityIndex()
+        build_seconds, _ = best_of(index.build, 1)
+        query_seconds = [best_of(lambda: index.search(query, 20), options['repeat'])[0] for query in queries]
+    
+    query_seconds.sort()
+    write(f'profiles:          {options["rows"]} ({"numpy" if numpy is not None else "pure Python"} scoring)')
+    write(f'build:             {build_seconds:.2f} s')
+    write(f'query median:      {query_seconds[len(query_seconds) // 2] * 1000:.1f} ms')
+    write(f'query worst:       {query_seconds[-1] * 1000:.1f} ms')
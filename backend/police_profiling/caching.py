@@ -0,0 +1,80 @@
+"""
+Short-lived caching with request coalescing.
+
+``get_or_compute`` makes sure a burst of identical requests (everyone opening
+the dashboard at shift change) triggers one computation instead of one per
+request: within a process, concurrent callers wait for the first one's
+result; across processes, a cache lock lets one worker compute while the
+others briefly wait for the value to appear.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def is_shared(backend):
+    """False for per-process caches, whose entries other workers can neither see nor delete"""
+    return not isinstance(backend, LocMemCache)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def get_or_compute(key, compute, timeout, lock_timeout=30, wait=5.0):
+    """Return the cached value for key, computing it at most once per burst"""
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait(lock_timeout)
+        if flight.error is not None:
+            raise flight.error
+        if flight.done.is_set():
+            return flight.value
+        return compute()
+
+    try:
+        flight.value = _compute_once(key, compute, timeout, lock_timeout, wait)
+        return flight.value
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        flight.done.set()
+        with _flights_lock:
+            _flights.pop(key, None)
+
+
+def _compute_once(key, compute, timeout, lock_timeout, wait):
+    """Compute under a cross-process cache lock, or wait for whoever holds it"""
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, lock_timeout):
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        # The holder is slow or died: compute anyway rather than fail
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
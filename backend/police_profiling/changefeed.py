@@ -0,0 +1,174 @@
+"""
+Change feed for delta sync.
+
+Every insert, update and delete of a tracked model appends a ChangeLogEntry.
+Once the entry has committed it is given the next sync sequence number (seq),
+so numbers follow commit order rather than insert order. Clients pass the
+last token they saw and receive only what changed after it, collapsed to the
+latest state per object, with tombstones for deletes. A crime moved to the archive gets an
+'archive' change carrying its archived row, so clients syncing from any token
+agree on where it went.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from police_db_system.db_routers import PRIMARY, use_primary
+
+from .models import ArchivedCrime, ChangeFeedHead, ChangeLogEntry, Crime, Criminal, CriminalEvidence, PoliceOfficer
+from .serializers import (
+    ArchivedCrimeSerializer, CrimeSerializer, CriminalEvidenceSerializer, PoliceOfficerSerializer,
+    criminal_list_rows, serialize_criminal_rows
+)
+
+TRACKED_MODELS = (Criminal, Crime, CriminalEvidence, PoliceOfficer)
+
+SEQUENCE_BATCH = 5000
+
+_suspended = ContextVar('changefeed_suspended', default=False)
+
+
+@contextmanager
+def suspended():
+    """Don't log writes made in the block (data moves that are not real changes)"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def record(instance, action):
+    if _suspended.get():
+        return
+    ChangeLogEntry.objects.create(
+        model_name=instance._meta.model_name,
+        object_id=str(instance.pk),
+        action=action,
+    )
+
+
+def record_many(model, pks, action):
+    """Log a bulk write (QuerySet.update() and friends bypass model signals)"""
+    if _suspended.get():
+        return
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model_name=model._meta.model_name, object_id=str(pk), action=action)
+        for pk in pks
+    ])
+
+
+def _load_criminals(ids, request):
+    rows = serialize_criminal_rows(criminal_list_rows(Criminal.objects.filter(pk__in=ids)))
+    return {row['id']: row for row in rows}
+
+
+def _load_with(serializer_class, queryset):
+    def load(ids, request):
+        objects = queryset.filter(pk__in=ids)
+        data = serializer_class(objects, many=True, context={'request': request}).data
+        return {str(item['id']): item for item in data}
+    return load
+
+
+LOADERS = {
+    'criminal': _load_criminals,
+    'crime': _load_with(CrimeSerializer, Crime.objects.select_related('criminal', 'arresting_officer__user')),
+    'criminalevidence': _load_with(
+        CriminalEvidenceSerializer, CriminalEvidence.objects.select_related('criminal', 'collected_by__user')
+    ),
+    'policeofficer': _load_with(PoliceOfficerSerializer, PoliceOfficer.objects.select_related('user')),
+}
+
+# Loaders for objects whose latest entry is an ARCHIVE
+ARCHIVE_LOADERS = {
+    'crime': _load_with(
+        ArchivedCrimeSerializer, ArchivedCrime.objects.select_related('criminal', 'arresting_officer__user')
+    ),
+}
+
+
+def sequence_committed():
+    """
+    Number the committed entries that have no seq yet; returns the newest seq.
+
+    Auto-increment ids are allocated when a transaction inserts, not when it
+    commits, so entry 11 can commit after entry 12; a client already past 12
+    would never see it. This only ever sees committed entries, and numbers
+    them under a lock on the ChangeFeedHead row, so an entry that commits
+    later always gets a higher number than every token handed out so far.
+    """
+    entries = ChangeLogEntry.objects.using(PRIMARY)
+    if not entries.filter(seq__isnull=True).exists():
+        return ChangeFeedHead.objects.using(PRIMARY).values_list('last_seq', flat=True).first() or 0
+    with transaction.atomic(using=PRIMARY):
+        head = ChangeFeedHead.objects.using(PRIMARY).select_for_update().filter(pk=1).first()
+        if head is None:
+            head = ChangeFeedHead.objects.using(PRIMARY).create(pk=1)
+        while True:
+            pending = list(entries.filter(seq__isnull=True).order_by('id').only('id')[:SEQUENCE_BATCH])
+            for entry in pending:
+                head.last_seq += 1
+                entry.seq = head.last_seq
+            entries.bulk_update(pending, ['seq'], batch_size=1000)
+            if len(pending) < SEQUENCE_BATCH:
+                break
+        head.save(using=PRIMARY, update_fields=['last_seq'])
+    return head.last_seq
+
+
+def settled_entries(token):
+    """Committed entries after token, in sequence order"""
+    sequence_committed()
+    # Always the primary: that is where the numbers were just assigned
+    return ChangeLogEntry.objects.using(PRIMARY).filter(seq__gt=token).order_by('seq')
+
+
+def head_token():
+    """Newest token that is safe to hand out"""
+    return sequence_committed()
+
+
+def changes_since(token, limit, request=None):
+    """Return (changes, next_token, has_more) for entries after token"""
+    # The rows must be read where the entries were: on a lagging replica a
+    # fresh upsert would look like a delete
+    with use_primary():
+        return _changes_since(token, limit, request)
+
+
+def _changes_since(token, limit, request):
+    entries = list(settled_entries(token)[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return [], token, False
+
+    # Collapse to the latest entry per object
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.model_name, entry.object_id), None)
+        latest[(entry.model_name, entry.object_id)] = entry
+
+    wanted = {}
+    for (model_name, object_id), entry in latest.items():
+        if entry.action != 'DELETE':
+            wanted.setdefault((model_name, entry.action == 'ARCHIVE'), []).append(object_id)
+    loaded = {}
+    for (model_name, archived), ids in wanted.items():
+        loaders = ARCHIVE_LOADERS if archived else LOADERS
+        if model_name in loaders:
+            loaded[(model_name, archived)] = loaders[model_name](ids, request)
+
+    changes = []
+    for (model_name, object_id), entry in latest.items():
+        archived = entry.action == 'ARCHIVE'
+        data = loaded.get((model_name, archived), {}).get(object_id)
+        if data is None:
+            # Deleted, or deleted again after this page's upsert
+            changes.append({'seq': entry.seq, 'type': model_name, 'id': object_id, 'op': 'delete'})
+        else:
+            op = 'archive' if archived else 'upsert'
+            changes.append({'seq': entry.seq, 'type': model_name, 'id': object_id, 'op': op, 'data': data})
+    return changes, entries[-1].seq, has_more
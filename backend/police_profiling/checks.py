@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.cache import caches
+
+from .caching import is_shared
+from .throttling import LoginRateLimiter
+
+
+@register(Tags.caches, deploy=True)
+def login_throttle_cache(app_configs, **kwargs):
+    """Login limits are only enforced across workers when their counters live in a shared cache"""
+    limiter = LoginRateLimiter()
+    if settings.DEBUG or limiter.is_shared():
+        return []
+    return [Error(
+        f"LOGIN_THROTTLE['CACHE'] ({limiter.cache_alias!r}) is a per-process LocMemCache; logins will be refused",
+        hint="Point it at a cache shared by all workers, such as Redis or Memcached.",
+        id='police_profiling.E001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def identity_cache(app_configs, **kwargs):
+    """Cached identities can only be invalidated everywhere when the cache is shared"""
+    alias = getattr(settings, 'AUTH_IDENTITY_CACHE', 'default')
+    if settings.DEBUG or is_shared(caches[alias]):
+        return []
+    return [Warning(
+        f"AUTH_IDENTITY_CACHE ({alias!r}) is a per-process LocMemCache; every auth check will query the database",
+        hint="Point it at a cache shared by all workers, such as Redis or Memcached.",
+        id='police_profiling.W001',
+    )]
@@ -0,0 +1,195 @@
+"""
+Reverse lookup of phone numbers and email addresses.
+
+Criminal.phone_numbers and email_addresses are free-form JSON lists, so
+"whose number is this?" would mean decoding every row. ContactIdentifier
+keeps one normalised row per entry (E.164 phones, lowercased emails) under a
+unique (kind, value, criminal) index; sync() keeps it in step with a
+criminal's lists and rebuild() regenerates it from scratch.
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ContactIdentifier, Criminal
+
+CONTACT_FIELDS = ('phone_numbers', 'email_addresses')
+
+
+def country_code():
+    return str(getattr(settings, 'CONTACT_DEFAULT_COUNTRY_CODE', '264'))
+
+
+def phone_digits(text):
+    """
+    International digits (no '+') for a phone number or prefix as written:
+    '+264 81 ...' and '00264 81 ...' are taken as they are, a national
+    '081 ...' gets the default country code
+    """
+    value = str(text).strip()
+    digits = re.sub(r'\D', '', value)
+    if not digits:
+        return ''
+    if value.startswith('+'):
+        return digits
+    if digits.startswith('00'):
+        return digits[2:]
+    if digits.startswith('0'):
+        return country_code() + digits[1:]
+    if len(digits) <= 9:
+        return country_code() + digits
+    return digits
+
+
+def normalize_phone(text):
+    """E.164 form of a phone number, or None if it can't be one"""
+    digits = phone_digits(text)
+    return f'+{digits}' if 8 <= len(digits) <= 15 else None
+
+
+def normalize_email(text):
+    value = str(text).strip().lower()
+    if value.startswith('mailto:'):
+        value = value[7:]
+    return value if re.fullmatch(r'[^@\s]+@[^@\s]+\.[^@\s]+', value) and len(value) <= 254 else None
+
+
+def normalize(text):
+    """(kind, value) for a phone number or email address, or None"""
+    if '@' in str(text):
+        value = normalize_email(text)
+        return ('EMAIL', value) if value else None
+    value = normalize_phone(text)
+    return ('PHONE', value) if value else None
+
+
+def identifiers(phone_numbers, email_addresses):
+    """{(kind, value): raw} for a criminal's contact lists"""
+    found = {}
+    for kind, entries, normalizer in (
+        ('PHONE', phone_numbers, normalize_phone),
+        ('EMAIL', email_addresses, normalize_email),
+    ):
+        if not isinstance(entries, list):
+            continue
+        for entry in entries:
+            if entry in (None, ''):
+                continue
+            value = normalizer(entry)
+            if value:
+                found.setdefault((kind, value), str(entry)[:254])
+    return found
+
+
+def sync(criminal):
+    """Make the criminal's ContactIdentifier rows match its contact lists"""
+    sync_many([criminal.pk], {criminal.pk: (criminal.phone_numbers, criminal.email_addresses)})
+
+
+def sync_many(criminal_ids, lists=None):
+    """
+    Resync several criminals at once (bulk updates bypass save signals).
+    lists maps pk -> (phone_numbers, email_addresses) when the caller has
+    them; otherwise they are read from the database.
+    """
+    if lists is None:
+        lists = {
+            pk: (phones, emails)
+            for pk, phones, emails in Criminal.objects.filter(pk__in=criminal_ids)
+            .values_list('pk', *CONTACT_FIELDS)
+        }
+    wanted = {pk: identifiers(*lists[pk]) for pk in criminal_ids if pk in lists}
+    existing = {}
+    for pk, criminal_id, kind, value in ContactIdentifier.objects.filter(
+        criminal_id__in=list(wanted)
+    ).values_list('pk', 'criminal_id', 'kind', 'value'):
+        existing[(criminal_id, kind, value)] = pk
+
+    stale = [pk for (criminal_id, kind, value), pk in existing.items()
+             if (kind, value) not in wanted.get(criminal_id, {})]
+    fresh = [
+        ContactIdentifier(criminal_id=criminal_id, kind=kind, value=value, raw=raw)
+        for criminal_id, found in wanted.items()
+        for (kind, value), raw in found.items()
+        if (criminal_id, kind, value) not in existing
+    ]
+    with transaction.atomic():
+        if stale:
+            ContactIdentifier.objects.filter(pk__in=stale).delete()
+        if fresh:
+            ContactIdentifier.objects.bulk_create(fresh, ignore_conflicts=True)
+    return len(fresh), len(stale)
+
+
+def rebuild(batch_size=1000, progress=None):
+    """Resync every criminal in primary-key order; returns (added, removed)"""
+    added = removed = 0
+    last_pk = None
+    while True:
+        rows = Criminal.objects.order_by('pk')
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        rows = list(rows.values_list('pk', *CONTACT_FIELDS)[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        batch_added, batch_removed = sync_many(
+            [pk for pk, _, _ in rows], {pk: (phones, emails) for pk, phones, emails in rows}
+        )
+        added += batch_added
+        removed += batch_removed
+        if progress:
+            progress(len(rows), added, removed)
+    # Rows of criminals that no longer exist are removed by the FK cascade
+    return added, removed
+
+
+def lookup(values, prefix=False, limit=50):
+    """
+    Owners of each phone number / email address in values:
+    {original: [{'value', 'raw', 'criminal_id', 'criminal_name'}]}. With
+    prefix, phones match on leading digits and emails on leading characters.
+    """
+    matches = {}
+    exact = {}
+    for original in values:
+        matches[original] = []
+        if prefix:
+            continue
+        key = normalize(original)
+        if key:
+            exact.setdefault(key, []).append(original)
+
+    columns = ('kind', 'value', 'raw', 'criminal_id', 'criminal__first_name', 'criminal__last_name')
+    if exact:
+        for kind in ('PHONE', 'EMAIL'):
+            wanted = [value for (key_kind, value) in exact if key_kind == kind]
+            for start in range(0, len(wanted), 500):
+                rows = ContactIdentifier.objects.filter(kind=kind, value__in=wanted[start:start + 500])
+                for row in rows.values(*columns):
+                    for original in exact[(kind, row['value'])]:
+                        matches[original].append(_match(row))
+
+    if prefix:
+        for original in values:
+            text = str(original).strip()
+            if '@' in text:
+                kind, start = 'EMAIL', text.lower()
+            else:
+                digits = phone_digits(text)
+                kind, start = 'PHONE', f'+{digits}' if digits else ''
+            if len(start) < 4:
+                continue
+            rows = ContactIdentifier.objects.filter(kind=kind, value__startswith=start).order_by('value')
+            matches[original] = [_match(row) for row in rows.values(*columns)[:limit]]
+    return matches
+
+
+def _match(row):
+    return {
+        'value': row['value'],
+        'raw': row['raw'],
+        'criminal_id': str(row['criminal_id']),
+        'criminal_name': f"{row['criminal__first_name']} {row['criminal__last_name']}",
+    }
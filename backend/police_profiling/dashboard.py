@@ -0,0 +1,79 @@
+"""Dashboard overview: every counter the landing page shows, in a fixed number of queries"""
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import ArchivedCrime, Crime, Criminal, PoliceOfficer
+from .serializers import criminal_list_rows, serialize_criminal_rows
+
+RESOLVED_STATUSES = ('CLOSED', 'CONVICTED')
+
+
+def overview(recent=5):
+    """Build the overview payload (six queries, independent of table sizes)"""
+    criminals = Criminal.objects.aggregate(
+        total=Count('id'),
+        incarcerated=Count('id', filter=Q(is_incarcerated=True)),
+        escape_risk=Count('id', filter=Q(escape_risk=True)),
+        **{
+            f'threat_{level.lower()}': Count('id', filter=Q(threat_level=level))
+            for level, _ in Criminal.THREAT_LEVELS
+        }
+    )
+
+    # Hot cases grouped by status and type; archived cases are all resolved
+    cases = {'total': 0, 'open': 0, 'resolved': 0}
+    open_by_type = {crime_type: 0 for crime_type, _ in Crime.CRIME_TYPES}
+    for row in Crime.objects.order_by().values('status', 'crime_type').annotate(count=Count('id')):
+        cases['total'] += row['count']
+        if row['status'] == 'OPEN':
+            cases['open'] += row['count']
+            open_by_type[row['crime_type']] = open_by_type.get(row['crime_type'], 0) + row['count']
+        elif row['status'] in RESOLVED_STATUSES:
+            cases['resolved'] += row['count']
+    archived = ArchivedCrime.objects.count()
+    cases['total'] += archived
+    cases['resolved'] += archived
+    cases['archived'] = archived
+    cases['clearance_rate'] = round(cases['resolved'] * 100 / cases['total']) if cases['total'] else 0
+
+    officers = PoliceOfficer.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        pending_activations=Count('id', filter=Q(is_active=False)),
+    )
+
+    recent_crimes = [
+        {
+            'id': str(row['id']),
+            'crime_type': row['crime_type'],
+            'status': row['status'],
+            'date_committed': row['date_committed'].isoformat(),
+            'location': row['location'],
+            'criminal_id': str(row['criminal_id']),
+            'criminal_name': f"{row['criminal__first_name']} {row['criminal__last_name']}",
+        }
+        for row in Crime.objects.order_by('-date_committed', '-id').values(
+            'id', 'crime_type', 'status', 'date_committed', 'location',
+            'criminal_id', 'criminal__first_name', 'criminal__last_name',
+        )[:recent]
+    ]
+    recent_criminals = serialize_criminal_rows(
+        criminal_list_rows(Criminal.objects.order_by('-created_at'))[:recent]
+    )
+
+    return {
+        'criminals': {
+            'total': criminals['total'],
+            'incarcerated': criminals['incarcerated'],
+            'at_large': criminals['total'] - criminals['incarcerated'],
+            'escape_risk': criminals['escape_risk'],
+            'by_threat_level': {
+                level: criminals[f'threat_{level.lower()}'] for level, _ in Criminal.THREAT_LEVELS
+            },
+        },
+        'cases': {**cases, 'open_by_type': open_by_type},
+        'officers': officers,
+        'recent_crimes': recent_crimes,
+        'recent_criminals': recent_criminals,
+        'generated_at': timezone.now().isoformat(),
+    }
@@ -0,0 +1,409 @@
+"""
+Physical descriptor search.
+
+Heights and weights are entered free-text in mixed units ("5'11", "1.80m",
+"176 lbs"); parse_height/parse_weight normalise them to centimetres and
+kilograms for the indexed height_cm/weight_kg columns.
+
+Categorical descriptors (gender, eye and hair colour, build, complexion) are
+answered from an in-memory bitmap index: one Python int per (field, value)
+with a bit set for every criminal that has it. A witness description becomes
+a few ORs and ANDs over those bitmaps; only the surviving rows go to the
+database for the numeric ranges and the distinguishing-marks keywords.
+
+height_cm/weight_kg are derived in Criminal.save() and by audit.audited_update;
+a raw QuerySet.update(height=...) bypasses both and leaves them stale until
+the row is saved again.
+"""
+import logging
+import re
+import threading
+import time
+import uuid
+from array import array
+
+from django.conf import settings
+from django.db import connections
+
+from police_db_system.db_routers import use_primary
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = ('gender', 'eye_color', 'hair_color', 'build', 'complexion')
+
+# Numeric buckets let height/weight ranges prune with the bitmaps too
+HEIGHT_BUCKET = 5  # cm
+WEIGHT_BUCKET = 5  # kg
+
+# Above this many candidates per requested row the bitmaps stop paying off
+CANDIDATES_PER_RESULT = 10
+
+CHANGE_BATCH = 5000
+
+# Each row is filed under one key per indexed field plus height and weight
+KEYS_PER_ROW = len(INDEXED_FIELDS) + 2
+
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+
+
+def _float(text):
+    return float(text.replace(',', '.'))
+
+
+def parse_height(text):
+    """Height in whole centimetres from free text, or None if it can't be read"""
+    if not text:
+        return None
+    value = str(text).strip().lower()
+
+    feet = re.match(r"^(\d+)\s*(?:'|ft|feet|foot)\s*(?:(\d+(?:\.\d+)?)\s*(?:\"|''|in|inches|inch)?)?$", value)
+    if feet:
+        inches = int(feet.group(1)) * 12 + float(feet.group(2) or 0)
+        return _plausible_height(inches * 2.54)
+
+    number = re.match(rf'^{_NUMBER}\s*(cm|m|in|inches|inch|")?$', value)
+    if not number:
+        return None
+    amount, unit = _float(number.group(1)), number.group(2)
+    if unit == 'm' or (unit is None and amount < 3):
+        return _plausible_height(amount * 100)
+    if unit in ('in', 'inches', 'inch', '"') or (unit is None and 48 <= amount < 100):
+        return _plausible_height(amount * 2.54)
+    return _plausible_height(amount)
+
+
+def parse_weight(text):
+    """Weight in whole kilograms from free text, or None if it can't be read"""
+    if not text:
+        return None
+    value = str(text).strip().lower()
+    number = re.match(rf'^{_NUMBER}\s*(kg|kgs|kilos?|kilograms?|lb|lbs|pounds?|st|stone)?$', value)
+    if not number:
+        return None
+    amount, unit = _float(number.group(1)), number.group(2) or 'kg'
+    if unit.startswith(('lb', 'pound')):
+        amount *= 0.45359237
+    elif unit in ('st', 'stone'):
+        amount *= 6.35029318
+    return round(amount) if 20 <= amount <= 400 else None
+
+
+def _plausible_height(cm):
+    return round(cm) if 50 <= cm <= 260 else None
+
+
+# Witness phrases that map onto choice values
+SYNONYMS = {
+    'gender': {'male': 'M', 'man': 'M', 'female': 'F', 'woman': 'F'},
+    'hair_color': {'shaved head': 'BALD', 'bald': 'BALD', 'blond': 'BLONDE', 'grey hair': 'GRAY', 'gray hair': 'GRAY'},
+    'build': {'thin': 'SLENDER', 'skinny': 'SLENDER', 'fat': 'HEAVYSET', 'overweight': 'HEAVYSET', 'well built': 'MUSCULAR'},
+    'eye_color': {'grey eyes': 'GRAY'},
+}
+
+FIELD_NOUNS = {
+    'hair': 'hair_color', 'eyes': 'eye_color', 'eyed': 'eye_color', 'build': 'build',
+    'complexion': 'complexion', 'skin': 'complexion', 'skinned': 'complexion',
+}
+
+WEIGHT_UNITS = ('kg', 'kgs', 'lb', 'lbs')
+
+STOP_WORDS = {'a', 'an', 'and', 'the', 'on', 'of', 'with', 'has', 'his', 'her', 'in', 'at', 'left', 'right'}
+
+
+def parse_description(text, choices):
+    """
+    Split a witness description into structured filters.
+
+    choices maps each indexed field to its (value, label) choices. Returns
+    {'filters': {field: {values}}, 'height': (min, max), 'weight': (min, max),
+    'keywords': [...]} with anything unrecognised kept as marks keywords.
+    """
+    filters, keywords = {}, []
+    height = weight = (None, None)
+    lookups = {}
+    for field, field_choices in choices.items():
+        for value, label in field_choices:
+            lookups[(field, value.lower())] = value
+            lookups[(field, label.lower())] = value
+        for phrase, value in SYNONYMS.get(field, {}).items():
+            lookups[(field, phrase)] = value
+
+    for phrase in re.split(r'[,;\n]+', text.lower()):
+        phrase = phrase.strip()
+        if not phrase:
+            continue
+
+        measured = re.match(rf'^{_NUMBER}\s*(?:-|–|to)\s*{_NUMBER}\s*([a-z"\']*)$', phrase)
+        if measured:
+            low, high, unit = measured.groups()
+            if unit in WEIGHT_UNITS:
+                weight = (parse_weight(f'{low}{unit}'), parse_weight(f'{high}{unit}'))
+            else:
+                height = (parse_height(f'{low}{unit}'), parse_height(f'{high}{unit}'))
+            continue
+        if re.search(r"\d", phrase):
+            unit = re.sub(r'[\d.,\s]+', '', phrase)
+            if unit in WEIGHT_UNITS and parse_weight(phrase):
+                kg = parse_weight(phrase)
+                weight = (kg - 5, kg + 5)
+                continue
+            if parse_height(phrase):
+                cm = parse_height(phrase)
+                height = (cm - 5, cm + 5)
+                continue
+
+        # "black hair", "brown eyes", "dark skin": the noun says which field
+        words = phrase.split()
+        field = FIELD_NOUNS.get(words[-1]) if len(words) > 1 else None
+        name = ' '.join(words[:-1]) if field else phrase
+        matched = {
+            (candidate, value) for (candidate, label), value in lookups.items()
+            if label in (name, phrase) and (field is None or candidate == field)
+        }
+        # A bare "brown" could be eyes or hair: leave ambiguous words as keywords
+        if len({candidate for candidate, _ in matched}) == 1:
+            for candidate, value in matched:
+                filters.setdefault(candidate, set()).add(value)
+            continue
+
+        keywords.extend(word for word in re.findall(r"[a-z0-9']+", phrase) if word not in STOP_WORDS)
+
+    return {'filters': filters, 'height': height, 'weight': weight, 'keywords': keywords}
+
+
+def _bucket(value, size):
+    return None if value is None else value // size
+
+
+def _mask(positions, size):
+    """
+    An int with the given bits set. The bits go into a byte buffer that is
+    converted once: ORing into a growing int would copy it every time.
+    """
+    buffer = bytearray(size)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class DescriptorIndex:
+    """
+    Bitmaps over the categorical descriptors and height/weight buckets.
+
+    Bit i stands for self.ids[i]. The index is built once per process, on a
+    background thread (searches use plain SQL until it is in); after that,
+    changes made in this process are applied in place straight away and
+    those made elsewhere are read from the change feed at most every
+    DESCRIPTOR_INDEX_MAX_AGE seconds, a batch of rows at a time. Results are
+    always re-checked in SQL, so a stale index can only miss a very recent
+    change, never return a wrong row.
+
+    self.row_keys remembers, per position, the number of each key the row
+    is filed under, so a change only rewrites the bitmaps it moves between.
+    Reads and updates run under the lock.
+    """
+    def __init__(self):
+        self.ids = []
+        self.positions = {}
+        self.bitmaps = {}
+        self.keys = [None]  # key number -> key; 0 means "not filed"
+        self.key_numbers = {}
+        self.row_keys = [array('I') for _ in range(KEYS_PER_ROW)]
+        self.token = None
+        self.checked_at = 0.0
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+
+    def _rows(self):
+        from .models import Criminal
+
+        return Criminal.objects.order_by().values_list('id', *INDEXED_FIELDS, 'height_cm', 'weight_kg')
+
+    def build(self):
+        from . import changefeed
+
+        # Changes after this token are applied on top; re-applying one the
+        # build already saw just sets the same bits again
+        fresh = DescriptorIndex()
+        with use_primary():
+            fresh.token = changefeed.head_token()
+            members = {}
+            for row in self._rows().iterator(chunk_size=5000):
+                position = len(fresh.ids)
+                fresh.ids.append(row[0])
+                fresh.positions[row[0]] = position
+                for slot, key in zip(fresh.row_keys, self._keys(row)):
+                    number = fresh._key_number(key)
+                    slot.append(number)
+                    members.setdefault(number, []).append(position)
+            size = len(fresh.ids) // 8 + 1
+            fresh.bitmaps = {fresh.keys[number]: _mask(positions, size) for number, positions in members.items()}
+            # Catch up on what was written during the build before taking the lock
+            fresh.apply_changes()
+
+        with self._lock:
+            self.ids, self.positions, self.bitmaps = fresh.ids, fresh.positions, fresh.bitmaps
+            self.keys, self.key_numbers, self.row_keys = fresh.keys, fresh.key_numbers, fresh.row_keys
+            self.token = fresh.token
+            self.checked_at = time.monotonic()
+
+    def _build(self):
+        """Background build; does nothing if one is already running"""
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Building the descriptor index failed')
+        finally:
+            self._build_lock.release()
+            connections.close_all()
+
+    def _key_number(self, key):
+        number = self.key_numbers.get(key)
+        if number is None:
+            number = self.key_numbers[key] = len(self.keys)
+            self.keys.append(key)
+        return number
+
+    def _keys(self, row):
+        _, *values, height_cm, weight_kg = row
+        keys = [(field, value) for field, value in zip(INDEXED_FIELDS, values)]
+        keys.append(('height', _bucket(height_cm, HEIGHT_BUCKET)))
+        keys.append(('weight', _bucket(weight_kg, WEIGHT_BUCKET)))
+        return keys
+
+    def ensure_fresh(self):
+        """Catch up with the change feed if due; False while the first build is still running"""
+        if self.token is None:
+            if not self._build_lock.locked():
+                threading.Thread(target=self._build, name='descriptor-index-build', daemon=True).start()
+            return False
+        max_age = getattr(settings, 'DESCRIPTOR_INDEX_MAX_AGE', 30)
+        if time.monotonic() - self.checked_at >= max_age:
+            with self._lock:
+                if time.monotonic() - self.checked_at >= max_age:
+                    self.apply_changes()
+        return True
+
+    def apply_changes(self):
+        """Apply the criminal saves and deletes the change feed has seen since the last token"""
+        from . import changefeed
+
+        with self._lock, use_primary():
+            while True:
+                entries = list(
+                    changefeed.settled_entries(self.token)
+                    .filter(model_name='criminal')
+                    .values_list('seq', 'object_id', 'action')[:CHANGE_BATCH]
+                )
+                if entries:
+                    changed = {uuid.UUID(object_id) for _, object_id, _ in entries}
+                    rows = list(self._rows().filter(pk__in=changed))
+                    # Anything no longer stored was deleted, whatever the last entry said
+                    self._apply(rows, changed - {row[0] for row in rows})
+                    self.token = entries[-1][0]
+                if len(entries) < CHANGE_BATCH:
+                    self.checked_at = time.monotonic()
+                    return
+
+    def update(self, criminal):
+        """Apply a saved criminal to the bitmaps in place"""
+        with self._lock:
+            if self.token is None:
+                return
+            self._apply([(criminal.pk, *(getattr(criminal, field) for field in INDEXED_FIELDS),
+                          criminal.height_cm, criminal.weight_kg)])
+
+    def remove(self, pk):
+        with self._lock:
+            if self.token is not None:
+                self._apply(removed=[pk])
+
+    def _apply(self, rows=(), removed=()):
+        """
+        Move rows to their current keys and clear the removed pks, under the
+        lock. Only the bitmaps a row leaves or joins are rewritten, each once
+        per batch.
+        """
+        cleared, joined = {}, {}
+        for pk in removed:
+            position = self.positions.get(pk)
+            if position is None:
+                continue
+            for slot in self.row_keys:
+                if slot[position]:
+                    cleared.setdefault(slot[position], []).append(position)
+                    slot[position] = 0
+        for row in rows:
+            position = self.positions.get(row[0])
+            if position is None:
+                position = self.positions[row[0]] = len(self.ids)
+                self.ids.append(row[0])
+                for slot in self.row_keys:
+                    slot.append(0)
+            for slot, key in zip(self.row_keys, self._keys(row)):
+                number = self._key_number(key)
+                if slot[position] != number:
+                    if slot[position]:
+                        cleared.setdefault(slot[position], []).append(position)
+                    joined.setdefault(number, []).append(position)
+                    slot[position] = number
+        size = len(self.ids) // 8 + 1
+        for number, positions in cleared.items():
+            key = self.keys[number]
+            self.bitmaps[key] &= ~_mask(positions, size)
+        for number, positions in joined.items():
+            key = self.keys[number]
+            self.bitmaps[key] = self.bitmaps.get(key, 0) | _mask(positions, size)
+
+    def match(self, filters, height=(None, None), weight=(None, None), max_candidates=None):
+        """
+        Candidate ids for {field: {values}} plus optional numeric ranges:
+        values within a field are ORed, fields are ANDed. Returns None when
+        nothing narrows the search (every row is a candidate), when more
+        than max_candidates rows survive, where the plain indexed query that
+        stops at the first page is cheaper than shipping the ids to SQL, and
+        while the index is still being built.
+        """
+        if not self.ensure_fresh():
+            return None
+        with self._lock:
+            return self._match(filters, height, weight, max_candidates)
+
+    def _match(self, filters, height, weight, max_candidates):
+        result = None
+        for field, values in filters.items():
+            bitmap = 0
+            for value in values:
+                bitmap |= self.bitmaps.get((field, value), 0)
+            result = bitmap if result is None else result & bitmap
+        for name, (low, high), size in (('height', height, HEIGHT_BUCKET), ('weight', weight, WEIGHT_BUCKET)):
+            if low is None and high is None:
+                continue
+            first = _bucket(low, size) if low is not None else min(
+                (key[1] for key in self.bitmaps if key[0] == name and key[1] is not None), default=0)
+            last = _bucket(high, size) if high is not None else max(
+                (key[1] for key in self.bitmaps if key[0] == name and key[1] is not None), default=0)
+            bitmap = 0
+            for bucket in range(first, last + 1):
+                bitmap |= self.bitmaps.get((name, bucket), 0)
+            result = bitmap if result is None else result & bitmap
+        if result is None or (max_candidates is not None and result.bit_count() > max_candidates):
+            return None
+        return self._ids(result)
+
+    def _ids(self, bitmap):
+        ids = []
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            if byte:
+                base = byte_index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        ids.append(self.ids[base + bit])
+        return ids
+
+
+index = DescriptorIndex()
+
@@ -0,0 +1,287 @@
+"""
+Criminal dossier: profile, case timeline, evidence, documents and the
+officers involved, in one payload.
+
+load() fetches everything with a single select_related/prefetch_related
+plan (five queries however long the record is). version() hashes the
+assembled payload, so the rendered PDF can be cached under it and served
+as-is until something in the record changes.
+
+get() caches the payload and its version under fingerprint(): the row counts
+and latest updated_at of every table the dossier reads, taken in one query.
+A cached dossier therefore costs one query, and any save, insert or delete
+in the record moves the fingerprint on to a fresh entry.
+"""
+import hashlib
+import io
+import json
+import textwrap
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import DateTimeField, F, Func, IntegerField, OuterRef, Prefetch, Subquery
+from django.utils import timezone
+
+from .caching import get_or_compute
+from .models import ArchivedCrime, Crime, Criminal, CriminalDocument, CriminalEvidence, PoliceOfficer
+from .serializers import CriminalSerializer
+
+PDF_DIRECTORY = 'dossiers'
+
+# A4 at 100 dpi
+PAGE_SIZE = (827, 1169)
+MARGIN = 60
+LINE_HEIGHT = 20
+WRAP_COLUMNS = 95
+
+
+def load(criminal_id):
+    """The criminal with every relation the dossier shows, or None"""
+    return (
+        Criminal.objects
+        .select_related('narrative', 'created_by__user', 'last_updated_by__user')
+        .prefetch_related(
+            Prefetch('crimes', Crime.objects.select_related('arresting_officer__user').order_by('date_committed', 'id')),
+            Prefetch('archived_crimes', ArchivedCrime.objects.select_related('arresting_officer__user')),
+            Prefetch('evidence', CriminalEvidence.objects.select_related('collected_by__user').order_by('date_collected')),
+            Prefetch('documents', CriminalDocument.objects.select_related('uploaded_by__user').order_by('date_uploaded')),
+        )
+        .filter(pk=criminal_id)
+        .first()
+    )
+
+
+def _count(queryset):
+    return Subquery(queryset.order_by().annotate(n=Func(F('pk'), function='COUNT', output_field=IntegerField())).values('n'))
+
+
+def _latest(queryset):
+    return Subquery(queryset.order_by().annotate(
+        latest=Func(F('updated_at'), function='MAX', output_field=DateTimeField())
+    ).values('latest'))
+
+
+def fingerprint(criminal_id):
+    """Row counts and latest updated_at of everything load() reads, in one query; None if missing"""
+    columns = {}
+    for name, model in (
+        ('crimes', Crime), ('archived_crimes', ArchivedCrime),
+        ('evidence', CriminalEvidence), ('documents', CriminalDocument),
+    ):
+        rows = model.objects.filter(criminal=OuterRef('pk'))
+        columns[f'{name}_count'] = _count(rows)
+        columns[f'{name}_updated'] = _latest(rows)
+    # Any officer may appear in the dossier: their names, ranks and stations
+    columns['officers_count'] = _count(PoliceOfficer.objects.all())
+    columns['officers_updated'] = _latest(PoliceOfficer.objects.all())
+    row = (
+        Criminal.objects.filter(pk=criminal_id)
+        .annotate(**columns)
+        .values_list('updated_at', 'narrative__updated_at', *columns)
+        .first()
+    )
+    if row is None:
+        return None
+    return hashlib.sha256(repr(row).encode()).hexdigest()[:16]
+
+
+def get(criminal_id):
+    """(payload, version) of a criminal's dossier, or None; cached until the record changes"""
+    key = fingerprint(criminal_id)
+    if key is None:
+        return None
+
+    def compute():
+        criminal = load(criminal_id)
+        if criminal is None:
+            return None
+        payload = build(criminal)
+        return payload, version(payload)
+
+    return get_or_compute(
+        f'dossier:{criminal_id}:{key}',
+        compute,
+        timeout=getattr(settings, 'DOSSIER_CACHE_TIMEOUT', 3600),
+    )
+
+
+def _officer(officer, role, officers):
+    if officer is not None:
+        entry = officers.setdefault(officer.pk, {
+            'id': officer.pk,
+            'badge_number': officer.badge_number,
+            'name': officer.user.get_full_name() or officer.user.username,
+            'rank': officer.rank,
+            'station': officer.station,
+            'roles': [],
+        })
+        if role not in entry['roles']:
+            entry['roles'].append(role)
+        return entry['name']
+    return None
+
+
+def build(criminal):
+    """Dossier payload for a criminal from load()"""
+    officers = {}
+    _officer(criminal.created_by, 'registered', officers)
+    _officer(criminal.last_updated_by, 'updated', officers)
+
+    timeline = []
+    for crime, archived in [(crime, False) for crime in criminal.crimes.all()] + \
+            [(crime, True) for crime in criminal.archived_crimes.all()]:
+        timeline.append({
+            'id': str(crime.pk),
+            'crime_type': crime.crime_type,
+            'description': crime.description,
+            'date_committed': crime.date_committed.isoformat(),
+            'location': crime.location,
+            'status': crime.status,
+            'archived': archived,
+            'arresting_officer': _officer(crime.arresting_officer, 'arresting officer', officers),
+        })
+    timeline.sort(key=lambda entry: (entry['date_committed'], entry['id']))
+
+    for item in criminal.evidence.all():
+        _officer(item.collected_by, 'collected evidence', officers)
+    for document in criminal.documents.all():
+        _officer(document.uploaded_by, 'uploaded documents', officers)
+
+    # No request in the context: relative file URLs keep the version host-independent
+    profile = CriminalSerializer(criminal).data
+    evidence, documents = profile.pop('evidence'), profile.pop('documents')
+
+    return {
+        'profile': profile,
+        'timeline': timeline,
+        'evidence': evidence,
+        'documents': documents,
+        'officers': sorted(officers.values(), key=lambda officer: officer['badge_number']),
+    }
+
+
+def version(dossier):
+    """Content hash of a dossier; changes whenever anything shown in it changes"""
+    canonical = json.dumps(dossier, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def pdf_name(criminal_id, dossier_version):
+    return f'{PDF_DIRECTORY}/{criminal_id}/{dossier_version}.pdf'
+
+
+def render_pdf(criminal, dossier):
+    """The dossier as PDF bytes, drawn page by page with Pillow"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.load_default(size=14)
+        heading = ImageFont.load_default(size=20)
+    except TypeError:  # Pillow without FreeType: fixed-size bitmap font
+        font = heading = ImageFont.load_default()
+
+    lines = _pdf_lines(dossier)
+    per_page = (PAGE_SIZE[1] - 2 * MARGIN) // LINE_HEIGHT
+    portrait = _portrait(criminal)
+    # Lines beside the portrait on page one are cut short so they don't run under it
+    beside_portrait = portrait.height // LINE_HEIGHT + 1 if portrait is not None else 0
+
+    pages = []
+    for start in range(0, max(len(lines), 1), per_page):
+        page = Image.new('RGB', PAGE_SIZE, 'white')
+        draw = ImageDraw.Draw(page)
+        if not pages and portrait is not None:
+            page.paste(portrait, (PAGE_SIZE[0] - MARGIN - portrait.width, MARGIN))
+        for row, (text, style) in enumerate(lines[start:start + per_page]):
+            if not pages and row < beside_portrait:
+                text = text[:WRAP_COLUMNS - 30]
+            draw.text((MARGIN, MARGIN + row * LINE_HEIGHT), text, fill='black',
+                      font=heading if style == 'heading' else font)
+        draw.text((MARGIN, PAGE_SIZE[1] - MARGIN // 2), f'Page {len(pages) + 1}', fill='gray', font=font)
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:], resolution=100.0)
+    return buffer.getvalue()
+
+
+def _portrait(criminal):
+    if not criminal.profile_picture:
+        return None
+    from PIL import Image
+
+    try:
+        with criminal.profile_picture.open('rb') as source, Image.open(source) as image:
+            portrait = image.convert('RGB')
+            portrait.thumbnail((200, 250))
+            return portrait
+    except (OSError, ValueError):
+        return None
+
+
+def _pdf_lines(dossier):
+    """[(text, style)] for the PDF, wrapped to the page width"""
+    lines = []
+
+    def add(text='', style='body'):
+        for line in textwrap.wrap(str(text), WRAP_COLUMNS) or ['']:
+            lines.append((line, style))
+
+    profile = dossier['profile']
+    add(f"Dossier: {profile['full_name']}", 'heading')
+    add(f"Generated {timezone.now():%Y-%m-%d %H:%M}")
+    add()
+    for label, key in (
+        ('Alias', 'alias'), ('Date of birth', 'date_of_birth'), ('Gender', 'gender'),
+        ('Nationality', 'nationality'), ('Threat level', 'threat_level'),
+        ('Status', 'incarceration_status'), ('Facility', 'current_facility'),
+        ('Expected release', 'expected_release_date'), ('Height', 'height'), ('Weight', 'weight'),
+        ('Distinguishing marks', 'distinguishing_marks'), ('Known associates', 'known_associates'),
+        ('Gang affiliations', 'gang_affiliations'), ('Criminal history', 'criminal_history'),
+        ('Modus operandi', 'modus_operandi'), ('Weapons preference', 'weapons_preference'),
+    ):
+        if profile.get(key) not in (None, ''):
+            add(f'{label}: {profile[key]}')
+
+    add()
+    add(f"Case timeline ({len(dossier['timeline'])})", 'heading')
+    for crime in dossier['timeline']:
+        archived = ', archived' if crime['archived'] else ''
+        add(f"{crime['date_committed']}  {crime['crime_type']} at {crime['location']} ({crime['status']}{archived})")
+        if crime['arresting_officer']:
+            add(f"    Arresting officer: {crime['arresting_officer']}")
+        if crime['description']:
+            add(f"    {crime['description']}")
+
+    add()
+    add(f"Evidence ({len(dossier['evidence'])})", 'heading')
+    for item in dossier['evidence']:
+        add(f"{item['date_collected']}  {item['evidence_type']}: {item.get('description') or item['file']}")
+        if item.get('sha256'):
+            add(f"    SHA-256 {item['sha256']}")
+
+    add()
+    add(f"Documents ({len(dossier['documents'])})", 'heading')
+    for document in dossier['documents']:
+        add(f"{str(document['date_uploaded'])[:10]}  {document['document_type']}: {document['title']}")
+
+    add()
+    add(f"Officers involved ({len(dossier['officers'])})", 'heading')
+    for officer in dossier['officers']:
+        add(f"{officer['badge_number']}  {officer['rank'].title()} {officer['name']}, {officer['station']} "
+            f"({', '.join(officer['roles'])})")
+    return lines
+
+
+def store_pdf(criminal_id, dossier_version, data):
+    """Save a rendered PDF under its version and drop older versions"""
+    name = pdf_name(criminal_id, dossier_version)
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    directory = f'{PDF_DIRECTORY}/{criminal_id}'
+    _, files = default_storage.listdir(directory)
+    for stale in files:
+        if stale != f'{dossier_version}.pdf':
+            default_storage.delete(f'{directory}/{stale}')
+    return name
@@ -0,0 +1,305 @@
+"""
+Full-text search over uploaded documents and evidence files.
+
+The documents.extract_text job pulls the text out of plain-text, PDF and DOCX
+files with bounded reads (at most FULLTEXT['MAX_CHARS'] characters are kept,
+however large the file), stores it in DocumentText and replaces that file's
+TextPosting rows: one (term, text, frequency) row per distinct term. A search
+reads only the postings of its query terms and ranks the texts with BM25.
+"""
+import codecs
+import heapq
+import math
+import re
+import zipfile
+import zlib
+from collections import Counter
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import DocumentText, TextPosting
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # the built-in reader handles simple text layers
+    PdfReader = None
+
+DEFAULT_FULLTEXT = {
+    'MAX_CHARS': 1_000_000,
+    'MAX_PDF_BYTES': 50 * 1024 * 1024,
+    'CHUNK_SIZE': 64 * 1024,
+}
+
+TEXT_EXTENSIONS = ('.txt', '.text', '.csv', '.md', '.log')
+PDF_EXTENSIONS = ('.pdf',)
+DOCX_EXTENSIONS = ('.docx',)
+
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for from has have he her his in is it its of on or '
+    'she that the their they this to was were will with'.split()
+)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+WORD = re.compile(r'\w+')
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def config():
+    return {**DEFAULT_FULLTEXT, **getattr(settings, 'FULLTEXT', {})}
+
+
+def is_extractable(name):
+    return str(name).lower().endswith(TEXT_EXTENSIONS + PDF_EXTENSIONS + DOCX_EXTENSIONS)
+
+
+def tokenize(text):
+    return [
+        word for word in WORD.findall(text.lower())
+        if 1 < len(word) <= 64 and word not in STOP_WORDS
+    ]
+
+
+class _Collector:
+    """Accumulates extracted text up to a character budget"""
+    def __init__(self, limit):
+        self.parts = []
+        self.remaining = limit
+        self.truncated = False
+
+    @property
+    def full(self):
+        return self.remaining <= 0
+
+    def add(self, text):
+        if self.full:
+            self.truncated = self.truncated or bool(text)
+            return
+        if len(text) > self.remaining:
+            text = text[:self.remaining]
+            self.truncated = True
+        self.parts.append(text)
+        self.remaining -= len(text)
+
+    def result(self):
+        return ''.join(self.parts), self.truncated
+
+
+def extract(file, name):
+    """(text, truncated) from an open binary file, chosen by the name's extension"""
+    options = config()
+    collector = _Collector(options['MAX_CHARS'])
+    lowered = str(name).lower()
+    if lowered.endswith(DOCX_EXTENSIONS):
+        _extract_docx(file, collector)
+    elif lowered.endswith(PDF_EXTENSIONS):
+        _extract_pdf(file, collector, options['MAX_PDF_BYTES'])
+    else:
+        _extract_plain(file, collector, options['CHUNK_SIZE'])
+    return collector.result()
+
+
+def _extract_plain(file, collector, chunk_size):
+    head = file.read(chunk_size)
+    encoding = 'utf-16' if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) else 'utf-8-sig'
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    chunk = head
+    while chunk and not collector.full:
+        collector.add(decoder.decode(chunk))
+        chunk = file.read(chunk_size)
+    if chunk:
+        collector.truncated = True
+    else:
+        collector.add(decoder.decode(b'', final=True))
+
+
+def _extract_docx(file, collector):
+    """Paragraph text of word/document.xml, parsed incrementally"""
+    with zipfile.ZipFile(file) as archive, archive.open('word/document.xml') as document:
+        paragraph = []
+        for event, element in ElementTree.iterparse(document, events=('end',)):
+            tag = element.tag
+            if tag == f'{WORD_NAMESPACE}t':
+                paragraph.append(element.text or '')
+            elif tag == f'{WORD_NAMESPACE}tab':
+                paragraph.append('\t')
+            elif tag == f'{WORD_NAMESPACE}p':
+                collector.add(''.join(paragraph) + '\n')
+                paragraph = []
+                element.clear()
+                if collector.full:
+                    return
+            elif tag == f'{WORD_NAMESPACE}body':
+                element.clear()
+
+
+def _extract_pdf(file, collector, max_bytes):
+    if PdfReader is not None:
+        for page in PdfReader(file).pages:
+            collector.add((page.extract_text() or '') + '\n')
+            if collector.full:
+                return
+        return
+
+    data = file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        collector.truncated = True
+        data = data[:max_bytes]
+    for match in _PDF_STREAM.finditer(data):
+        content = match.group(1)
+        try:
+            content = zlib.decompress(content)
+        except zlib.error:
+            pass
+        text = _pdf_content_text(content)
+        if text:
+            collector.add(text + '\n')
+            if collector.full:
+                return
+
+
+_PDF_STREAM = re.compile(rb'stream\r?\n(.*?)\r?\n?endstream', re.S)
+_PDF_TEXT_OPERATOR = re.compile(
+    rb'(\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)\s*(?:Tj|\'|")'
+    rb'|\[((?:\\.|[^\]\\])*)\]\s*TJ'
+    rb'|(T\*|Td|TD|ET)(?![A-Za-z])',
+    re.S,
+)
+_PDF_STRING = re.compile(rb'\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|-?\d+(?:\.\d+)?', re.S)
+# A TJ adjustment this far left (thousandths of an em) is a word gap, not kerning
+_PDF_WORD_GAP = -200
+_PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def _pdf_string(token):
+    if token.startswith(b'<'):
+        digits = re.sub(rb'\s', b'', token[1:-1])
+        return bytes.fromhex((digits + b'0' * (len(digits) % 2)).decode()).decode('latin-1')
+    return re.sub(rb'\\([nrtbf()\\]|[0-7]{1,3}|\r?\n)', _pdf_escape, token[1:-1]).decode('latin-1')
+
+
+def _pdf_escape(match):
+    escaped = match.group(1)
+    if escaped.isdigit():
+        return bytes([int(escaped, 8) & 0xFF])
+    if escaped.startswith((b'\r', b'\n')):
+        # Backslash-newline continues the string on the next line
+        return b''
+    return _PDF_ESCAPES.get(escaped, escaped)
+
+
+def _pdf_content_text(content):
+    """Strings shown by the text operators of a page content stream"""
+    parts = []
+    for match in _PDF_TEXT_OPERATOR.finditer(content):
+        shown, array, positioning = match.groups()
+        if shown:
+            parts.append(_pdf_string(shown))
+        elif array is not None:
+            parts.append(''.join(
+                _pdf_string(token) if token[:1] in (b'(', b'<') else ' ' * (float(token) <= _PDF_WORD_GAP)
+                for token in _PDF_STRING.findall(array)
+            ))
+        elif positioning:
+            parts.append('\n' if positioning in (b'T*', b'ET') else ' ')
+    return re.sub(r'[ \t]*\n\s*', '\n', ''.join(parts)).strip()
+
+
+def index(criminal_id, name, text, truncated=False, document_id=None, evidence_id=None):
+    """Store a file's text and replace its postings"""
+    counts = Counter(tokenize(text))
+    lookup = {'document_id': document_id} if document_id else {'evidence_id': evidence_id}
+    with transaction.atomic():
+        document_text, _ = DocumentText.objects.update_or_create(
+            **lookup,
+            defaults={
+                'criminal_id': criminal_id,
+                'name': name,
+                'text': text,
+                'length': sum(counts.values()),
+                'truncated': truncated,
+            },
+        )
+        document_text.postings.all().delete()
+        TextPosting.objects.bulk_create(
+            [TextPosting(term=term, document_text=document_text, frequency=frequency) for term, frequency in counts.items()],
+            batch_size=2000,
+        )
+    return document_text
+
+
+def unindex(document_id=None, evidence_id=None):
+    """Drop a file's text and postings, when its current file is not one we can read"""
+    lookup = {'document_id': document_id} if document_id else {'evidence_id': evidence_id}
+    DocumentText.objects.filter(**lookup).delete()
+
+
+def search(query, limit=20, criminal_id=None):
+    """[(score, DocumentText)] best first, ranked by BM25 over the query's terms"""
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+
+    texts = DocumentText.objects.all()
+    if criminal_id:
+        texts = texts.filter(criminal_id=criminal_id)
+    totals = texts.aggregate(count=Count('id'), length=Sum('length'))
+    if not totals['count']:
+        return []
+    average_length = (totals['length'] or 0) / totals['count'] or 1
+
+    postings = TextPosting.objects.filter(term__in=terms)
+    if criminal_id:
+        postings = postings.filter(document_text__criminal_id=criminal_id)
+    frequencies = {}
+    document_frequency = Counter()
+    lengths = {}
+    for term, text_id, frequency, length in postings.values_list(
+        'term', 'document_text_id', 'frequency', 'document_text__length'
+    ).iterator(chunk_size=5000):
+        frequencies.setdefault(text_id, []).append((term, frequency))
+        document_frequency[term] += 1
+        lengths[text_id] = length
+
+    idf = {
+        term: math.log(1 + (totals['count'] - count + 0.5) / (count + 0.5))
+        for term, count in document_frequency.items()
+    }
+    scores = (
+        (sum(
+            idf[term] * frequency * (K1 + 1)
+            / (frequency + K1 * (1 - B + B * lengths[text_id] / average_length))
+            for term, frequency in term_frequencies
+        ), text_id)
+        for text_id, term_frequencies in frequencies.items()
+    )
+    best = heapq.nlargest(limit, scores)
+
+    loaded = DocumentText.objects.select_related('criminal', 'document', 'evidence').in_bulk([text_id for _, text_id in best])
+    return [(score, loaded[text_id]) for score, text_id in best if text_id in loaded]
+
+
+def snippet(text, query, width=200):
+    """The stretch of text around the first query term, trimmed to about width characters"""
+    terms = set(tokenize(query))
+    position = 0
+    for match in WORD.finditer(text):
+        if match.group().lower() in terms:
+            position = match.start()
+            break
+    start = max(0, position - width // 3)
+    if start:
+        # Don't start mid-word
+        space = text.find(' ', start, position)
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(' ', position, end)
+        end = space if space > position else end
+    excerpt = ' '.join(text[start:end].split())
+    return ('…' if start else '') + excerpt + ('…' if end < len(text) else '')
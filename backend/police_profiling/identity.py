@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+from .caching import is_shared
+
+
+def identity_cache_key(user_id):
+    return f'auth_identity:{user_id}'
+
+
+def identity_cache():
+    """
+    The cache holding identities, or None when identities must not be cached.
+
+    Invalidation deletes the entry from this cache, so it has to be shared by
+    every worker: with a per-process cache, an officer deactivated through
+    one worker would stay signed in on the others until the entry expired.
+    """
+    backend = caches[getattr(settings, 'AUTH_IDENTITY_CACHE', 'default')]
+    if not settings.DEBUG and not is_shared(backend):
+        return None
+    return backend
+
+
+def officer_payload(officer):
+    """Officer fields returned by login and auth-check"""
+    return {
+        'id': officer.id,
+        'badge_number': officer.badge_number,
+        'rank': officer.rank,
+        'station': officer.station,
+        'can_activate_users': officer.can_activate_users,
+        'is_active': officer.is_active
+    }
+
+
+def build_identity(user, officer):
+    """Identity payload for a user and their officer record (None if not an officer)"""
+    return {
+        'user': user.username,
+        'user_id': user.id,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'officer': officer_payload(officer) if officer else {}
+    }
+
+
+def cache_identity(user, identity):
+    """
+    Store the identity payload next to the user's session auth hash, so a
+    cached entry is only honoured for sessions created with the current
+    password (the same check Django's get_user() does against the database).
+    """
+    cache = identity_cache()
+    if cache is None:
+        return
+    cache.set(
+        identity_cache_key(user.pk),
+        {'session_hash': user.get_session_auth_hash(), 'identity': identity},
+        getattr(settings, 'AUTH_IDENTITY_CACHE_TIMEOUT', 3600)
+    )
+
+
+def cached_identity(session):
+    """Identity payload for the session's user without any database query, or None"""
+    user_id = session.get(SESSION_KEY)
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not user_id or not session_hash:
+        return None
+    
+    cache = identity_cache()
+    if cache is None:
+        return None
+    entry = cache.get(identity_cache_key(user_id))
+    if entry is None or not constant_time_compare(entry['session_hash'], session_hash):
+        return None
+    return entry['identity']
+
+
+def invalidate_identity(user_id):
+    cache = identity_cache()
+    if cache is not None:
+        cache.delete(identity_cache_key(user_id))
@@ -0,0 +1,270 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in the Job table, so enqueueing inside a request's transaction
+is atomic with the write that caused it and no broker is needed. Workers
+(``manage.py run_workers``) claim jobs with SELECT ... FOR UPDATE SKIP LOCKED
+and lease them for the task's visibility timeout; a job whose worker died is
+claimed again once the lease runs out. Failures are retried with exponential
+backoff until max_attempts; enqueueing a failed job's idempotency key again
+queues it for a fresh set of attempts.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_QUEUE = {
+    'POLL_INTERVAL': 1.0,
+    'VISIBILITY_TIMEOUT': 300,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 10,
+    'BACKOFF_MAX': 3600,
+}
+
+TASKS = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, timeout):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+
+def config():
+    return {**DEFAULT_JOB_QUEUE, **getattr(settings, 'JOB_QUEUE', {})}
+
+
+def task(name, max_attempts=None, timeout=None):
+    """Register func(**payload) as a job under name"""
+    def register(func):
+        queue_config = config()
+        TASKS[name] = Task(
+            func, name,
+            max_attempts or queue_config['MAX_ATTEMPTS'],
+            timeout or queue_config['VISIBILITY_TIMEOUT'],
+        )
+        return func
+    return register
+
+
+def enqueue(name, payload=None, priority=0, idempotency_key=None, delay=0, officer=None):
+    """
+    Queue a job and return it. With an idempotency key, an existing job with
+    the same key is returned instead of queueing a duplicate (after being
+    queued again if it had failed).
+    """
+    if name not in TASKS:
+        raise ValueError(f"Unknown job {name!r}")
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'priority': priority,
+        'max_attempts': TASKS[name].max_attempts,
+        'run_after': timezone.now() + timedelta(seconds=delay),
+        'created_by': officer,
+    }
+    if idempotency_key is None:
+        return Job.objects.create(**fields)
+
+    existing = Job.objects.filter(idempotency_key=idempotency_key).first()
+    if existing is not None:
+        return _requeue_failed(existing, fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(idempotency_key=idempotency_key, **fields)
+    except IntegrityError:
+        # Another request queued the same key first
+        return _requeue_failed(Job.objects.get(idempotency_key=idempotency_key), fields)
+
+
+def _requeue_failed(job, fields):
+    """Give a failed job a fresh set of attempts; jobs in any other state are returned as they are"""
+    if job.status != 'FAILED':
+        return job
+    fields = {**fields, 'created_by': fields['created_by'] or job.created_by}
+    # Conditional, so two requests re-queueing the same job reset it once
+    Job.objects.filter(pk=job.pk, status='FAILED').update(
+        status='QUEUED', attempts=0, locked_by='', locked_until=None, result=None,
+        last_error='', finished_at=None, **fields
+    )
+    job.refresh_from_db()
+    return job
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker, names=None):
+    """Lease the next runnable job to worker, or return None"""
+    now = timezone.now()
+    runnable = (
+        Q(status='QUEUED', run_after__lte=now)
+        | Q(status='RUNNING', locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+    queryset = Job.objects.filter(runnable)
+    if names:
+        queryset = queryset.filter(name__in=names)
+    queryset = queryset.order_by('-priority', 'run_after', 'id')
+
+    with transaction.atomic():
+        if connections[router.db_for_write(Job)].features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        job = queryset.first()
+        if job is None:
+            return None
+
+        task_config = TASKS.get(job.name)
+        timeout = task_config.timeout if task_config else config()['VISIBILITY_TIMEOUT']
+        job.status = 'RUNNING'
+        job.attempts += 1
+        job.locked_by = worker
+        job.locked_until = now + timedelta(seconds=timeout)
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_until'])
+    return job
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number attempts, with jitter"""
+    queue_config = config()
+    delay = min(queue_config['BACKOFF_BASE'] * 2 ** (attempts - 1), queue_config['BACKOFF_MAX'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _finish(job, worker, **fields):
+    """Record the outcome, unless the lease expired and another worker took the job"""
+    return Job.objects.filter(pk=job.pk, status='RUNNING', locked_by=worker).update(
+        locked_until=None, **fields
+    )
+
+
+def run(job, worker):
+    """Run a claimed job and record success, a retry or the final failure"""
+    registered = TASKS.get(job.name)
+    if registered is None:
+        _finish(job, worker, status='FAILED', last_error=f'Unknown job {job.name!r}', finished_at=timezone.now())
+        return False
+
+    try:
+        result = registered.func(**job.payload)
+    except Exception:
+        logger.warning("Job %s (%s) failed on attempt %d", job.pk, job.name, job.attempts, exc_info=True)
+        # A database error in the task may have left the connection unusable
+        for connection in connections.all():
+            connection.close_if_unusable_or_obsolete()
+        _retry_or_fail(job, worker, traceback.format_exc())
+        return False
+
+    _finish(job, worker, status='SUCCEEDED', result=result, last_error='', finished_at=timezone.now())
+    return True
+
+
+def _retry_or_fail(job, worker, error):
+    if job.attempts >= job.max_attempts:
+        _finish(job, worker, status='FAILED', last_error=error, finished_at=timezone.now())
+    else:
+        _finish(
+            job, worker,
+            status='QUEUED',
+            last_error=error,
+            run_after=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+        )
+
+
+def fail_exhausted():
+    """Give up on jobs whose worker died on their last allowed attempt"""
+    return Job.objects.filter(
+        status='RUNNING', locked_until__lt=timezone.now(), attempts__gte=F('max_attempts')
+    ).update(
+        status='FAILED', locked_until=None, finished_at=timezone.now(),
+        last_error='Visibility timeout expired on the final attempt',
+    )
+
+
+class Worker:
+    """Runs jobs on a pool of threads until stopped (or, with once=True, until the queue is empty)"""
+    def __init__(self, threads=1, names=None, once=False):
+        self.threads = threads
+        self.names = names
+        self.once = once
+        self.stopping = threading.Event()
+
+    def start(self):
+        pool = [
+            threading.Thread(target=self._loop, args=(f'{worker_id()}:{index}',), name=f'job-worker-{index}')
+            for index in range(self.threads)
+        ]
+        for thread in pool:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in pool):
+                for thread in pool:
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in pool:
+                thread.join()
+
+    def stop(self):
+        """Finish the running jobs, then exit"""
+        self.stopping.set()
+
+    def _loop(self, worker):
+        poll_interval = config()['POLL_INTERVAL']
+        try:
+            while not self.stopping.is_set():
+                try:
+                    fail_exhausted()
+                    job = claim(worker, self.names)
+                except DatabaseError:
+                    # Lock timeouts and dropped connections: back off and retry
+                    logger.warning("Worker %s could not claim a job", worker, exc_info=True)
+                    connections.close_all()
+                    self.stopping.wait(poll_interval)
+                    continue
+                if job is None:
+                    if self.once:
+                        return
+                    self.stopping.wait(poll_interval)
+                    continue
+                try:
+                    run(job, worker)
+                except Exception:
+                    # Recording the outcome failed; reconnect and hand the job
+                    # back rather than leave it RUNNING until its lease expires
+                    logger.exception("Worker %s could not record the outcome of job %s", worker, job.pk)
+                    connections.close_all()
+                    try:
+                        _retry_or_fail(job, worker, traceback.format_exc())
+                    except DatabaseError:
+                        logger.warning("Worker %s could not release job %s", worker, job.pk, exc_info=True)
+                        connections.close_all()
+                    self.stopping.wait(poll_interval)
+        finally:
+            connections.close_all()
+
+
+def run_worker_process(threads, names, once):
+    """Entry point for worker processes started by run_workers"""
+    import signal
+
+    import django
+    django.setup()
+    worker = Worker(threads, names, once)
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+    worker.start()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from police_profiling.archive import archivable, archive_cases, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Move closed and convicted cases older than the archive age into the archive table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive cases committed more than this many days ago '
+                                                    '(default: CRIME_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows moved per transaction')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+    
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'{archivable(cutoff).count()} cases committed before {cutoff} would be archived')
+            return
+        
+        total = archive_cases(
+            cutoff,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=lambda moved: self.stdout.write(f'Archived {moved} cases...') if moved else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} cases committed before {cutoff}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from police_profiling.benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark suite against the configured database'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES))
+        parser.add_argument('--rows', type=int, default=10000, help='Number of synthetic rows to seed')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best is reported')
+    
+    def handle(self, *args, **options):
+        SUITES[options['suite']](options, self.stdout.write)
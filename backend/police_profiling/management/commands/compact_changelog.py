@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max
+
+from police_profiling.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed entries superseded by a later entry for the same object'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        # Clients only ever see the latest entry per object, so older ones can go
+        latest = (
+            ChangeLogEntry.objects.values('model_name', 'object_id')
+            .annotate(last_id=Max('id'), entries=Count('id'))
+            .filter(entries__gt=1)
+            .values_list('model_name', 'object_id', 'last_id')
+        )
+        deleted = 0
+        batch = []
+        for model_name, object_id, last_id in latest.iterator():
+            batch.append((model_name, object_id, last_id))
+            if len(batch) >= options['batch_size']:
+                deleted += self.delete_superseded(batch)
+                batch = []
+        deleted += self.delete_superseded(batch)
+        self.stdout.write(f'Deleted {deleted} superseded change feed entries')
+    
+    def delete_superseded(self, batch):
+        deleted = 0
+        for model_name, object_id, last_id in batch:
+            deleted += ChangeLogEntry.objects.filter(
+                model_name=model_name, object_id=object_id, id__lt=last_id
+            ).delete()[0]
+        return deleted
@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from police_profiling.jobs import TASKS, enqueue
+
+
+class Command(BaseCommand):
+    help = 'Queue a background job (e.g. from cron)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(TASKS))
+        parser.add_argument('--payload', default='{}', help='Job arguments as a JSON object')
+        parser.add_argument('--priority', type=int, default=0)
+        parser.add_argument('--idempotency-key', help='Skip queueing if a job with this key already exists')
+    
+    def handle(self, *args, **options):
+        try:
+            payload = json.loads(options['payload'])
+        except ValueError as exc:
+            raise CommandError(f'--payload is not valid JSON: {exc}')
+        
+        job = enqueue(options['name'], payload, options['priority'], options['idempotency_key'])
+        self.stdout.write(f'Queued job #{job.pk} ({job.name}, {job.status})')
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from police_profiling import mugshots
+from police_profiling.models import Criminal, CriminalEvidence, ImageHash
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes for profile pictures and photo evidence that have none (or --all)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Hashing processes (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Images read and hashed per round')
+        parser.add_argument('--all', action='store_true', help='Re-hash images that already have hashes')
+    
+    def handle(self, *args, **options):
+        targets = self.targets(options['all'])
+        self.stdout.write(f'{len(targets)} images to hash with {options["processes"]} processes')
+        
+        hashed = failed = 0
+        batch_size = options['batch_size']
+        with ProcessPoolExecutor(max_workers=options['processes']) as pool:
+            for start in range(0, len(targets), batch_size):
+                batch = targets[start:start + batch_size]
+                # Storage is read here; the pool only does the CPU-bound hashing
+                futures = []
+                for criminal_id, name, evidence_id in batch:
+                    try:
+                        with default_storage.open(name) as source:
+                            futures.append(((criminal_id, name, evidence_id), pool.submit(mugshots.hash_bytes, source.read())))
+                    except OSError as exc:
+                        failed += 1
+                        self.stderr.write(f'Cannot read {name}: {exc}')
+                for (criminal_id, name, evidence_id), future in futures:
+                    try:
+                        hashes = future.result()
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'Cannot hash {name}: {exc}')
+                        continue
+                    mugshots.store(criminal_id, name, hashes, evidence_id)
+                    hashed += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Hashed {hashed} images...')
+        
+        self.stdout.write(self.style.SUCCESS(f'Hashed {hashed} images ({failed} failed)'))
+    
+    def targets(self, rehash):
+        """[(criminal_id, name, evidence_id)] still to hash"""
+        done = set()
+        if not rehash:
+            done = set(ImageHash.objects.values_list('name', 'evidence_id'))
+        
+        targets = [
+            (criminal_id, name, None)
+            for criminal_id, name in Criminal.objects.exclude(profile_picture='')
+            .exclude(profile_picture__isnull=True).values_list('pk', 'profile_picture')
+            if (name, None) not in done
+        ]
+        targets += [
+            (criminal_id, name, str(evidence_id))
+            for evidence_id, criminal_id, name in CriminalEvidence.objects.filter(evidence_type='PHOTO')
+            .values_list('pk', 'criminal_id', 'file')
+            if (name, evidence_id) not in done
+        ]
+        return targets
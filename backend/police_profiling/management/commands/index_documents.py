@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from police_profiling.models import CriminalDocument, CriminalEvidence, DocumentText
+from police_profiling.tasks import queue_text_extraction
+
+
+class Command(BaseCommand):
+    help = 'Queue full-text extraction for documents and evidence files that are not indexed yet (or --all)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-extract files that are already indexed')
+    
+    def handle(self, *args, **options):
+        indexed = set()
+        if not options['all']:
+            indexed = set(DocumentText.objects.values_list('name', flat=True))
+        
+        queued = 0
+        for document_id, name in CriminalDocument.objects.values_list('pk', 'file').iterator():
+            if name not in indexed and queue_text_extraction(name, document_id=str(document_id), force=options['all']):
+                queued += 1
+        for evidence_id, name in CriminalEvidence.objects.exclude(evidence_type='PHOTO').values_list('pk', 'file').iterator():
+            if name not in indexed and queue_text_extraction(name, evidence_id=str(evidence_id), force=options['all']):
+                queued += 1
+        self.stdout.write(self.style.SUCCESS(f'Queued {queued} files for text extraction; run_workers will index them'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from police_profiling import contacts
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the phone number / email address reverse lookup table from the criminal records'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        def progress(rows, added, removed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{rows} criminals checked ({added} added, {removed} removed so far)')
+        
+        added, removed = contacts.rebuild(options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f'Contact index rebuilt: {added} added, {removed} removed'))
@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from police_profiling.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Recompute the daily crime rollups from the crime tables, to backfill them or repair drift. '
+            'Writes to crimes in the chunk being rebuilt can be lost; run it when the system is quiet')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to rebuild (default: earliest crime)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to rebuild (default: latest crime)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rollups are wrong')
+    
+    def handle(self, *args, **options):
+        totals = rebuild(
+            options['start'],
+            options['end'],
+            chunk_days=options['chunk_days'],
+            dry_run=options['dry_run'],
+            progress=lambda day, totals: self.stdout.write(f'Checked up to {day}, {totals["changed"]} rollups wrong so far...'),
+        )
+        if options['dry_run']:
+            self.stdout.write(f'{totals["changed"]} of the rollups over {totals["days"]} days are wrong')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {totals["rows"]} rollups over {totals["days"]} days ({totals["changed"]} were wrong)'
+            ))
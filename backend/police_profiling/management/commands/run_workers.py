@@ -0,0 +1,56 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from police_profiling.jobs import TASKS, Worker, run_worker_process
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to start')
+        parser.add_argument('--threads', type=int, default=4, help='Worker threads per process')
+        parser.add_argument('--job', action='append', dest='names', choices=sorted(TASKS),
+                            help='Only run jobs with this name (repeatable)')
+        parser.add_argument('--once', action='store_true', help='Exit when no runnable jobs are left')
+    
+    def handle(self, *args, **options):
+        threads = max(options['threads'], 1)
+        processes = max(options['processes'], 1)
+        self.stdout.write(f'Running jobs on {processes} process(es) x {threads} thread(s)')
+        
+        if processes == 1:
+            worker = Worker(threads, options['names'], options['once'])
+            signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+            worker.start()
+            return
+        
+        # Children open their own connections
+        connections.close_all()
+        children = [
+            multiprocessing.Process(
+                target=run_worker_process,
+                args=(threads, options['names'], options['once']),
+                name=f'job-workers-{index}',
+            )
+            for index in range(processes)
+        ]
+        for child in children:
+            child.start()
+        
+        def stop_children(*args):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: children finish their current jobs
+        
+        signal.signal(signal.SIGTERM, stop_children)
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            # Ctrl+C already reached the whole process group
+            for child in children:
+                child.join()
@@ -0,0 +1,60 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from police_profiling import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Build offline station snapshots and delta packs, or apply a delta to a snapshot'
+    
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='subcommand', required=True)
+        
+        build = subcommands.add_parser('build', help='Build a full SQLite snapshot')
+        build.add_argument('output')
+        build.add_argument('--no-thumbnails', action='store_true')
+        build.add_argument('--batch-size', type=int, default=5000)
+        
+        delta = subcommands.add_parser('delta', help='Build a compressed delta pack')
+        delta.add_argument('output')
+        since = delta.add_mutually_exclusive_group(required=True)
+        since.add_argument('--since', type=int, help='Change feed token to start after')
+        since.add_argument('--snapshot', help='Start after the token recorded in this snapshot')
+        delta.add_argument('--no-thumbnails', action='store_true')
+        
+        apply = subcommands.add_parser('apply', help='Apply delta packs to a snapshot, in order')
+        apply.add_argument('snapshot')
+        apply.add_argument('deltas', nargs='+')
+    
+    def handle(self, *args, **options):
+        getattr(self, f"handle_{options['subcommand']}")(options)
+    
+    def handle_build(self, options):
+        result = snapshots.build_snapshot(
+            options['output'],
+            thumbnails=not options['no_thumbnails'],
+            batch_size=options['batch_size'],
+        )
+        size = os.path.getsize(options['output'])
+        self.stdout.write(
+            f"Wrote {result['criminals']} criminals and {result['crimes']} crimes "
+            f"({size / 1024 / 1024:.1f} MB) at token {result['sync_token']}"
+        )
+    
+    def handle_delta(self, options):
+        since = options['since']
+        if since is None:
+            since = snapshots.snapshot_token(options['snapshot'])
+        result = snapshots.build_delta(options['output'], since, thumbnails=not options['no_thumbnails'])
+        self.stdout.write(
+            f"Wrote {result['changes']} changes from token {result['from_token']} to {result['to_token']}"
+        )
+    
+    def handle_apply(self, options):
+        for delta in options['deltas']:
+            try:
+                result = snapshots.apply_delta(options['snapshot'], delta)
+            except snapshots.SnapshotError as exc:
+                raise CommandError(f'{delta}: {exc}')
+            self.stdout.write(f"{delta}: applied {result['applied']} changes, now at token {result['sync_token']}")
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from police_db_system.db_routers import pin_to_primary, unpin
+
+try:
+    import brotli
+except ImportError:  # Optional: brotli is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd is only offered when installed
+    zstandard = None
+
+
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'application/javascript', 'text/')
+
+
+def _compressors():
+    """Available encodings in server preference order"""
+    available = {}
+    if zstandard is not None:
+        available['zstd'] = lambda data: zstandard.ZstdCompressor(level=3).compress(data)
+    if brotli is not None:
+        available['br'] = lambda data: brotli.compress(data, quality=5)
+    available['gzip'] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    return available
+
+
+COMPRESSORS = _compressors()
+
+
+def parse_accept_encoding(header):
+    """Return {encoding: q} for an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate_encoding(header):
+    """Pick the best encoding both sides support, or None for identity"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in COMPRESSORS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        # Ties keep the earlier (server-preferred) encoding
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with zstd, brotli or gzip depending on Accept-Encoding.
+
+    Bodies under COMPRESSION_MIN_SIZE are sent as-is. Compressed bodies are
+    cached by content digest, so a popular payload (the same criminal or crime
+    list served to many stations) is compressed once per cache lifetime
+    rather than once per request.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.cache_timeout = getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 300)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = self.compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # The compressed entity differs from the identity one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def compress(self, content, encoding):
+        """Compress content, reusing a cached copy of identical payloads"""
+        digest = hashlib.blake2b(content, digest_size=20).hexdigest()
+        key = f'compressed:{encoding}:{digest}'
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = COMPRESSORS[encoding](content)
+            cache.set(key, compressed, self.cache_timeout)
+        return compressed
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pin database reads to the primary for writes and for clients that wrote
+    recently. A successful unsafe request sets a short-lived cookie; while it
+    is present the client's reads skip the replicas (read-your-writes).
+    """
+    cookie_name = 'db_primary_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+    def __call__(self, request):
+        is_write = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        token = pin_to_primary(is_write or self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin(token)
+
+        if is_write and response.status_code < 400:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=self.sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0004_alter_criminal_options_criminal_alcohol_use_history_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='policeofficer',
+            index=models.Index(fields=['station', 'rank'], name='police_prof_station_91aa5b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='policeofficer',
+            index=models.Index(fields=['is_active', 'rank'], name='police_prof_is_acti_b6c6ac_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+def seed_changelog(apps, schema_editor):
+    """Log existing rows as inserts so a sync from token 0 sees everything"""
+    ChangeLogEntry = apps.get_model('police_profiling', 'ChangeLogEntry')
+    for name in ('criminal', 'crime', 'criminalevidence', 'policeofficer'):
+        model = apps.get_model('police_profiling', name)
+        pks = model.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=2000)
+        batch = []
+        for pk in pks:
+            batch.append(ChangeLogEntry(model_name=name, object_id=str(pk), action='INSERT'))
+            if len(batch) >= 2000:
+                ChangeLogEntry.objects.bulk_create(batch)
+                batch = []
+        ChangeLogEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0006_auditlogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model_name', models.CharField(max_length=50)),
+                ('object_id', models.CharField(max_length=36)),
+                ('action', models.CharField(choices=[('INSERT', 'Inserted'), ('UPDATE', 'Updated'), ('DELETE', 'Deleted')], max_length=10)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['model_name', 'object_id'], name='police_prof_model_n_5fdf07_idx')],
+            },
+        ),
+        migrations.RunPython(seed_changelog, migrations.RunPython.noop),
+    ]
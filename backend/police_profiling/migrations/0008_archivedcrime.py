@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0007_changelogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCrime',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('crime_type', models.CharField(choices=[('THEFT', 'Theft'), ('ASSAULT', 'Assault'), ('BURGLARY', 'Burglary'), ('ROBBERY', 'Robbery'), ('DRUGS', 'Drug Offense'), ('FRAUD', 'Fraud'), ('HOMICIDE', 'Homicide'), ('OTHER', 'Other')], max_length=20)),
+                ('description', models.TextField()),
+                ('date_committed', models.DateField()),
+                ('location', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('OPEN', 'Open Investigation'), ('CLOSED', 'Case Closed'), ('CONVICTED', 'Convicted')], max_length=20)),
+                ('archived_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='crime',
+            index=models.Index(fields=['status', 'date_committed'], name='police_prof_status_10dcdb_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedcrime',
+            name='arresting_officer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_crimes', to='police_profiling.policeofficer'),
+        ),
+        migrations.AddField(
+            model_name='archivedcrime',
+            name='criminal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_crimes', to='police_profiling.criminal'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcrime',
+            index=models.Index(fields=['criminal', 'date_committed'], name='police_prof_crimina_1d2e75_idx'),
+        ),
+    ]
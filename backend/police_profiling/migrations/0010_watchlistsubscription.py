@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchlistSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threat_levels', models.JSONField(blank=True, default=list)),
+                ('escape_risk', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('criminal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='watchers', to='police_profiling.criminal')),
+                ('officer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watchlist', to='police_profiling.policeofficer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('officer', 'criminal'), name='unique_watch_per_criminal')],
+            },
+        ),
+    ]
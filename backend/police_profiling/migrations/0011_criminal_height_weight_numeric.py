@@ -0,0 +1,95 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:50
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Q
+
+# Frozen copies of descriptors.parse_height/parse_weight as they were when
+# this migration was written, so later changes to the parsers can't change
+# what it does
+
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+
+
+def _float(text):
+    return float(text.replace(',', '.'))
+
+
+def _plausible_height(cm):
+    return round(cm) if 50 <= cm <= 260 else None
+
+
+def parse_height(text):
+    if not text:
+        return None
+    value = str(text).strip().lower()
+
+    feet = re.match(r"^(\d+)\s*(?:'|ft|feet|foot)\s*(?:(\d+(?:\.\d+)?)\s*(?:\"|''|in|inches|inch)?)?$", value)
+    if feet:
+        inches = int(feet.group(1)) * 12 + float(feet.group(2) or 0)
+        return _plausible_height(inches * 2.54)
+
+    number = re.match(rf'^{_NUMBER}\s*(cm|m|in|inches|inch|")?$', value)
+    if not number:
+        return None
+    amount, unit = _float(number.group(1)), number.group(2)
+    if unit == 'm' or (unit is None and amount < 3):
+        return _plausible_height(amount * 100)
+    if unit in ('in', 'inches', 'inch', '"') or (unit is None and 48 <= amount < 100):
+        return _plausible_height(amount * 2.54)
+    return _plausible_height(amount)
+
+
+def parse_weight(text):
+    if not text:
+        return None
+    value = str(text).strip().lower()
+    number = re.match(rf'^{_NUMBER}\s*(kg|kgs|kilos?|kilograms?|lb|lbs|pounds?|st|stone)?$', value)
+    if not number:
+        return None
+    amount, unit = _float(number.group(1)), number.group(2) or 'kg'
+    if unit.startswith(('lb', 'pound')):
+        amount *= 0.45359237
+    elif unit in ('st', 'stone'):
+        amount *= 6.35029318
+    return round(amount) if 20 <= amount <= 400 else None
+
+
+def backfill_measurements(apps, schema_editor):
+    """Parse the free-text height/weight of existing criminals, committing every batch"""
+    Criminal = apps.get_model('police_profiling', 'Criminal')
+    rows = (
+        Criminal.objects.filter(Q(height__isnull=False) | Q(weight__isnull=False))
+        .order_by('pk').values_list('pk', 'height', 'weight')
+    )
+    batch = []
+    for pk, height, weight in rows.iterator(chunk_size=2000):
+        batch.append(Criminal(pk=pk, height_cm=parse_height(height), weight_kg=parse_weight(weight)))
+        if len(batch) >= 1000:
+            Criminal.objects.bulk_update(batch, ['height_cm', 'weight_kg'])
+            batch = []
+    Criminal.objects.bulk_update(batch, ['height_cm', 'weight_kg'])
+
+
+class Migration(migrations.Migration):
+    # Batches of the backfill commit as they go instead of in one long transaction
+    atomic = False
+
+    dependencies = [
+        ('police_profiling', '0010_watchlistsubscription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='criminal',
+            name='height_cm',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='criminal',
+            name='weight_kg',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_measurements, migrations.RunPython.noop),
+    ]
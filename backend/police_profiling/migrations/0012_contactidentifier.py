@@ -0,0 +1,90 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:54
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of the contacts normalisation as it was when this migration was
+# written, so later changes to the app module can't change what it does
+
+
+def _phone(text):
+    value = str(text).strip()
+    digits = re.sub(r'\D', '', value)
+    country_code = str(getattr(settings, 'CONTACT_DEFAULT_COUNTRY_CODE', '264'))
+    if not digits:
+        return None
+    if value.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]
+    elif len(digits) <= 9:
+        digits = country_code + digits
+    return f'+{digits}' if 8 <= len(digits) <= 15 else None
+
+
+def _email(text):
+    value = str(text).strip().lower()
+    if value.startswith('mailto:'):
+        value = value[7:]
+    return value if re.fullmatch(r'[^@\s]+@[^@\s]+\.[^@\s]+', value) and len(value) <= 254 else None
+
+
+def identifiers(phone_numbers, email_addresses):
+    """{(kind, value): raw} for a criminal's contact lists"""
+    found = {}
+    for kind, entries, normalizer in (('PHONE', phone_numbers, _phone), ('EMAIL', email_addresses, _email)):
+        if not isinstance(entries, list):
+            continue
+        for entry in entries:
+            if entry in (None, ''):
+                continue
+            value = normalizer(entry)
+            if value:
+                found.setdefault((kind, value), str(entry)[:254])
+    return found
+
+
+def index_contacts(apps, schema_editor):
+    """Fill the lookup table from the existing phone_numbers/email_addresses lists"""
+    Criminal = apps.get_model('police_profiling', 'Criminal')
+    ContactIdentifier = apps.get_model('police_profiling', 'ContactIdentifier')
+    rows = Criminal.objects.order_by('pk').values_list('pk', 'phone_numbers', 'email_addresses')
+    batch = []
+    for pk, phones, emails in rows.iterator(chunk_size=2000):
+        batch.extend(
+            ContactIdentifier(criminal_id=pk, kind=kind, value=value, raw=raw)
+            for (kind, value), raw in identifiers(phones, emails).items()
+        )
+        if len(batch) >= 2000:
+            ContactIdentifier.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ContactIdentifier.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0011_criminal_height_weight_numeric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactIdentifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('PHONE', 'Phone'), ('EMAIL', 'Email')], max_length=5)),
+                ('value', models.CharField(max_length=254)),
+                ('raw', models.CharField(help_text='The entry as it was recorded', max_length=254)),
+                ('criminal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contact_identifiers', to='police_profiling.criminal')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'value', 'criminal'), name='unique_contact_per_criminal')],
+            },
+        ),
+        migrations.RunPython(index_contacts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0012_contactidentifier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleaseDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest_date', models.DateField()),
+                ('facility', models.CharField(blank=True, help_text='Blank for criminals with no recorded facility', max_length=100)),
+                ('horizon_days', models.PositiveSmallIntegerField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('high_risk', models.PositiveIntegerField(default=0)),
+                ('escape_risk', models.PositiveIntegerField(default=0)),
+                ('releases', models.JSONField(default=list)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['digest_date', 'facility'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='criminal',
+            index=models.Index(fields=['is_incarcerated', 'expected_release_date'], name='police_prof_is_inca_9705c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='criminal',
+            index=models.Index(fields=['current_facility', 'expected_release_date'], name='police_prof_current_46f01a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='releasedigest',
+            constraint=models.UniqueConstraint(fields=('digest_date', 'facility'), name='unique_release_digest'),
+        ),
+    ]
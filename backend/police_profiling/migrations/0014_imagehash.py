@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0013_release_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('PROFILE', 'Profile picture'), ('EVIDENCE', 'Photo evidence')], max_length=10)),
+                ('name', models.CharField(help_text='Storage name of the hashed file', max_length=255)),
+                ('phash', models.BigIntegerField()),
+                ('dhash', models.BigIntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('criminal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_hashes', to='police_profiling.criminal')),
+                ('evidence', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_hash', to='police_profiling.criminalevidence')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['criminal', 'source'], name='police_prof_crimina_55ecce_idx')],
+            },
+        ),
+    ]
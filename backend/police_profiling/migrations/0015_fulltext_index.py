@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0014_imagehash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name of the file the text came from', max_length=255)),
+                ('text', models.TextField(blank=True)),
+                ('length', models.PositiveIntegerField(default=0)),
+                ('truncated', models.BooleanField(default=False)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+                ('criminal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_texts', to='police_profiling.criminal')),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='extracted_text', to='police_profiling.criminaldocument')),
+                ('evidence', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='extracted_text', to='police_profiling.criminalevidence')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TextPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('document_text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='police_profiling.documenttext')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'document_text'), name='unique_posting')],
+            },
+        ),
+    ]
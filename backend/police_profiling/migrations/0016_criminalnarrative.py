@@ -0,0 +1,65 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:01
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+NARRATIVE_FIELDS = (
+    'physical_characteristics', 'criminal_history', 'modus_operandi', 'weapons_preference',
+    'medical_conditions', 'psychological_profile', 'drug_use_history', 'alcohol_use_history',
+)
+
+
+def copy_narratives(apps, schema_editor):
+    """
+    Copy the narrative columns into the new table in keyset-ordered batches,
+    each committed on its own so no long lock is held. A batch replaces any
+    narratives it already wrote, so an interrupted run can simply be re-run
+    (MySQL can't name a conflict target, which rules out a bulk upsert).
+    """
+    Criminal = apps.get_model('police_profiling', 'Criminal')
+    CriminalNarrative = apps.get_model('police_profiling', 'CriminalNarrative')
+    database = schema_editor.connection.alias
+    last_pk = None
+    while True:
+        rows = Criminal.objects.using(database).order_by('pk')
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        rows = list(rows.values_list('pk', *NARRATIVE_FIELDS)[:1000])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        narratives = [
+            CriminalNarrative(criminal_id=pk, **dict(zip(NARRATIVE_FIELDS, values)))
+            for pk, *values in rows
+            if any(value is not None for value in values)
+        ]
+        with transaction.atomic(using=database):
+            CriminalNarrative.objects.using(database).filter(criminal_id__in=[row[0] for row in rows]).delete()
+            CriminalNarrative.objects.using(database).bulk_create(narratives)
+
+
+class Migration(migrations.Migration):
+    # Each batch of the copy commits as it goes
+    atomic = False
+
+    dependencies = [
+        ('police_profiling', '0015_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CriminalNarrative',
+            fields=[
+                ('criminal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='narrative', serialize=False, to='police_profiling.criminal')),
+                ('physical_characteristics', models.TextField(blank=True, null=True)),
+                ('criminal_history', models.TextField(blank=True, help_text='Summary of criminal history', null=True)),
+                ('modus_operandi', models.TextField(blank=True, help_text="Criminal's methods and patterns", null=True)),
+                ('weapons_preference', models.TextField(blank=True, help_text='Preferred weapons or tools', null=True)),
+                ('medical_conditions', models.TextField(blank=True, null=True)),
+                ('psychological_profile', models.TextField(blank=True, null=True)),
+                ('drug_use_history', models.TextField(blank=True, null=True)),
+                ('alcohol_use_history', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(copy_narratives, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0016_criminalnarrative'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='criminal',
+            name='alcohol_use_history',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='criminal_history',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='drug_use_history',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='medical_conditions',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='modus_operandi',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='physical_characteristics',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='psychological_profile',
+        ),
+        migrations.RemoveField(
+            model_name='criminal',
+            name='weapons_preference',
+        ),
+    ]
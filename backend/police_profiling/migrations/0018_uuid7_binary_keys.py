@@ -0,0 +1,122 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:04
+
+import police_profiling.ids
+from django.db import migrations
+
+KEYED_MODELS = ('criminal', 'crime', 'criminalevidence', 'criminaldocument', 'archivedcrime')
+
+
+def _key_columns(cursor, tables):
+    """
+    The uuid columns to convert, {table: [(column, nullable)]} (each table's
+    primary key and every foreign key pointing at one of them), and the
+    foreign key constraints [(name, table, column, referenced table)]
+    """
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(
+        'SELECT CONSTRAINT_NAME, TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME '
+        'FROM information_schema.KEY_COLUMN_USAGE '
+        f'WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IN ({placeholders})',
+        tables,
+    )
+    constraints = cursor.fetchall()
+    columns = {}
+    for table, column in [(table, 'id') for table in tables] + [(row[1], row[2]) for row in constraints]:
+        cursor.execute(
+            'SELECT IS_NULLABLE FROM information_schema.COLUMNS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s',
+            [table, column],
+        )
+        nullable = cursor.fetchone()[0] == 'YES'
+        if (column, nullable) not in columns.setdefault(table, []):
+            columns[table].append((column, nullable))
+    return columns, constraints
+
+
+def _convert(apps, schema_editor, binary):
+    """
+    Rewrite the uuid key columns between char(32) hex text and binary(16) in
+    place. Only MySQL stores them differently; elsewhere there is nothing to do.
+    Existing keys keep their values, only their encoding changes.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'mysql' or connection.data_types['UUIDField'] != 'char(32)':
+        return
+    quote = schema_editor.quote_name
+    tables = [apps.get_model('police_profiling', name)._meta.db_table for name in KEYED_MODELS]
+    with connection.cursor() as cursor:
+        columns, constraints = _key_columns(cursor, tables)
+
+    def modify(table, column_type):
+        schema_editor.execute(f'ALTER TABLE {quote(table)} ' + ', '.join(
+            f'MODIFY {quote(column)} {column_type}{"" if nullable else " NOT NULL"}'
+            for column, nullable in columns[table]
+        ))
+
+    for name, table, column, referenced_table in constraints:
+        schema_editor.execute(f'ALTER TABLE {quote(table)} DROP FOREIGN KEY {quote(name)}')
+    for table in columns:
+        # varbinary keeps the hex text's bytes so they can be (un)hexed in place
+        modify(table, 'varbinary(32)')
+        schema_editor.execute(f'UPDATE {quote(table)} SET ' + ', '.join(
+            f'{quote(column)} = {"UNHEX" if binary else "LOWER(HEX"}({quote(column)}){"" if binary else ")"}'
+            for column, _ in columns[table]
+        ))
+        modify(table, 'binary(16)' if binary else 'char(32)')
+    for name, table, column, referenced_table in constraints:
+        schema_editor.execute(
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+            f'FOREIGN KEY ({quote(column)}) REFERENCES {quote(referenced_table)} ({quote("id")})'
+        )
+
+
+def to_binary(apps, schema_editor):
+    _convert(apps, schema_editor, binary=True)
+
+
+def to_text(apps, schema_editor):
+    _convert(apps, schema_editor, binary=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0017_remove_criminal_narrative_columns'),
+    ]
+
+    operations = [
+        # AlterField would MODIFY the columns straight to binary(16), mangling
+        # the hex text; convert the data (and the foreign keys) explicitly
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='archivedcrime',
+                    name='id',
+                    field=police_profiling.ids.BinaryUUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='crime',
+                    name='id',
+                    field=police_profiling.ids.BinaryUUIDField(default=police_profiling.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='criminal',
+                    name='id',
+                    field=police_profiling.ids.BinaryUUIDField(default=police_profiling.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='criminaldocument',
+                    name='id',
+                    field=police_profiling.ids.BinaryUUIDField(default=police_profiling.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='criminalevidence',
+                    name='id',
+                    field=police_profiling.ids.BinaryUUIDField(default=police_profiling.ids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(to_binary, to_text),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:10
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rollups(apps, schema_editor):
+    """Count existing active and archived crimes per day, type, status and location"""
+    CrimeDailyRollup = apps.get_model('police_profiling', 'CrimeDailyRollup')
+    counts = Counter()
+    for model_name in ('Crime', 'ArchivedCrime'):
+        model = apps.get_model('police_profiling', model_name)
+        rows = model.objects.order_by().values('date_committed', 'crime_type', 'status', 'location').annotate(n=Count('pk'))
+        for row in rows.iterator(chunk_size=2000):
+            counts[(row['date_committed'], row['crime_type'], row['status'], row['location'])] += row['n']
+
+    batch = []
+    for (day, crime_type, status, location), count in counts.items():
+        batch.append(CrimeDailyRollup(day=day, crime_type=crime_type, status=status, location=location, count=count))
+        if len(batch) >= 1000:
+            CrimeDailyRollup.objects.bulk_create(batch)
+            batch = []
+    CrimeDailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    # Batches of the backfill commit as they go instead of in one long transaction
+    atomic = False
+
+    dependencies = [
+        ('police_profiling', '0018_uuid7_binary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrimeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('crime_type', models.CharField(choices=[('THEFT', 'Theft'), ('ASSAULT', 'Assault'), ('BURGLARY', 'Burglary'), ('ROBBERY', 'Robbery'), ('DRUGS', 'Drug Offense'), ('FRAUD', 'Fraud'), ('HOMICIDE', 'Homicide'), ('OTHER', 'Other')], max_length=20)),
+                ('status', models.CharField(choices=[('OPEN', 'Open Investigation'), ('CLOSED', 'Case Closed'), ('CONVICTED', 'Convicted')], max_length=20)),
+                ('location', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['crime_type', 'day'], name='police_prof_crime_t_c49629_idx'), models.Index(fields=['location', 'day'], name='police_prof_locatio_30bc60_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'crime_type', 'status', 'location'), name='unique_crime_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
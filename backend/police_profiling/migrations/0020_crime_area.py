@@ -0,0 +1,103 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:41
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Frozen copy of models.location_area as it was when this migration was
+# written, so later changes to the app module can't change what it does
+
+
+def location_area(location):
+    words = re.findall(r"[^\W\d_]+(?:['-][^\W\d_]+)*", (location or '').rsplit(',', 1)[-1])
+    return ' '.join(words).title()[:100]
+
+
+def backfill_areas(apps, schema_editor):
+    """Derive the area of existing active and archived crimes, committing every batch"""
+    for model_name in ('Crime', 'ArchivedCrime'):
+        model = apps.get_model('police_profiling', model_name)
+        batch = []
+        for pk, location in model.objects.order_by('pk').values_list('pk', 'location').iterator(chunk_size=2000):
+            batch.append(model(pk=pk, area=location_area(location)))
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ['area'])
+                batch = []
+        model.objects.bulk_update(batch, ['area'])
+
+
+def clear_rollups(apps, schema_editor):
+    """Rollups keyed on the raw location are recounted per area below"""
+    apps.get_model('police_profiling', 'CrimeDailyRollup').objects.all().delete()
+
+
+def recount_rollups(apps, schema_editor):
+    """Count existing active and archived crimes per day, type, status and area"""
+    CrimeDailyRollup = apps.get_model('police_profiling', 'CrimeDailyRollup')
+    counts = Counter()
+    for model_name in ('Crime', 'ArchivedCrime'):
+        model = apps.get_model('police_profiling', model_name)
+        rows = model.objects.order_by().values('date_committed', 'crime_type', 'status', 'area').annotate(n=Count('pk'))
+        for row in rows.iterator(chunk_size=2000):
+            counts[(row['date_committed'], row['crime_type'], row['status'], row['area'])] += row['n']
+
+    batch = []
+    for (day, crime_type, status, area), count in counts.items():
+        batch.append(CrimeDailyRollup(day=day, crime_type=crime_type, status=status, area=area, count=count))
+        if len(batch) >= 1000:
+            CrimeDailyRollup.objects.bulk_create(batch)
+            batch = []
+    CrimeDailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    # Batches of the backfill commit as they go instead of in one long transaction
+    atomic = False
+
+    dependencies = [
+        ('police_profiling', '0019_crimedailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcrime',
+            name='area',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='crime',
+            name='area',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_areas, migrations.RunPython.noop),
+        migrations.RunPython(clear_rollups, clear_rollups),
+        migrations.RemoveConstraint(
+            model_name='crimedailyrollup',
+            name='unique_crime_rollup',
+        ),
+        migrations.RemoveIndex(
+            model_name='crimedailyrollup',
+            name='police_prof_locatio_30bc60_idx',
+        ),
+        migrations.RemoveField(
+            model_name='crimedailyrollup',
+            name='location',
+        ),
+        migrations.AddField(
+            model_name='crimedailyrollup',
+            name='area',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='crimedailyrollup',
+            index=models.Index(fields=['area', 'day'], name='police_prof_area_6e6511_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='crimedailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'crime_type', 'status', 'area'), name='unique_crime_rollup'),
+        ),
+        migrations.RunPython(recount_rollups, migrations.RunPython.noop),
+    ]
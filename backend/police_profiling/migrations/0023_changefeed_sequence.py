@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-19 16:02
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_entries(apps, schema_editor):
+    """Existing entries have long committed: their ids stay valid as tokens"""
+    ChangeLogEntry = apps.get_model('police_profiling', 'ChangeLogEntry')
+    ChangeFeedHead = apps.get_model('police_profiling', 'ChangeFeedHead')
+    ChangeLogEntry.objects.update(seq=F('id'))
+    last = ChangeLogEntry.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeFeedHead.objects.create(pk=1, last_seq=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('police_profiling', '0022_changelogentry_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='changelogentry',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_entries, migrations.RunPython.noop),
+    ]
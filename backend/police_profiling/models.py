@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
-import uuid
 import os
+import re
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .descriptors import parse_height, parse_weight
+from .ids import BinaryUUIDField, uuid7
 
 def criminal_image_path(instance, filename):
     return f'criminals/{instance.id}/images/{filename}'
@@ -13,6 +16,15 @@ def criminal_evidence_path(instance, filename):
 def criminal_documents_path(instance, filename):
     return f'criminals/{instance.id}/documents/{filename}'
 
+def location_area(location):
+    """
+    The place a free-text crime location is in: its last comma-separated part
+    ("12 Sam Nujoma Dr, Katutura, Windhoek" -> "Windhoek") without numbers or
+    punctuation. Crime rollups count per area, not per exact address.
+    """
+    words = re.findall(r"[^\W\d_]+(?:['-][^\W\d_]+)*", (location or '').rsplit(',', 1)[-1])
+    return ' '.join(words).title()[:100]
+
 class Criminal(models.Model):
     THREAT_LEVELS = [
         ('LOW', 'Low Threat'),
@@ -101,7 +113,7 @@ class Criminal(models.Model):
     ]
 
     # Basic Identification
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = BinaryUUIDField(primary_key=True, default=uuid7, editable=False)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     alias = models.CharField(max_length=100, blank=True, null=True)
@@ -113,12 +125,14 @@ class Criminal(models.Model):
     # Physical Description
     height = models.CharField(max_length=20, blank=True, null=True, help_text="Height in cm or feet/inches")
     weight = models.CharField(max_length=20, blank=True, null=True, help_text="Weight in kg or lbs")
+    # Parsed from height/weight on save, for range searches
+    height_cm = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, editable=False)
+    weight_kg = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, editable=False)
     eye_color = models.CharField(max_length=20, choices=EYE_COLOR_CHOICES, blank=True, null=True)
     hair_color = models.CharField(max_length=20, choices=HAIR_COLOR_CHOICES, blank=True, null=True)
     build = models.CharField(max_length=20, choices=BUILD_CHOICES, blank=True, null=True)
     complexion = models.CharField(max_length=20, choices=COMPLEXION_CHOICES, blank=True, null=True)
     distinguishing_marks = models.TextField(blank=True, null=True, help_text="Tattoos, scars, birthmarks, etc.")
-    physical_characteristics = models.TextField(blank=True, null=True)
     
     # Biometric Data
     fingerprint_code = models.CharField(max_length=50, blank=True, null=True, unique=True)
@@ -138,19 +152,10 @@ class Criminal(models.Model):
     
     # Criminal Profile
     threat_level = models.CharField(max_length=10, choices=THREAT_LEVELS, default='LOW')
-    criminal_history = models.TextField(blank=True, null=True, help_text="Summary of criminal history")
-    modus_operandi = models.TextField(blank=True, null=True, help_text="Criminal's methods and patterns")
     gang_affiliations = models.TextField(blank=True, null=True, help_text="Gang memberships or affiliations")
-    weapons_preference = models.TextField(blank=True, null=True, help_text="Preferred weapons or tools")
     escape_risk = models.BooleanField(default=False)
     violent_offender = models.BooleanField(default=False)
     
-    # Medical & Psychological
-    medical_conditions = models.TextField(blank=True, null=True)
-    psychological_profile = models.TextField(blank=True, null=True)
-    drug_use_history = models.TextField(blank=True, null=True)
-    alcohol_use_history = models.TextField(blank=True, null=True)
-    
     # Administrative
     profile_picture = models.ImageField(upload_to=criminal_image_path, null=True, blank=True)
     is_incarcerated = models.BooleanField(default=False)
@@ -165,6 +170,28 @@ class Criminal(models.Model):
     created_by = models.ForeignKey('PoliceOfficer', on_delete=models.SET_NULL, null=True, blank=True, related_name='created_criminals')
     last_updated_by = models.ForeignKey('PoliceOfficer', on_delete=models.SET_NULL, null=True, blank=True, related_name='updated_criminals')
     
+    def save(self, *args, **kwargs):
+        self.height_cm = parse_height(self.height)
+        self.weight_kg = parse_weight(self.weight)
+        update_fields = kwargs.get('update_fields')
+        narrative_fields = set()
+        if update_fields is not None:
+            narrative_fields = set(update_fields) & set(NARRATIVE_FIELDS)
+            kwargs['update_fields'] = (set(update_fields) - narrative_fields) | (
+                {'height_cm'} if 'height' in update_fields else set()
+            ) | ({'weight_kg'} if 'weight' in update_fields else set())
+        super().save(*args, **kwargs)
+        if self.__dict__.pop('_narrative_changed', False) or narrative_fields:
+            self.get_narrative().save()
+    
+    def get_narrative(self):
+        """The criminal's narrative row, or a blank unsaved one if there is none yet"""
+        try:
+            return self.narrative
+        except ObjectDoesNotExist:
+            self.narrative = CriminalNarrative(criminal=self)
+            return self.narrative
+    
     # Computed Properties
     @property
     def age(self):
@@ -180,7 +207,7 @@ class Criminal(models.Model):
     
     @property
     def crimes_count(self):
-        return self.crimes.count()
+        return self.crimes.count() + self.archived_crimes.count()
     
     @property
     def is_high_risk(self):
@@ -208,8 +235,51 @@ class Criminal(models.Model):
             models.Index(fields=['threat_level']),
             models.Index(fields=['is_incarcerated']),
             models.Index(fields=['created_at']),
+            # Release schedule: all facilities, and one facility, by date
+            models.Index(fields=['is_incarcerated', 'expected_release_date']),
+            models.Index(fields=['current_facility', 'expected_release_date']),
         ]
 
+# Rarely read long-form fields, kept out of the criminal table so list scans
+# and index lookups don't drag them through the buffer pool
+NARRATIVE_FIELDS = (
+    'physical_characteristics', 'criminal_history', 'modus_operandi', 'weapons_preference',
+    'medical_conditions', 'psychological_profile', 'drug_use_history', 'alcohol_use_history',
+)
+
+
+def _narrative_property(name):
+    """criminal.<name> reads and writes the field on the criminal's CriminalNarrative"""
+    def getter(criminal):
+        return getattr(criminal.get_narrative(), name)
+    
+    def setter(criminal, value):
+        setattr(criminal.get_narrative(), name, value)
+        criminal._narrative_changed = True
+    
+    return property(getter, setter)
+
+
+for _name in NARRATIVE_FIELDS:
+    setattr(Criminal, _name, _narrative_property(_name))
+Criminal.AUDITED_PROPERTIES = NARRATIVE_FIELDS
+
+class CriminalNarrative(models.Model):
+    """Narrative history and profile of a criminal, loaded only by detail views"""
+    criminal = models.OneToOneField(Criminal, on_delete=models.CASCADE, primary_key=True, related_name='narrative')
+    physical_characteristics = models.TextField(blank=True, null=True)
+    criminal_history = models.TextField(blank=True, null=True, help_text="Summary of criminal history")
+    modus_operandi = models.TextField(blank=True, null=True, help_text="Criminal's methods and patterns")
+    weapons_preference = models.TextField(blank=True, null=True, help_text="Preferred weapons or tools")
+    medical_conditions = models.TextField(blank=True, null=True)
+    psychological_profile = models.TextField(blank=True, null=True)
+    drug_use_history = models.TextField(blank=True, null=True)
+    alcohol_use_history = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Narrative of {self.criminal_id}"
+
 # Keep all other models EXACTLY the same as before:
 
 class PoliceOfficer(models.Model):
@@ -225,10 +295,17 @@ class PoliceOfficer(models.Model):
     rank = models.CharField(max_length=20, choices=RANK_CHOICES)
     station = models.CharField(max_length=100)
     is_active = models.BooleanField(default=False)  # Changed to False
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.badge_number} - {self.user.get_full_name()}"
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['station', 'rank']),
+            models.Index(fields=['is_active', 'rank']),
+        ]
+    
     @property
     def can_activate_users(self):
         """Check if this officer can activate other users"""
@@ -256,13 +333,17 @@ class CriminalEvidence(models.Model):
         ('OTHER', 'Other Evidence'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = BinaryUUIDField(primary_key=True, default=uuid7, editable=False)
     criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='evidence')
     evidence_type = models.CharField(max_length=20, choices=EVIDENCE_TYPES)
     file = models.FileField(upload_to=criminal_evidence_path)
     description = models.TextField(blank=True, null=True)
     date_collected = models.DateField(auto_now_add=True)
     collected_by = models.ForeignKey(PoliceOfficer, on_delete=models.SET_NULL, null=True, blank=True)
+    # Filled in by the evidence.sha256 background job after upload
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    file_size = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.criminal} - {self.evidence_type}"
@@ -277,7 +358,7 @@ class CriminalDocument(models.Model):
         ('OTHER', 'Other Document'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = BinaryUUIDField(primary_key=True, default=uuid7, editable=False)
     criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
     file = models.FileField(upload_to=criminal_documents_path)
@@ -285,6 +366,7 @@ class CriminalDocument(models.Model):
     description = models.TextField(blank=True, null=True)
     date_uploaded = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(PoliceOfficer, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.criminal} - {self.document_type}"
@@ -301,18 +383,322 @@ class Crime(models.Model):
         ('OTHER', 'Other'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    STATUS_CHOICES = [
+        ('OPEN', 'Open Investigation'),
+        ('CLOSED', 'Case Closed'),
+        ('CONVICTED', 'Convicted'),
+    ]
+    
+    id = BinaryUUIDField(primary_key=True, default=uuid7, editable=False)
     criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='crimes')
     crime_type = models.CharField(max_length=20, choices=CRIME_TYPES)
     description = models.TextField()
     date_committed = models.DateField()
     location = models.CharField(max_length=255)
+    # Derived from location on save (see location_area)
+    area = models.CharField(max_length=100, blank=True, editable=False)
     arresting_officer = models.ForeignKey(PoliceOfficer, on_delete=models.SET_NULL, null=True, blank=True)
-    status = models.CharField(max_length=20, choices=[
-        ('OPEN', 'Open Investigation'),
-        ('CLOSED', 'Case Closed'),
-        ('CONVICTED', 'Convicted'),
-    ], default='OPEN')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def save(self, *args, **kwargs):
+        self.area = location_area(self.location)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'area'}
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.criminal}: {self.crime_type}"
+    
+    class Meta:
+        indexes = [
+            # Finds archivable cases without scanning open investigations
+            models.Index(fields=['status', 'date_committed']),
+        ]
+
+class ArchivedCrime(models.Model):
+    """Closed or convicted case moved out of the hot Crime table by archive_cases"""
+    id = BinaryUUIDField(primary_key=True, editable=False)
+    criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='archived_crimes')
+    crime_type = models.CharField(max_length=20, choices=Crime.CRIME_TYPES)
+    description = models.TextField()
+    date_committed = models.DateField()
+    location = models.CharField(max_length=255)
+    area = models.CharField(max_length=100, blank=True, editable=False)
+    arresting_officer = models.ForeignKey(PoliceOfficer, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_crimes')
+    status = models.CharField(max_length=20, choices=Crime.STATUS_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+    archived_at = models.DateTimeField()
+    
+    def save(self, *args, **kwargs):
+        self.area = location_area(self.location)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'area'}
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.criminal}: {self.crime_type} (archived)"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['criminal', 'date_committed']),
+        ]
+
+class AuditLogEntry(models.Model):
+    """Append-only, field-level history of changes to criminal records"""
+    ACTIONS = [
+        ('CREATE', 'Created'),
+        ('UPDATE', 'Updated'),
+        ('DELETE', 'Deleted'),
+        ('ARCHIVE', 'Archived'),
+    ]
+    
+    model_name = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=36)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    field_name = models.CharField(max_length=100, blank=True)
+    old_value = models.TextField(blank=True, null=True)
+    new_value = models.TextField(blank=True, null=True)
+    changed_by = models.ForeignKey(PoliceOfficer, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_entries')
+    # Set when the change happens, not when the background writer flushes it
+    changed_at = models.DateTimeField()
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Audit log entries cannot be modified")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Audit log entries cannot be deleted")
+    
+    def __str__(self):
+        return f"{self.action} {self.model_name} {self.object_id} {self.field_name}".strip()
+    
+    class Meta:
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['model_name', 'object_id', 'changed_at']),
+            models.Index(fields=['changed_at']),
+        ]
+
+class ChangeLogEntry(models.Model):
+    """Monotonic sequence of inserts, updates and deletes, used for delta sync"""
+    ACTIONS = [
+        ('INSERT', 'Inserted'),
+        ('UPDATE', 'Updated'),
+        ('DELETE', 'Deleted'),
+        ('ARCHIVE', 'Archived'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    model_name = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=36)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    # Sync token, assigned in commit order by changefeed.sequence_committed()
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+    
+    def __str__(self):
+        return f"#{self.seq or '-'} {self.action} {self.model_name} {self.object_id}"
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['model_name', 'object_id']),
+        ]
+
+class ChangeFeedHead(models.Model):
+    """Single row holding the last sync token handed out; locked while numbering new entries"""
+    last_seq = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Change feed at {self.last_seq}"
+
+class Job(models.Model):
+    """Background job, claimed and run by `manage.py run_workers`"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)  # higher runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField()
+    # Visibility timeout: a RUNNING job whose lease expired is claimed again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(PoliceOfficer, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"#{self.id} {self.name} ({self.status})"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['status', 'locked_until']),
+        ]
+
+class WatchlistSubscription(models.Model):
+    """
+    An officer's alert rule: a specific criminal, or every criminal at one of
+    threat_levels (and, with escape_risk, every escape risk). Matching new
+    crimes are pushed to the officer's open watchlist streams.
+    """
+    officer = models.ForeignKey(PoliceOfficer, on_delete=models.CASCADE, related_name='watchlist')
+    criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, null=True, blank=True, related_name='watchers')
+    threat_levels = models.JSONField(default=list, blank=True)
+    escape_risk = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"{self.criminal}: {self.crime_type}"
\ No newline at end of file
+        if self.criminal_id:
+            return f"{self.officer} watches {self.criminal}"
+        return f"{self.officer} watches {', '.join(self.threat_levels) or 'no'} threat levels"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['officer', 'criminal'], name='unique_watch_per_criminal'),
+        ]
+
+class ContactIdentifier(models.Model):
+    """
+    One normalised phone number (E.164) or email address (lowercased) from a
+    criminal's phone_numbers/email_addresses, for reverse lookups. Derived
+    data: rebuilt from the JSON lists on save (see contacts.sync).
+    """
+    KIND_CHOICES = [
+        ('PHONE', 'Phone'),
+        ('EMAIL', 'Email'),
+    ]
+    
+    criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='contact_identifiers')
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    value = models.CharField(max_length=254)
+    raw = models.CharField(max_length=254, help_text="The entry as it was recorded")
+    
+    def __str__(self):
+        return f"{self.value} ({self.criminal_id})"
+    
+    class Meta:
+        constraints = [
+            # Leads with (kind, value), so it also serves exact and prefix lookups
+            models.UniqueConstraint(fields=['kind', 'value', 'criminal'], name='unique_contact_per_criminal'),
+        ]
+
+class ReleaseDigest(models.Model):
+    """
+    Precomputed list of one facility's releases due in the horizon_days after
+    digest_date, built nightly by the releases.build_digests job
+    """
+    digest_date = models.DateField()
+    facility = models.CharField(max_length=100, blank=True, help_text="Blank for criminals with no recorded facility")
+    horizon_days = models.PositiveSmallIntegerField()
+    total = models.PositiveIntegerField(default=0)
+    high_risk = models.PositiveIntegerField(default=0)
+    escape_risk = models.PositiveIntegerField(default=0)
+    releases = models.JSONField(default=list)
+    generated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.facility or 'Unknown facility'}: {self.total} releases from {self.digest_date}"
+    
+    class Meta:
+        ordering = ['digest_date', 'facility']
+        constraints = [
+            models.UniqueConstraint(fields=['digest_date', 'facility'], name='unique_release_digest'),
+        ]
+
+class ImageHash(models.Model):
+    """
+    Perceptual hashes of a profile picture or PHOTO evidence item, for finding
+    the same face registered under another name (see mugshots.py). Hashes are
+    64-bit, stored signed to fit BIGINT.
+    """
+    SOURCE_CHOICES = [
+        ('PROFILE', 'Profile picture'),
+        ('EVIDENCE', 'Photo evidence'),
+    ]
+    
+    criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='image_hashes')
+    evidence = models.OneToOneField(CriminalEvidence, on_delete=models.CASCADE, null=True, blank=True, related_name='image_hash')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    name = models.CharField(max_length=255, help_text="Storage name of the hashed file")
+    phash = models.BigIntegerField()
+    dhash = models.BigIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.source} hash of {self.name}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['criminal', 'source']),
+        ]
+
+class DocumentText(models.Model):
+    """
+    Text extracted from a CriminalDocument or text-bearing evidence file by the
+    documents.extract_text job, with its length in terms for relevance ranking
+    """
+    criminal = models.ForeignKey(Criminal, on_delete=models.CASCADE, related_name='document_texts')
+    document = models.OneToOneField(CriminalDocument, on_delete=models.CASCADE, null=True, blank=True, related_name='extracted_text')
+    evidence = models.OneToOneField(CriminalEvidence, on_delete=models.CASCADE, null=True, blank=True, related_name='extracted_text')
+    name = models.CharField(max_length=255, help_text="Storage name of the file the text came from")
+    text = models.TextField(blank=True)
+    length = models.PositiveIntegerField(default=0)
+    truncated = models.BooleanField(default=False)
+    extracted_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Text of {self.name}"
+
+class TextPosting(models.Model):
+    """How often term occurs in one extracted text (the inverted index)"""
+    term = models.CharField(max_length=64)
+    document_text = models.ForeignKey(DocumentText, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
+    
+    class Meta:
+        constraints = [
+            # Leads with term, so it also serves the per-term lookups of a search
+            models.UniqueConstraint(fields=['term', 'document_text'], name='unique_posting'),
+        ]
+
+class CrimeDailyRollup(models.Model):
+    """
+    Number of crimes (active and archived) committed on one day with one type,
+    status and area (see location_area). Kept current by the crime save/delete signals and
+    the bulk paths (see rollups.py), so trend queries sum these rows instead
+    of scanning Crime.
+    """
+    day = models.DateField()
+    crime_type = models.CharField(max_length=20, choices=Crime.CRIME_TYPES)
+    status = models.CharField(max_length=20, choices=Crime.STATUS_CHOICES)
+    area = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day} {self.crime_type}/{self.status} in {self.area}: {self.count}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'crime_type', 'status', 'area'], name='unique_crime_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['crime_type', 'day']),
+            models.Index(fields=['area', 'day']),
+        ]
@@ -0,0 +1,233 @@
+"""
+Near-duplicate mugshot search.
+
+Every profile picture and PHOTO evidence item gets two 64-bit perceptual
+hashes: a pHash (signs of the low-frequency DCT coefficients of a 32x32
+greyscale thumbnail) and a dHash (brightness gradients of a 9x8 thumbnail).
+Re-photographs of the same face differ in a handful of bits, so "same
+person?" becomes "Hamming distance under a threshold?".
+
+The pHashes live in a per-process BK-tree: a metric tree whose children are
+keyed by their distance to the parent, so the triangle inequality lets a
+search skip every subtree that cannot hold a match instead of comparing
+against every stored photo. dHash distance is reported alongside as a second
+opinion. New hashes are added to the live tree of every process as they
+appear; a BK-tree can't drop an entry, so deletes make every process rebuild.
+"""
+import io
+import math
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from police_db_system.db_routers import use_primary
+
+from .models import ImageHash
+
+HASH_BITS = 64
+DCT_SIZE = 32
+DCT_KEEP = 8
+
+# cos((2x + 1) * u * pi / 2N) for the coefficients pHash keeps
+_COSINES = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+    for u in range(DCT_KEEP)
+]
+
+
+def _greyscale(image, size):
+    from PIL import Image
+
+    return list(image.convert('L').resize(size, Image.Resampling.LANCZOS).getdata())
+
+
+def dhash(image):
+    """Difference hash: bit set where a pixel is brighter than its right-hand neighbour"""
+    pixels = _greyscale(image, (DCT_KEEP + 1, DCT_KEEP))
+    value = 0
+    for row in range(DCT_KEEP):
+        offset = row * (DCT_KEEP + 1)
+        for column in range(DCT_KEEP):
+            value = value << 1 | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def phash(image):
+    """DCT hash: bit set where a low-frequency coefficient is above their median"""
+    pixels = _greyscale(image, (DCT_SIZE, DCT_SIZE))
+    rows = [pixels[y * DCT_SIZE:(y + 1) * DCT_SIZE] for y in range(DCT_SIZE)]
+    # Separable 2-D DCT-II, computing only the DCT_KEEP x DCT_KEEP corner
+    row_coefficients = [
+        [sum(c * p for c, p in zip(_COSINES[u], row)) for u in range(DCT_KEEP)]
+        for row in rows
+    ]
+    coefficients = [
+        sum(_COSINES[v][y] * row_coefficients[y][u] for y in range(DCT_SIZE))
+        for v in range(DCT_KEEP)
+        for u in range(DCT_KEEP)
+    ]
+    # The DC term is overall brightness, not structure: keep it out of the median
+    median = sorted(coefficients[1:])[(len(coefficients) - 1) // 2]
+    value = 0
+    for coefficient in coefficients:
+        value = value << 1 | (coefficient > median)
+    return value
+
+
+def hash_bytes(data):
+    """(phash, dhash) of an encoded image; module-level so process pools can run it"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        upright = ImageOps.exif_transpose(image)
+        return phash(upright), dhash(upright)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def to_signed(value):
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes under Hamming distance"""
+    def __init__(self):
+        self.root = None
+        self.size = 0
+    
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+    
+    def search(self, value, radius):
+        """[(distance, item)] for every stored hash within radius of value"""
+        found = []
+        pending = [self.root] if self.root else []
+        while pending:
+            node_value, items, children = pending.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.extend((distance, item) for item in items)
+            # Only children at distance d with |d - distance| <= radius can match
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    pending.append(child)
+        return found
+
+
+class MugshotIndex:
+    """
+    The stored pHashes in a BK-tree. Rows with an id above the last settled
+    one are added in place on every search; the tree is rebuilt when another
+    process bumps the version after a delete.
+    """
+    version_key = 'mugshot_index_version'
+    
+    def __init__(self):
+        self.tree = BKTree()
+        self.ids = set()
+        self.settled_id = 0
+        self.version = None
+        self._lock = threading.Lock()
+    
+    def ensure_fresh(self):
+        version = cache.get(self.version_key, 0)
+        with self._lock, use_primary():
+            if version != self.version:
+                self.build(version)
+            else:
+                self._add(ImageHash.objects.filter(id__gt=self.settled_id), self.tree)
+    
+    def build(self, version):
+        tree = BKTree()
+        self.ids, self.settled_id = set(), 0
+        self._add(ImageHash.objects.all(), tree)
+        self.tree, self.version = tree, version
+    
+    def _add(self, queryset, tree):
+        # Ids are handed out before commit, so a lower one can still appear
+        # for a moment: only move past rows old enough to have committed
+        horizon = timezone.now() - timedelta(seconds=getattr(settings, 'MUGSHOT_INDEX_SETTLE_SECONDS', 2))
+        rows = queryset.order_by('id').values_list(
+            'id', 'phash', 'dhash', 'criminal_id', 'evidence_id', 'source', 'computed_at'
+        )
+        for pk, phash_value, dhash_value, criminal_id, evidence_id, source, computed_at in rows.iterator(chunk_size=5000):
+            if pk not in self.ids:
+                self.ids.add(pk)
+                tree.add(to_unsigned(phash_value), (to_unsigned(dhash_value), criminal_id, evidence_id, source))
+            if computed_at <= horizon:
+                self.settled_id = pk
+    
+    def search(self, phash_value, dhash_value, radius):
+        """Best match per criminal within radius pHash bits, closest first"""
+        self.ensure_fresh()
+        with self._lock:
+            found = self.tree.search(phash_value, radius)
+        best = {}
+        for distance, (stored_dhash, criminal_id, evidence_id, source) in found:
+            match = {
+                'criminal_id': criminal_id,
+                'phash_distance': distance,
+                'dhash_distance': hamming(dhash_value, stored_dhash),
+                'source': source,
+                'evidence_id': str(evidence_id) if evidence_id else None,
+            }
+            key = (match['phash_distance'], match['dhash_distance'])
+            current = best.get(criminal_id)
+            if current is None or key < (current['phash_distance'], current['dhash_distance']):
+                best[criminal_id] = match
+        return sorted(best.values(), key=lambda match: (match['phash_distance'], match['dhash_distance']))
+
+
+index = MugshotIndex()
+
+
+def bump_version():
+    """Tell every process its mugshot index is stale (after a delete)"""
+    try:
+        cache.incr(MugshotIndex.version_key)
+    except ValueError:
+        cache.add(MugshotIndex.version_key, 1, None)
+
+
+def match_distance():
+    return getattr(settings, 'MUGSHOT_MATCH_DISTANCE', 10)
+
+
+def store(criminal_id, name, hashes, evidence_id=None):
+    """Save the hashes of a profile picture (evidence_id None) or photo evidence item"""
+    phash_value, dhash_value = hashes
+    values = {'name': name, 'phash': to_signed(phash_value), 'dhash': to_signed(dhash_value)}
+    # The current picture replaces the old hash. Replacing means delete and
+    # insert, not update: the new row reaches the live trees as an insert and
+    # the delete signal has them rebuilt without the old one.
+    with transaction.atomic():
+        if evidence_id:
+            ImageHash.objects.filter(evidence_id=evidence_id).delete()
+            ImageHash.objects.create(evidence_id=evidence_id, criminal_id=criminal_id, source='EVIDENCE', **values)
+        else:
+            ImageHash.objects.filter(criminal_id=criminal_id, source='PROFILE').delete()
+            ImageHash.objects.create(criminal_id=criminal_id, source='PROFILE', **values)
@@ -0,0 +1,40 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+class RosterPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ArchivePagination(PageNumberPagination):
+    """Pages of active followed by archived cases (?include_archived=1)"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class ChainedRows:
+    """Two querysets paginated as one sequence, each read only for the slice it covers"""
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+        self._first_count = None
+    
+    def first_count(self):
+        if self._first_count is None:
+            self._first_count = self.first.count()
+        return self._first_count
+    
+    def count(self):
+        return self.first_count() + self.second.count()
+    
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("ChainedRows only supports slicing")
+        start, stop = index.start or 0, index.stop
+        split = self.first_count()
+        rows = list(self.first[start:min(stop, split)]) if start < split else []
+        if stop > split:
+            rows.extend(self.second[max(start - split, 0):stop - split])
+        return rows
@@ -0,0 +1,233 @@
+"""
+Daily crime rollups for trend queries.
+
+CrimeDailyRollup holds one count per (day, crime_type, status, area) over
+active and archived crimes. Every write that changes those columns applies
+its +1/-1 deltas in the same transaction: the Crime/ArchivedCrime signals for
+single saves and deletes, audit.audited_update for bulk updates. Archival
+moves a crime between the two tables without changing what it counts as, so
+it runs with rollups suspended. rebuild() recounts a date range from the
+crime tables and applies the difference as deltas, to backfill or repair
+drift without overwriting what concurrent writers add meanwhile.
+
+A trend query sums rollup rows, so its cost depends on the date range and the
+number of distinct types/statuses/areas, not on how many crimes exist.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+
+from police_db_system.db_routers import use_primary
+
+from .models import ArchivedCrime, Crime, CrimeDailyRollup
+
+# Crime columns that make up a rollup key, in key order
+FIELDS = ('date_committed', 'crime_type', 'status', 'area')
+KEY_FIELDS = ('day', 'crime_type', 'status', 'area')
+
+GROUPS = ('crime_type', 'status', 'area')
+INTERVALS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+
+_suspended = ContextVar('rollups_suspended', default=False)
+
+
+@contextmanager
+def suspended():
+    """Don't touch the rollups for writes made in the block (moves between the crime tables)"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def key(crime):
+    return tuple(getattr(crime, field) for field in FIELDS)
+
+
+def remember(crime, update_fields=None):
+    """Before a save: note the stored key so record_save can move the count off it"""
+    crime._rollup_key = None
+    if _suspended.get() or crime._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(FIELDS):
+        crime._rollup_key = key(crime)
+        return
+    crime._rollup_key = type(crime).objects.filter(pk=crime.pk).values_list(*FIELDS).first()
+
+
+def record_save(crime, created):
+    if _suspended.get():
+        return
+    deltas = Counter({key(crime): 1})
+    previous = None if created else getattr(crime, '_rollup_key', None)
+    if previous is not None:
+        deltas[previous] -= 1
+    apply(deltas)
+    crime._rollup_key = key(crime)
+
+
+def remember_delete(crime, origin=None):
+    """
+    Before a delete: note the stored key. Instances deleted by a cascade or
+    a queryset delete were just loaded; one deleted directly may be stale.
+    """
+    if _suspended.get():
+        return
+    if origin is crime:
+        crime._rollup_key = type(crime).objects.filter(pk=crime.pk).values_list(*FIELDS).first()
+    else:
+        crime._rollup_key = key(crime)
+
+
+def record_delete(crime):
+    if not _suspended.get() and getattr(crime, '_rollup_key', None) is not None:
+        apply({crime._rollup_key: -1})
+
+
+def count_keys(queryset):
+    """Counter of rollup keys over a Crime or ArchivedCrime queryset, grouped in the database"""
+    return Counter({
+        tuple(row[field] for field in FIELDS): row['n']
+        for row in queryset.order_by().values(*FIELDS).annotate(n=Count('pk'))
+    })
+
+
+def diff(before, after):
+    """Deltas that turn the before counts into the after counts"""
+    deltas = Counter(after)
+    deltas.subtract(before)
+    return deltas
+
+
+def apply(deltas):
+    """Add {key: delta} to the rollups, creating rows as needed"""
+    if _suspended.get():
+        return
+    # A fixed order keeps concurrent writers from deadlocking on each other's rows
+    for rollup_key, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        lookup = dict(zip(KEY_FIELDS, rollup_key))
+        if CrimeDailyRollup.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                CrimeDailyRollup.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Another writer created the row between our update and insert
+            CrimeDailyRollup.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+@contextmanager
+def _snapshot():
+    """
+    A transaction whose reads all see one snapshot, so the crime counts and
+    the stored rollups agree whatever commits in between. Django runs MySQL
+    at READ COMMITTED; only this transaction is raised to REPEATABLE READ.
+    """
+    connection = transaction.get_connection()
+    if connection.vendor == 'mysql' and not connection.in_atomic_block:
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+    with transaction.atomic():
+        yield
+
+
+def rebuild(start=None, end=None, chunk_days=31, dry_run=False, progress=None):
+    """
+    Recount the rollups for start..end (default: every crime date) from the
+    crime tables, one chunk of days per transaction. Returns
+    {'days', 'rows', 'changed'}: keys counted and keys whose count differed.
+
+    Each chunk reads the crimes and the rollups from one snapshot; every
+    writer changes both in one transaction, so their difference is exactly
+    the drift. It is applied as relative deltas, which commute with the
+    deltas of writes committed since the snapshot.
+    """
+    with use_primary():
+        if start is None:
+            firsts = [
+                model.objects.aggregate(first=Min('date_committed'))['first']
+                for model in (Crime, ArchivedCrime)
+            ] + [CrimeDailyRollup.objects.aggregate(first=Min('day'))['first']]
+            firsts = [first for first in firsts if first is not None]
+            if not firsts:
+                return {'days': 0, 'rows': 0, 'changed': 0}
+            start = min(firsts)
+        if end is None:
+            end = max(
+                value for value in (
+                    Crime.objects.order_by('-date_committed').values_list('date_committed', flat=True).first(),
+                    ArchivedCrime.objects.order_by('-date_committed').values_list('date_committed', flat=True).first(),
+                    CrimeDailyRollup.objects.order_by('-day').values_list('day', flat=True).first(),
+                    start,
+                ) if value is not None
+            )
+
+        totals = {'days': (end - start).days + 1, 'rows': 0, 'changed': 0}
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+            days = (chunk_start, chunk_end)
+            with _snapshot():
+                expected = count_keys(Crime.objects.filter(date_committed__range=days))
+                expected.update(count_keys(ArchivedCrime.objects.filter(date_committed__range=days)))
+                stored = Counter({
+                    tuple(row[field] for field in KEY_FIELDS): row['count']
+                    for row in CrimeDailyRollup.objects.filter(day__range=days).values(*KEY_FIELDS, 'count')
+                })
+                deltas = {rollup_key: delta for rollup_key, delta in diff(stored, expected).items() if delta}
+                totals['changed'] += len(deltas)
+                totals['rows'] += len(expected)
+                if not dry_run:
+                    apply(deltas)
+                    # The delete re-checks count on the latest row, so one a
+                    # writer has just incremented again is kept
+                    CrimeDailyRollup.objects.filter(day__range=days, count=0).delete()
+            if progress:
+                progress(chunk_end, totals)
+            chunk_start = chunk_end + timedelta(days=1)
+    return totals
+
+
+def trends(start, end, interval='month', group_by=(), filters=None):
+    """
+    Crime counts for start..end per interval period (or one total when
+    interval is None), split by the group_by columns. filters maps a group
+    column to the values to keep.
+    """
+    rollups = CrimeDailyRollup.objects.filter(day__range=(start, end))
+    for field, values in (filters or {}).items():
+        rollups = rollups.filter(**{f'{field}__in': values})
+
+    columns = list(group_by)
+    if not columns and not interval:
+        return [{'total': rollups.aggregate(total=Sum('count'))['total'] or 0}]
+    if interval:
+        truncate = INTERVALS[interval]
+        rollups = rollups.annotate(period=truncate('day') if truncate else F('day'))
+        columns.insert(0, 'period')
+    rows = rollups.order_by().values(*columns).annotate(total=Sum('count')).filter(total__gt=0).order_by(*columns)
+    return [
+        {**row, 'period': row['period'].isoformat()} if interval else row
+        for row in rows
+    ]
+
+
+def year_before(day):
+    """The same date a year earlier (29 February becomes the 28th)"""
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        return day.replace(year=day.year - 1, day=28)
@@ -1,7 +1,14 @@
+from datetime import date
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.password_validation import validate_password
-from .models import PoliceOfficer, Criminal, Crime, CriminalEvidence, CriminalDocument
+from django.urls import reverse
+from .models import (
+    PoliceOfficer, Criminal, Crime, ArchivedCrime, CriminalEvidence, CriminalDocument, AuditLogEntry, Job,
+    WatchlistSubscription
+)
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -86,6 +93,7 @@ class CriminalEvidenceSerializer(serializers.ModelSerializer):
     class Meta:
         model = CriminalEvidence
         fields = '__all__'
+        read_only_fields = ['sha256', 'file_size']
 
 class CriminalDocumentSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.__str__', read_only=True)
@@ -103,6 +111,15 @@ class CriminalSerializer(serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
     is_high_risk = serializers.ReadOnlyField()
     incarceration_status = serializers.ReadOnlyField()
+    # Stored on CriminalNarrative; Criminal proxies them as properties
+    physical_characteristics = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    criminal_history = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    modus_operandi = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    weapons_preference = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    medical_conditions = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    psychological_profile = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    drug_use_history = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    alcohol_use_history = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     
     class Meta:
         model = Criminal
@@ -110,7 +127,7 @@ class CriminalSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'created_by', 'last_updated_by']
     
     def get_crimes_count(self, obj):
-        return obj.crimes.count()
+        return obj.crimes_count
     
     def get_profile_picture_url(self, obj):
         if obj.profile_picture:
@@ -150,13 +167,69 @@ class CriminalListSerializer(serializers.ModelSerializer):
         ]
     
     def get_crimes_count(self, obj):
-        return obj.crimes.count()
+        return obj.crimes_count
     
     def get_profile_picture_url(self, obj):
         if obj.profile_picture:
             return obj.profile_picture.url
         return None
 
+# Columns the list shape is built from; everything else stays in the database
+CRIMINAL_LIST_COLUMNS = (
+    'id', 'first_name', 'last_name', 'alias', 'date_of_birth', 'gender',
+    'threat_level', 'is_incarcerated', 'profile_picture', 'created_at',
+)
+
+def count_related(model, field):
+    """Correlated count of model rows whose field points at the outer row"""
+    # A subquery keeps the outer query free of GROUP BY (and so keeps the
+    # model's default ordering)
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+def criminal_list_rows(queryset, extra_columns=()):
+    """Fetch the list columns as plain dicts, counting active and archived crimes in the same query"""
+    crimes_count = count_related(Crime, 'criminal') + count_related(ArchivedCrime, 'criminal')
+    return queryset.annotate(crimes_count=crimes_count).values(
+        *CRIMINAL_LIST_COLUMNS, *extra_columns, 'crimes_count'
+    )
+
+def serialize_criminal_rows(rows):
+    """
+    Fast-path equivalent of CriminalListSerializer(many=True).data for rows
+    from criminal_list_rows(). Produces the same keys, order and values
+    without building model instances or running field machinery per row.
+    """
+    today = date.today()
+    today_key = (today.month, today.day)
+    picture_url = Criminal._meta.get_field('profile_picture').storage.url
+    datetime_repr = serializers.DateTimeField().to_representation
+    
+    data = []
+    append = data.append
+    for row in rows:
+        born = row['date_of_birth']
+        picture = row['profile_picture']
+        created_at = row['created_at']
+        append({
+            'id': str(row['id']),
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'full_name': f"{row['first_name']} {row['last_name']}",
+            'alias': row['alias'],
+            'age': today.year - born.year - (today_key < (born.month, born.day)) if born else None,
+            'gender': row['gender'],
+            'threat_level': row['threat_level'],
+            'is_incarcerated': row['is_incarcerated'],
+            'crimes_count': row['crimes_count'],
+            'profile_picture_url': picture_url(picture) if picture else None,
+            'created_at': datetime_repr(created_at) if created_at else None,
+        })
+    return data
+
 class CrimeSerializer(serializers.ModelSerializer):
     criminal_name = serializers.CharField(source='criminal.__str__', read_only=True)
     arresting_officer_name = serializers.CharField(source='arresting_officer.__str__', read_only=True, allow_null=True)
@@ -165,6 +238,53 @@ class CrimeSerializer(serializers.ModelSerializer):
         model = Crime
         fields = '__all__'
 
+class ArchivedCrimeSerializer(serializers.ModelSerializer):
+    criminal_name = serializers.CharField(source='criminal.__str__', read_only=True)
+    arresting_officer_name = serializers.CharField(source='arresting_officer.__str__', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = ArchivedCrime
+        fields = '__all__'
+
+class AuditLogEntrySerializer(serializers.ModelSerializer):
+    changed_by_name = serializers.CharField(source='changed_by.__str__', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = AuditLogEntry
+        fields = '__all__'
+
+class JobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_after',
+                  'result', 'last_error', 'created_at', 'finished_at', 'status_url']
+    
+    def get_status_url(self, obj):
+        return reverse('job-status', args=[obj.pk])
+
+class WatchlistSubscriptionSerializer(serializers.ModelSerializer):
+    criminal_name = serializers.StringRelatedField(source='criminal', read_only=True)
+    
+    class Meta:
+        model = WatchlistSubscription
+        fields = ['id', 'criminal', 'criminal_name', 'threat_levels', 'escape_risk', 'created_at']
+    
+    def validate_threat_levels(self, value):
+        valid = {level for level, _ in Criminal.THREAT_LEVELS}
+        if not isinstance(value, list) or not set(value) <= valid:
+            raise serializers.ValidationError(f"Must be a list of: {', '.join(sorted(valid))}")
+        return sorted(set(value))
+    
+    def validate(self, data):
+        criminal = data.get('criminal', getattr(self.instance, 'criminal', None))
+        threat_levels = data.get('threat_levels', getattr(self.instance, 'threat_levels', []))
+        escape_risk = data.get('escape_risk', getattr(self.instance, 'escape_risk', False))
+        if criminal is None and not threat_levels and not escape_risk:
+            raise serializers.ValidationError("Watch a criminal, one or more threat levels, or escape risks")
+        return data
+
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True)
@@ -180,4 +300,5 @@ class CriminalSearchSerializer(serializers.Serializer):
     gender = serializers.ChoiceField(
         choices=Criminal.GENDER_CHOICES,
         required=False
-    )
\ No newline at end of file
+    )
+    facets = serializers.BooleanField(required=False, default=False)
\ No newline at end of file
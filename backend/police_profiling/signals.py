@@ -0,0 +1,120 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import audit, changefeed, contacts, descriptors, mugshots, rollups
+from .identity import invalidate_identity
+from .models import ArchivedCrime, Crime, Criminal, CriminalDocument, CriminalEvidence, ImageHash, PoliceOfficer
+
+
+@receiver(post_save, sender=PoliceOfficer)
+@receiver(post_delete, sender=PoliceOfficer)
+def invalidate_officer_identity(sender, instance, **kwargs):
+    """Drop the cached identity when an officer is activated, edited or removed"""
+    invalidate_identity(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_identity(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached identity when the user's name, password or state changes"""
+    # login() saves last_login on every sign-in; that is not part of the payload
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_identity(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_officer(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Officer names live on User: move the officer's updated_at so dossiers naming them are rebuilt"""
+    if raw or created or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    PoliceOfficer.objects.filter(user_id=instance.pk).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Criminal)
+def index_descriptors(sender, instance, raw=False, **kwargs):
+    """Keep this process's descriptor bitmaps current (others catch up from the change feed)"""
+    if raw:
+        return
+    descriptors.index.update(instance)
+
+
+@receiver(post_save, sender=Criminal)
+def sync_contact_identifiers(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Mirror the criminal's phone numbers and email addresses into the reverse lookup table"""
+    if raw or (update_fields is not None and not set(update_fields) & set(contacts.CONTACT_FIELDS)):
+        return
+    contacts.sync(instance)
+
+
+@receiver(post_delete, sender=Criminal)
+def unindex_descriptors(sender, instance, **kwargs):
+    descriptors.index.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Criminal)
+@receiver(post_delete, sender=Crime)
+@receiver(post_delete, sender=ArchivedCrime)
+@receiver(post_delete, sender=CriminalEvidence)
+@receiver(post_delete, sender=CriminalDocument)
+def record_audited_delete(sender, instance, **kwargs):
+    """Audit every delete, including a criminal's crimes, evidence and documents removed by the cascade"""
+    audit.record_delete(instance)
+
+
+@receiver(post_delete, sender=ImageHash)
+def unindex_mugshot(sender, instance, **kwargs):
+    """A BK-tree can't drop an entry: have every process rebuild once the delete commits"""
+    transaction.on_commit(mugshots.bump_version)
+
+
+@receiver(pre_save, sender=Crime)
+@receiver(pre_save, sender=ArchivedCrime)
+def remember_rollup_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        rollups.remember(instance, update_fields)
+
+
+@receiver(post_save, sender=Crime)
+@receiver(post_save, sender=ArchivedCrime)
+def update_crime_rollups(sender, instance, created, raw=False, **kwargs):
+    """Move the crime's count in the daily rollups to its current day/type/status/area"""
+    if not raw:
+        rollups.record_save(instance, created)
+
+
+@receiver(pre_delete, sender=Crime)
+@receiver(pre_delete, sender=ArchivedCrime)
+def remember_deleted_rollup_key(sender, instance, origin=None, **kwargs):
+    rollups.remember_delete(instance, origin)
+
+
+@receiver(post_delete, sender=Crime)
+@receiver(post_delete, sender=ArchivedCrime)
+def remove_from_crime_rollups(sender, instance, **kwargs):
+    rollups.record_delete(instance)
+
+
+def record_change(sender, instance, created=None, **kwargs):
+    """Append tracked model writes to the change feed"""
+    if kwargs.get('raw'):
+        return
+    if created is None:
+        action = 'DELETE'
+    else:
+        action = 'INSERT' if created else 'UPDATE'
+    changefeed.record(instance, action)
+
+
+@receiver(post_delete, sender=ArchivedCrime)
+def record_archived_crime_delete(sender, instance, **kwargs):
+    """Archived crimes keep their id, so clients see their deletes as crime tombstones"""
+    changefeed.record_many(Crime, [instance.pk], 'DELETE')
+
+
+for model in changefeed.TRACKED_MODELS:
+    post_save.connect(record_change, sender=model, dispatch_uid=f'changefeed_save_{model._meta.model_name}')
+    post_delete.connect(record_change, sender=model, dispatch_uid=f'changefeed_delete_{model._meta.model_name}')
@@ -0,0 +1,278 @@
+"""
+Modus-operandi similarity search.
+
+Each criminal is one document: their modus operandi, weapons preference and
+the descriptions of their crimes (active and archived). Documents are
+weighted with SMART lnc.ltc TF-IDF: a document's log term frequencies are
+cosine-normalised when it is indexed, and idf is applied on the query side
+only, so indexing one profile never reweights any other.
+
+The per-process index is an inverted list per term of (position, weight)
+pairs held in compact arrays; with numpy installed a query is a handful of
+vectorised scatter-adds over those arrays plus an argpartition for the top
+k, otherwise a dict accumulation and heapq. Edits are applied incrementally
+from the change feed: a replaced profile is tombstoned and appended again,
+and the index is rebuilt once tombstones pile up or every
+MO_INDEX_REBUILD_SECONDS (which also drops descriptions of deleted crimes,
+whose tombstone in the feed no longer says whose they were). Rebuilds run
+in a background thread and are swapped in whole; searches keep using the
+current index meanwhile and only the first one in a process waits.
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connections
+
+from police_db_system.db_routers import use_primary
+
+from . import changefeed
+from .fulltext import tokenize
+from .models import ArchivedCrime, Crime, CriminalNarrative
+
+try:
+    import numpy
+except ImportError:  # pure-Python scoring: same results, slower on large indexes
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# Rebuild once this share of positions are tombstones
+MAX_DEAD_RATIO = 0.25
+CHANGE_BATCH = 5000
+
+
+def _texts(criminal_ids=None):
+    """(criminal_id, text) for every criminal with MO text, in criminal_id order"""
+    sources = [
+        (CriminalNarrative, ('modus_operandi', 'weapons_preference')),
+        (Crime, ('description',)),
+        (ArchivedCrime, ('description',)),
+    ]
+    streams = []
+    for model, fields in sources:
+        rows = model.objects.all()
+        if criminal_ids is not None:
+            rows = rows.filter(criminal_id__in=criminal_ids)
+        streams.append(
+            rows.order_by('criminal_id').values_list('criminal_id', *fields).iterator(chunk_size=5000)
+        )
+    for criminal_id, rows in groupby(heapq.merge(*streams, key=itemgetter(0)), key=itemgetter(0)):
+        yield criminal_id, ' '.join(text for row in rows for text in row[1:] if text)
+
+
+def vector(text):
+    """Cosine-normalised log term frequencies of a document: {term: weight}"""
+    weights = {term: 1 + math.log(count) for term, count in Counter(tokenize(text)).items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: weight / norm for term, weight in weights.items()} if norm else {}
+
+
+class SimilarityIndex:
+    """
+    Position i stands for self.ids[i] while self.alive[i] is 1. Reads and
+    in-place updates run under the lock, which also keeps the arrays from
+    being resized while numpy is reading them; a rebuild fills a separate
+    instance and only takes the lock to swap its arrays in.
+    """
+    def __init__(self):
+        self.ids = []
+        self.positions = {}
+        self.alive = bytearray()
+        self.live = 0
+        self.postings = {}
+        self.token = None
+        self.built_at = 0.0
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+
+    def build(self):
+        """Index every profile into a fresh instance and swap it in"""
+        fresh = SimilarityIndex()
+        with use_primary():
+            # Changes after this token are applied on top; re-applying one the
+            # build already saw just reindexes that criminal again
+            fresh.token = changefeed.head_token()
+            for criminal_id, text in _texts():
+                fresh._add(criminal_id, vector(text))
+            # Catch up on what was written during the build before taking the lock
+            fresh.apply_changes()
+        with self._lock:
+            self.ids, self.positions, self.alive, self.live, self.postings = (
+                fresh.ids, fresh.positions, fresh.alive, fresh.live, fresh.postings
+            )
+            self.token = fresh.token
+            self.built_at = time.monotonic()
+
+    def _rebuild(self):
+        """Background rebuild; does nothing if one is already running"""
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Rebuilding the MO similarity index failed')
+        finally:
+            self._build_lock.release()
+            connections.close_all()
+
+    def _add(self, criminal_id, weights):
+        if not weights:
+            return
+        position = len(self.ids)
+        self.ids.append(criminal_id)
+        self.positions[criminal_id] = position
+        self.alive.append(1)
+        self.live += 1
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array('i'), array('f'))
+            postings[0].append(position)
+            postings[1].append(weight)
+
+    def _remove(self, criminal_id):
+        position = self.positions.pop(criminal_id, None)
+        if position is not None:
+            self.alive[position] = 0
+            self.live -= 1
+
+    def reindex(self, criminal_ids):
+        """Replace the documents of these criminals with what is stored now"""
+        criminal_ids = set(criminal_ids)
+        with self._lock:
+            for criminal_id in criminal_ids:
+                self._remove(criminal_id)
+            for criminal_id, text in _texts(criminal_ids):
+                self._add(criminal_id, vector(text))
+
+    def ensure_fresh(self):
+        if self.token is None:
+            # Nothing to search yet: the first searches wait for one build
+            with self._build_lock:
+                if self.token is None:
+                    self.build()
+        # Profiles are read from the primary like the feed itself, so a
+        # lagging replica can't hand back text older than the token
+        with self._lock, use_primary():
+            max_age = getattr(settings, 'MO_INDEX_REBUILD_SECONDS', 3600)
+            dead = len(self.ids) - self.live
+            if ((time.monotonic() - self.built_at >= max_age or dead > max(1000, len(self.ids) * MAX_DEAD_RATIO))
+                    and not self._build_lock.locked()):
+                threading.Thread(target=self._rebuild, name='mo-index-rebuild', daemon=True).start()
+            self.apply_changes()
+
+    def apply_changes(self):
+        """Reindex the criminals the change feed has touched since the last token"""
+        while True:
+            entries = list(
+                changefeed.settled_entries(self.token)
+                .filter(model_name__in=('criminal', 'crime'))
+                .values_list('seq', 'model_name', 'object_id', 'action')[:CHANGE_BATCH]
+            )
+            if not entries:
+                return
+            criminal_ids, deleted, crime_ids = set(), set(), set()
+            for _, model_name, object_id, action in entries:
+                if model_name == 'crime':
+                    # Archiving moves the description, not the criminal's text
+                    if action not in ('DELETE', 'ARCHIVE'):
+                        crime_ids.add(object_id)
+                elif action == 'DELETE':
+                    deleted.add(uuid.UUID(object_id))
+                else:
+                    criminal_ids.add(uuid.UUID(object_id))
+            if crime_ids:
+                criminal_ids.update(Crime.objects.filter(pk__in=crime_ids).values_list('criminal_id', flat=True))
+            for criminal_id in deleted:
+                self._remove(criminal_id)
+            self.reindex(criminal_ids - deleted)
+            self.token = entries[-1][0]
+            if len(entries) < CHANGE_BATCH:
+                return
+
+    def search(self, text, limit=20, exclude=()):
+        """[(score, criminal_id)] best first: cosine of the idf-weighted query with each profile"""
+        counts = Counter(tokenize(text))
+        self.ensure_fresh()
+        with self._lock:
+            terms = [term for term in counts if term in self.postings]
+            if not terms or not self.live:
+                return []
+            excluded = {self.positions[pk] for pk in exclude if pk in self.positions}
+            if numpy is not None:
+                best = self._search_numpy(counts, terms, limit, excluded)
+            else:
+                best = self._search_python(counts, terms, limit, excluded)
+            return [(score, self.ids[position]) for score, position in best]
+
+    def _idf(self, document_frequency):
+        return math.log((self.live + 1) / (document_frequency + 1)) + 1
+
+    def _query_weights(self, counts, frequencies):
+        weights = {
+            term: (1 + math.log(counts[term])) * self._idf(frequency)
+            for term, frequency in frequencies.items() if frequency
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {term: weight / norm for term, weight in weights.items()}
+
+    def _search_numpy(self, counts, terms, limit, excluded):
+        alive = numpy.frombuffer(self.alive, dtype=numpy.uint8).astype(bool)
+        arrays = {
+            term: (numpy.frombuffer(self.postings[term][0], dtype=numpy.int32),
+                   numpy.frombuffer(self.postings[term][1], dtype=numpy.float32))
+            for term in terms
+        }
+        frequencies = {term: int(numpy.count_nonzero(alive[positions])) for term, (positions, _) in arrays.items()}
+        query = self._query_weights(counts, frequencies)
+
+        scores = numpy.zeros(len(self.ids), dtype=numpy.float32)
+        for term, weight in query.items():
+            positions, weights = arrays[term]
+            # A term lists each position at most once, so fancy-index += is safe
+            scores[positions] += weights * numpy.float32(weight)
+        for position in excluded:
+            alive[position] = False
+        scores[~alive] = 0
+        k = min(limit, int(numpy.count_nonzero(scores)))
+        if not k:
+            return []
+        top = numpy.argpartition(scores, -k)[-k:]
+        top = top[numpy.argsort(-scores[top], kind='stable')]
+        return [(float(scores[position]), int(position)) for position in top]
+
+    def _search_python(self, counts, terms, limit, excluded):
+        alive = self.alive
+        live = {
+            term: [(position, weight) for position, weight in zip(*self.postings[term]) if alive[position]]
+            for term in terms
+        }
+        query = self._query_weights(counts, {term: len(postings) for term, postings in live.items()})
+        scores = {}
+        for term, weight in query.items():
+            for position, document_weight in live[term]:
+                scores[position] = scores.get(position, 0.0) + document_weight * weight
+        for position in excluded:
+            scores.pop(position, None)
+        return heapq.nlargest(limit, ((score, position) for position, score in scores.items()))
+
+
+index = SimilarityIndex()
+
+
+def shared_terms(text, criminal_ids):
+    """{criminal_id: [query terms found in their MO text]}, to show why each suspect matched"""
+    terms = set(tokenize(text))
+    return {
+        criminal_id: sorted(terms.intersection(tokenize(document)))
+        for criminal_id, document in _texts(criminal_ids)
+    }
@@ -0,0 +1,202 @@
+"""Background jobs run by ``manage.py run_workers``"""
+import csv
+import hashlib
+import io
+import tempfile
+from datetime import date
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+from . import audit, dossier, fulltext, mugshots, releases
+from .jobs import enqueue, task
+from .models import Criminal, CriminalDocument, CriminalEvidence
+
+PROFILE_PICTURE_MAX_SIZE = (1200, 1200)
+EXIF_ORIENTATION = 0x0112
+
+EXPORT_COLUMNS = (
+    'id', 'first_name', 'last_name', 'alias', 'date_of_birth', 'gender', 'nationality',
+    'threat_level', 'is_incarcerated', 'current_facility', 'expected_release_date', 'created_at',
+)
+
+
+@task('criminals.process_profile_picture')
+def process_profile_picture(criminal_id, name):
+    """Rotate an uploaded profile picture upright and shrink it to PROFILE_PICTURE_MAX_SIZE"""
+    from PIL import Image, ImageOps
+
+    criminal = Criminal.objects.filter(pk=criminal_id).only('profile_picture').first()
+    if criminal is None or criminal.profile_picture.name != name:
+        # Deleted or replaced since the job was queued; the newer upload has its own job
+        return {'skipped': True}
+
+    with default_storage.open(name) as source, Image.open(source) as image:
+        image_format = image.format or 'JPEG'
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        if not rotated and image.width <= PROFILE_PICTURE_MAX_SIZE[0] and image.height <= PROFILE_PICTURE_MAX_SIZE[1]:
+            queue_perceptual_hash(criminal_id, name)
+            return {'resized': False}
+        upright = ImageOps.exif_transpose(image)
+        upright.thumbnail(PROFILE_PICTURE_MAX_SIZE)
+        if image_format == 'JPEG' and upright.mode != 'RGB':
+            upright = upright.convert('RGB')
+        buffer = io.BytesIO()
+        upright.save(buffer, format=image_format, quality=85)
+
+    # The original stays until the row points at the resized copy (the name
+    # is taken, so storage picks a fresh one), so the picture never goes missing
+    new_name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    if not audit.audited_update(Criminal.objects.filter(pk=criminal_id, profile_picture=name), profile_picture=new_name):
+        # Replaced while we were resizing; the newer upload has its own job
+        default_storage.delete(new_name)
+        return {'skipped': True}
+    default_storage.delete(name)
+    queue_perceptual_hash(criminal_id, new_name)
+    return {'resized': True, 'size': list(upright.size)}
+
+
+def queue_perceptual_hash(criminal_id, name, evidence_id=None):
+    enqueue(
+        'images.perceptual_hash',
+        {'criminal_id': str(criminal_id), 'name': name, 'evidence_id': evidence_id},
+        priority=5,
+        idempotency_key=f'perceptual-hash:{evidence_id or criminal_id}:{name}',
+    )
+
+
+@task('images.perceptual_hash')
+def perceptual_hash(criminal_id, name, evidence_id=None):
+    """Hash a profile picture or photo evidence item for mugshot matching"""
+    if evidence_id:
+        current = CriminalEvidence.objects.filter(pk=evidence_id).values_list('file', flat=True).first()
+    else:
+        current = Criminal.objects.filter(pk=criminal_id).values_list('profile_picture', flat=True).first()
+    if current != name:
+        # Deleted or replaced since the job was queued
+        return {'skipped': True}
+
+    with default_storage.open(name) as source:
+        hashes = mugshots.hash_bytes(source.read())
+    mugshots.store(criminal_id, name, hashes, evidence_id)
+    return {'phash': f'{hashes[0]:016x}', 'dhash': f'{hashes[1]:016x}'}
+
+
+@task('evidence.sha256')
+def hash_evidence(evidence_id):
+    """Store the SHA-256 and size of an evidence file for chain-of-custody checks"""
+    evidence = CriminalEvidence.objects.filter(pk=evidence_id).only('file').first()
+    if evidence is None or not evidence.file:
+        return {'skipped': True}
+
+    digest = hashlib.sha256()
+    size = 0
+    with evidence.file.open('rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    audit.audited_update(CriminalEvidence.objects.filter(pk=evidence_id), sha256=digest.hexdigest(), file_size=size)
+    return {'sha256': digest.hexdigest(), 'size': size}
+
+
+@task('exports.criminals_csv', timeout=1800)
+def export_criminals_csv(filters=None):
+    """Write the criminal register (optionally filtered) to a CSV file in storage"""
+    queryset = Criminal.objects.filter(**(filters or {})).order_by('last_name', 'first_name')
+    rows = 0
+    with tempfile.TemporaryFile() as spool:
+        text = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        for values in queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=2000):
+            writer.writerow(values)
+            rows += 1
+        text.flush()
+        text.detach()
+        spool.seek(0)
+        name = default_storage.save(f'exports/criminals-{timezone.now():%Y%m%d-%H%M%S}.csv', File(spool))
+    return {'path': name, 'url': default_storage.url(name), 'rows': rows}
+
+
+@task('maintenance.analyze_tables', max_attempts=1, timeout=3600)
+def analyze_tables():
+    """Refresh the optimizer's index statistics for this app's tables"""
+    from django.apps import apps
+
+    tables = [model._meta.db_table for model in apps.get_app_config('police_profiling').get_models()]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE ' + ', '.join(connection.ops.quote_name(table) for table in tables))
+            cursor.fetchall()
+        else:
+            cursor.execute('ANALYZE')
+    return {'tables': len(tables)}
+
+
+@task('releases.build_digests', timeout=1800)
+def build_release_digests(day=None, days=None):
+    """
+    Precompute today's per-facility release digests. Queue it nightly, e.g.
+    from cron: manage.py enqueue_job releases.build_digests --idempotency-key release-digests-$(date +%F)
+    """
+    facilities = releases.build_digests(date.fromisoformat(day) if day else None, days)
+    return {'facilities': facilities}
+
+
+def queue_text_extraction(name, document_id=None, evidence_id=None, force=False):
+    """
+    Queue full-text indexing of a document or evidence file. A file in a
+    format we can't read takes the text of the file it replaced out of search.
+    """
+    if not fulltext.is_extractable(name):
+        fulltext.unindex(document_id, evidence_id)
+        return None
+    return enqueue(
+        'documents.extract_text',
+        {'name': name, 'document_id': document_id, 'evidence_id': evidence_id},
+        priority=5,
+        # force re-extracts a file whose earlier job already finished
+        idempotency_key=None if force else f'extract-text:{document_id or evidence_id}:{name}',
+    )
+
+
+@task('documents.extract_text', timeout=900)
+def extract_text(name, document_id=None, evidence_id=None):
+    """Extract a document's or evidence file's text and (re)index it for full-text search"""
+    model = CriminalDocument if document_id else CriminalEvidence
+    record = model.objects.filter(pk=document_id or evidence_id).values('criminal_id', 'file').first()
+    if record is None or record['file'] != name:
+        # Deleted or replaced since the job was queued
+        return {'skipped': True}
+
+    with default_storage.open(name) as source:
+        text, truncated = fulltext.extract(source, name)
+    document_text = fulltext.index(record['criminal_id'], name, text, truncated, document_id, evidence_id)
+    return {'characters': len(text), 'terms': document_text.length, 'truncated': truncated}
+
+
+def queue_dossier_pdf(criminal_id, dossier_version, officer=None):
+    return enqueue(
+        'dossiers.render_pdf',
+        {'criminal_id': str(criminal_id), 'version': dossier_version},
+        priority=3,
+        idempotency_key=f'dossier-pdf:{criminal_id}:{dossier_version}',
+        officer=officer,
+    )
+
+
+@task('dossiers.render_pdf', timeout=600)
+def render_dossier_pdf(criminal_id, version):
+    """Render a criminal's dossier to PDF and keep it in storage under its version"""
+    criminal = dossier.load(criminal_id)
+    if criminal is None:
+        return {'skipped': True}
+    # The record may have changed since the job was queued: render what it is now
+    payload = dossier.build(criminal)
+    current = dossier.version(payload)
+    name = dossier.pdf_name(criminal_id, current)
+    if not default_storage.exists(name):
+        name = dossier.store_pdf(criminal_id, current, dossier.render_pdf(criminal, payload))
+    return {'file': name, 'version': current, 'stale': current != version}
@@ -1,3 +1,1259 @@
-from django.test import TestCase
+import gzip
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import uuid
+import zipfile
+from collections import Counter
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image, ImageOps
+from rest_framework.renderers import JSONRenderer
+
+from police_db_system import db_routers
+from police_db_system.db_backends.mysql_pool.pool import ConnectionPool, PoolTimeout
+
+from . import alerts, archive, audit, changefeed, contacts, dashboard, descriptors, dossier, facets, fulltext, ids, jobs, mugshots, releases, rollups, similarity, snapshots, tasks
+from .identity import cached_identity
+from .middleware import COMPRESSORS, CompressionMiddleware, ReplicaRoutingMiddleware, negotiate_encoding
+from .renderers import FastJSONRenderer
+from .serializers import CriminalListSerializer, criminal_list_rows, serialize_criminal_rows
+from .ids import BinaryUUIDField, uuid7
+from .throttling import LoginRateLimiter
+from .models import (
+    ArchivedCrime, AuditLogEntry, ChangeLogEntry, ContactIdentifier, Crime, CrimeDailyRollup, Criminal, CriminalDocument, CriminalEvidence, CriminalNarrative, Job,
+    PoliceOfficer, ReleaseDigest, WatchlistSubscription, location_area,
+)
+
+# Just enough of a MySQL connection for BinaryUUIDField to pick binary(16)
+MYSQL = SimpleNamespace(
+    vendor='mysql',
+    data_types={'UUIDField': 'char(32)'},
+    features=SimpleNamespace(has_native_uuid_field=False),
+)
+
+
+
+def make_officer(badge_number='NAM-001', station='Windhoek Central', rank='SERGEANT', is_active=True):
+    user = User.objects.create_user(username=badge_number.lower())
+    return PoliceOfficer.objects.create(user=user, badge_number=badge_number, rank=rank, station=station, is_active=is_active)
+
+
+class UUID7Tests(SimpleTestCase):
+    def test_version_and_variant(self):
+        value = uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+
+    def test_strictly_increasing(self):
+        values = [uuid7() for _ in range(10000)]
+        self.assertEqual(values, sorted(set(values)))
+
+    def test_increasing_when_counter_runs_out_within_one_millisecond(self):
+        with mock.patch.object(ids.time, 'time_ns', return_value=4_000_000_000_000_000_000):
+            values = [uuid7() for _ in range(ids.COUNTER_MAX * 2)]
+        self.assertEqual(values, sorted(set(values)))
+
+    def test_timestamp_prefix(self):
+        with mock.patch.object(ids.time, 'time_ns', return_value=5_000_000_000_000_000_000):
+            value = uuid7()
+        self.assertEqual(value.int >> 80, 5_000_000_000_000)
+
+
+class BinaryUUIDFieldTests(SimpleTestCase):
+    def test_binary_column_on_mysql(self):
+        self.assertEqual(BinaryUUIDField().db_type(MYSQL), 'binary(16)')
+        # Foreign keys repeat the key in the same 16 bytes
+        self.assertEqual(Crime._meta.get_field('criminal').db_type(MYSQL), 'binary(16)')
+
+    def test_round_trip(self):
+        field = BinaryUUIDField()
+        value = uuid7()
+        stored = field.get_db_prep_value(value, MYSQL)
+        self.assertEqual(stored, value.bytes)
+        self.assertEqual(field.from_db_value(stored, None, MYSQL), value)
+        self.assertEqual(field.from_db_value(memoryview(stored), None, MYSQL), value)
+        self.assertIsNone(field.get_db_prep_value(None, MYSQL))
+        self.assertIsNone(field.from_db_value(None, None, MYSQL))
+
+    def test_string_ids_are_converted(self):
+        value = uuid7()
+        self.assertEqual(BinaryUUIDField().get_db_prep_value(str(value), MYSQL), value.bytes)
+        self.assertEqual(Crime._meta.get_field('criminal').get_db_prep_value(str(value), MYSQL), value.bytes)
+        self.assertEqual(Crime._meta.get_field('criminal').get_db_prep_value(value.hex, MYSQL), value.bytes)
+
+
+class StringIdLookupTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(first_name='Jonas', last_name='Shikongo')
+        self.crime = Crime.objects.create(
+            criminal=self.criminal, crime_type='THEFT', description='Stole a bicycle',
+            date_committed=date(2025, 3, 1), location='Windhoek',
+        )
+
+    def test_new_rows_get_uuid7_keys(self):
+        self.assertEqual(self.criminal.pk.version, 7)
+        self.assertEqual(self.crime.pk.version, 7)
+
+    def test_lookups_by_string_id(self):
+        self.assertEqual(Criminal.objects.get(pk=str(self.criminal.pk)), self.criminal)
+        self.assertEqual(list(Crime.objects.filter(criminal=str(self.criminal.pk))), [self.crime])
+        self.assertEqual(list(Crime.objects.filter(criminal_id__in=[str(self.criminal.pk)])), [self.crime])
+        self.assertEqual(Crime.objects.get(pk=str(self.crime.pk)).criminal_id, self.criminal.pk)
+
+
+class NarrativeTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(first_name='Maria', last_name='Nghipondoka')
+
+    def test_narrative_only_edit_saves_the_narrative_row(self):
+        criminal = Criminal.objects.get(pk=self.criminal.pk)
+        criminal.modus_operandi = 'Forces rear windows at night'
+        criminal.save()
+        self.assertEqual(
+            CriminalNarrative.objects.get(pk=self.criminal.pk).modus_operandi, 'Forces rear windows at night'
+        )
+
+    def test_narrative_only_update_fields(self):
+        criminal = Criminal.objects.get(pk=self.criminal.pk)
+        criminal.weapons_preference = 'Crowbar'
+        criminal.save(update_fields=['weapons_preference'])
+        self.assertEqual(CriminalNarrative.objects.get(pk=self.criminal.pk).weapons_preference, 'Crowbar')
+
+    def test_existing_narrative_is_updated_in_place(self):
+        self.criminal.criminal_history = 'First offence'
+        self.criminal.save()
+        criminal = Criminal.objects.get(pk=self.criminal.pk)
+        criminal.criminal_history = 'Second offence'
+        criminal.save()
+        self.assertEqual(CriminalNarrative.objects.filter(pk=self.criminal.pk).count(), 1)
+        self.assertEqual(CriminalNarrative.objects.get(pk=self.criminal.pk).criminal_history, 'Second offence')
+
+
+class CrimeRollupTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(first_name='Petrus', last_name='Amukoto')
+
+    def crime(self, **fields):
+        return Crime.objects.create(**{
+            'criminal': self.criminal,
+            'crime_type': 'BURGLARY',
+            'description': 'Forced the rear window',
+            'date_committed': date(2025, 6, 1),
+            'location': '12 Sam Nujoma Dr, Katutura, Windhoek',
+            **fields,
+        })
+
+    def counts(self):
+        return Counter({
+            tuple(row[field] for field in rollups.KEY_FIELDS): row['count']
+            for row in CrimeDailyRollup.objects.values(*rollups.KEY_FIELDS, 'count') if row['count']
+        })
+
+    def test_location_area(self):
+        self.assertEqual(location_area('12 Sam Nujoma Dr, Katutura, Windhoek'), 'Windhoek')
+        self.assertEqual(location_area('Erf 1021, KEETMANSHOOP 9000.'), 'Keetmanshoop')
+        self.assertEqual(location_area("o'kahandja"), "O'Kahandja")
+        self.assertEqual(location_area(None), '')
+
+    def test_create(self):
+        self.crime()
+        self.crime()
+        self.assertEqual(self.counts(), {(date(2025, 6, 1), 'BURGLARY', 'OPEN', 'Windhoek'): 2})
+
+    def test_update_moves_the_count(self):
+        crime = self.crime()
+        crime.status = 'CLOSED'
+        crime.location = 'Main Road, Oshakati'
+        crime.save()
+        self.assertEqual(self.counts(), {(date(2025, 6, 1), 'BURGLARY', 'CLOSED', 'Oshakati'): 1})
+
+    def test_update_fields_and_stale_instance(self):
+        crime = self.crime()
+        stale = Crime.objects.get(pk=crime.pk)
+        crime.date_committed = date(2025, 6, 2)
+        crime.save(update_fields=['date_committed'])
+        stale.delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_bulk_update(self):
+        self.crime()
+        self.crime(crime_type='THEFT')
+        audit.audited_update(Crime.objects.filter(crime_type='BURGLARY'), status='CONVICTED')
+        self.assertEqual(self.counts(), {
+            (date(2025, 6, 1), 'BURGLARY', 'CONVICTED', 'Windhoek'): 1,
+            (date(2025, 6, 1), 'THEFT', 'OPEN', 'Windhoek'): 1,
+        })
+
+    def test_delete(self):
+        crime = self.crime()
+        self.crime(crime_type='ROBBERY')
+        crime.delete()
+        self.assertEqual(self.counts(), {(date(2025, 6, 1), 'ROBBERY', 'OPEN', 'Windhoek'): 1})
+
+    def test_cascade_delete(self):
+        self.crime()
+        self.crime(date_committed=date(2025, 7, 1))
+        other = Criminal.objects.create(first_name='Anna', last_name='Haufiku')
+        Crime.objects.create(
+            criminal=other, crime_type='FRAUD', description='Forged cheques',
+            date_committed=date(2025, 6, 1), location='Rundu',
+        )
+        self.criminal.delete()
+        self.assertEqual(self.counts(), {(date(2025, 6, 1), 'FRAUD', 'OPEN', 'Rundu'): 1})
+
+    def test_rebuild_repairs_drift(self):
+        self.crime()
+        CrimeDailyRollup.objects.update(count=5)
+        CrimeDailyRollup.objects.create(day=date(2025, 6, 1), crime_type='THEFT', status='OPEN', area='Rundu', count=2)
+        expected = {(date(2025, 6, 1), 'BURGLARY', 'OPEN', 'Windhoek'): 1}
+        self.assertEqual(rollups.rebuild()['changed'], 2)
+        self.assertEqual(self.counts(), expected)
+        self.assertEqual(rollups.rebuild()['changed'], 0)
+
+
+@override_settings(AUDIT_LOG={'ASYNC': False})
+class AuditTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(first_name='Selma', last_name='Iipinge')
+        self.crime = Crime.objects.create(
+            criminal=self.criminal, crime_type='FRAUD', description='Forged cheques', status='CLOSED',
+            date_committed=date(2020, 1, 1), location='Walvis Bay',
+        )
+        self.evidence = CriminalEvidence.objects.create(
+            criminal=self.criminal, evidence_type='DOCUMENT', description='Cheque book',
+        )
+
+    def actions(self):
+        return set(AuditLogEntry.objects.values_list('model_name', 'object_id', 'action'))
+
+    def test_cascade_deletes_are_audited(self):
+        criminal_id = self.criminal.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criminal.delete()
+        self.assertEqual(self.actions(), {
+            ('Criminal', str(criminal_id), 'DELETE'),
+            ('Crime', str(self.crime.pk), 'DELETE'),
+            ('CriminalEvidence', str(self.evidence.pk), 'DELETE'),
+        })
+
+    def test_archive_is_audited_as_archive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive.archive_cases(date(2021, 1, 1)), 1)
+        self.assertEqual(self.actions(), {('Crime', str(self.crime.pk), 'ARCHIVE')})
+        self.assertTrue(ArchivedCrime.objects.filter(pk=self.crime.pk).exists())
+
+    def test_bulk_update_is_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            audit.audited_update(Criminal.objects.filter(pk=self.criminal.pk), alias='Sel')
+        entry = AuditLogEntry.objects.get()
+        self.assertEqual((entry.action, entry.field_name, entry.new_value), ('UPDATE', 'alias', 'Sel'))
+
+    def test_failed_batches_are_spilled_and_replayed(self):
+        entries = [audit._entry(Criminal, self.criminal.pk, 'UPDATE', None, 'alias', None, 'Sel')]
+        with tempfile.TemporaryDirectory() as spill_dir:
+            writer = audit.AuditWriter(10, 1.0, retries=2, spill_dir=spill_dir)
+            with mock.patch.object(AuditLogEntry.objects, 'bulk_create', side_effect=DatabaseError), \
+                    mock.patch.object(audit.time, 'sleep'), self.assertLogs(audit.logger, 'WARNING'):
+                self.assertFalse(writer._write(entries))
+            self.assertEqual(os.listdir(spill_dir), [f'{os.getpid()}.jsonl'])
+            self.assertFalse(AuditLogEntry.objects.exists())
+
+            self.assertEqual(writer.replay_spilled(), 1)
+            self.assertEqual(os.listdir(spill_dir), [])
+        entry = AuditLogEntry.objects.get()
+        self.assertEqual((entry.object_id, entry.field_name, entry.new_value), (str(self.criminal.pk), 'alias', 'Sel'))
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.officer = make_officer()
+        self.client.force_login(self.officer.user)
+        self.criminal = Criminal.objects.create(first_name='Tomas', last_name='Nangolo')
+        self.old = Crime.objects.create(
+            criminal=self.criminal, crime_type='THEFT', description='Stole cattle', status='CONVICTED',
+            date_committed=date(2019, 5, 1), location='Gobabis', arresting_officer=self.officer,
+        )
+        self.open = Crime.objects.create(
+            criminal=self.criminal, crime_type='ASSAULT', description='Bar fight',
+            date_committed=date(2025, 5, 1), location='Gobabis', arresting_officer=self.officer,
+        )
+
+    def test_archive_moves_closed_cases(self):
+        self.assertEqual(archive.archive_cases(date(2021, 1, 1)), 1)
+        self.assertEqual(list(Crime.objects.all()), [self.open])
+        archived = ArchivedCrime.objects.get()
+        self.assertEqual((archived.pk, archived.description, archived.area), (self.old.pk, 'Stole cattle', 'Gobabis'))
+
+    def test_change_feed_reports_the_archive(self):
+        archive.archive_cases(date(2021, 1, 1))
+        changes, _, _ = changefeed.changes_since(0, 100)
+        crimes = {change['id']: change for change in changes if change['type'] == 'crime'}
+        self.assertEqual(crimes[str(self.old.pk)]['op'], 'archive')
+        self.assertIsNotNone(crimes[str(self.old.pk)]['data']['archived_at'])
+        self.assertEqual(crimes[str(self.open.pk)]['op'], 'upsert')
+
+        token = changefeed.head_token()
+        self.criminal.delete()
+        changes, _, _ = changefeed.changes_since(token, 100)
+        self.assertIn(
+            {'seq': mock.ANY, 'type': 'crime', 'id': str(self.old.pk), 'op': 'delete'}, changes
+        )
+
+    def test_totals_include_archived_crimes(self):
+        archive.archive_cases(date(2021, 1, 1))
+        self.assertEqual(Criminal.objects.get().crimes_count, 2)
+        rows = self.client.get('/api/criminals/').json()
+        rows = rows['results'] if isinstance(rows, dict) else rows
+        self.assertEqual(rows[0]['crimes_count'], 2)
+        summary = self.client.get('/api/officers/station_summary/').json()
+        self.assertEqual(summary[0]['arrests'], 2)
+
+    def test_include_archived_is_paginated(self):
+        archive.archive_cases(date(2021, 1, 1))
+        first = self.client.get('/api/crimes/', {'include_archived': 1, 'page_size': 1}).json()
+        self.assertEqual(first['count'], 2)
+        self.assertEqual([row['id'] for row in first['results']], [str(self.open.pk)])
+        self.assertIsNone(first['results'][0]['archived_at'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['id'] for row in second['results']], [str(self.old.pk)])
+        self.assertIsNotNone(second['results'][0]['archived_at'])
+
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record_call(value):
+    calls.append(value)
+    return {'value': value}
+
+
+@jobs.task('tests.broken_database', max_attempts=2)
+def broken_database():
+    raise DatabaseError('server has gone away')
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_and_run(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+        claimed = jobs.claim('w1')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, 'RUNNING', 1))
+        self.assertIsNone(jobs.claim('w2'))
+        self.assertTrue(jobs.run(claimed, 'w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, calls), ('SUCCEEDED', {'value': 1}, [1]))
+
+    def test_failures_are_retried_then_failed(self):
+        job = jobs.enqueue('tests.broken_database')
+        with self.assertLogs(jobs.logger, 'WARNING'):
+            self.assertFalse(jobs.run(jobs.claim('w1'), 'w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertIn('server has gone away', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        with self.assertLogs(jobs.logger, 'WARNING'):
+            jobs.run(jobs.claim('w1'), 'w1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+
+    def test_idempotency_key_requeues_a_failed_job(self):
+        job = jobs.enqueue('tests.record', {'value': 1}, idempotency_key='k')
+        self.assertEqual(jobs.enqueue('tests.record', {'value': 1}, idempotency_key='k').pk, job.pk)
+        Job.objects.filter(pk=job.pk).update(status='FAILED', attempts=5, last_error='boom')
+        again = jobs.enqueue('tests.record', {'value': 2}, idempotency_key='k')
+        self.assertEqual((again.pk, again.status, again.attempts, again.payload), (job.pk, 'QUEUED', 0, {'value': 2}))
+
+    @override_settings(JOB_QUEUE={'POLL_INTERVAL': 0})
+    def test_worker_survives_a_database_error_while_finishing(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+        finish = jobs._finish
+        outcomes = iter([DatabaseError('lost connection')])
+
+        def flaky_finish(*args, **kwargs):
+            error = next(outcomes, None)
+            if error:
+                raise error
+            return finish(*args, **kwargs)
+
+        with mock.patch.object(jobs, '_finish', flaky_finish), self.assertLogs(jobs.logger, 'ERROR'):
+            jobs.Worker(once=True)._loop('w1')
+        job.refresh_from_db()
+        # Handed back for a retry instead of being left RUNNING
+        self.assertEqual((job.status, job.locked_until, job.attempts), ('QUEUED', None, 1))
+
+
+@override_settings(DEBUG=True)
+class LoginRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = LoginRateLimiter(USERNAME_LIMIT=2, IP_LIMIT=5, BACKOFF_BASE=30)
+
+    def test_username_lockout_is_per_address(self):
+        self.assertEqual([self.limiter.check('inspector', '10.0.0.1') for _ in range(2)], [0, 0])
+        self.assertEqual(self.limiter.check('inspector', '10.0.0.1'), 30)
+        self.assertGreater(self.limiter.check('inspector', '10.0.0.1'), 0)
+        # The officer at their own desk is not locked out by someone else's guesses
+        self.assertEqual(self.limiter.check('Inspector ', '10.0.0.2'), 0)
+
+    def test_ip_limit_spans_usernames(self):
+        waits = [self.limiter.check(f'user{n}', '10.0.0.9') for n in range(6)]
+        self.assertEqual(waits[:5], [0] * 5)
+        self.assertGreater(waits[5], 0)
+        self.assertEqual(self.limiter.metrics()['rejected_ip'], 1)
+
+    def test_lockouts_back_off(self):
+        for _ in range(3):
+            self.limiter.check('clerk', '10.0.0.1')
+        self.limiter.cache.delete(self.limiter._key('lock', 'username', self.limiter._username_ident('clerk', '10.0.0.1')))
+        self.assertEqual(self.limiter.check('clerk', '10.0.0.1'), 60)
+
+    def test_reset_after_login(self):
+        for _ in range(3):
+            self.limiter.check('clerk', '10.0.0.1')
+        self.limiter.reset('clerk', '10.0.0.1')
+        self.assertEqual(self.limiter.check('clerk', '10.0.0.1'), 0)
+
+    @override_settings(DEBUG=False)
+    def test_fails_closed_without_a_shared_cache(self):
+        self.assertFalse(self.limiter.is_shared())
+        with self.assertLogs('police_profiling.throttling', 'ERROR'):
+            self.assertEqual(self.limiter.check('clerk', '10.0.0.1'), 300)
+
+
+class IdentityCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.officer = make_officer()
+        self.client.force_login(self.officer.user)
+
+    def check(self):
+        return self.client.get('/api/auth/check/').json()
+
+    @override_settings(DEBUG=True)
+    def test_cached_identity_is_invalidated_on_change(self):
+        self.assertEqual(self.check()['officer']['rank'], 'SERGEANT')
+        self.assertIsNotNone(cached_identity(self.client.session))
+        self.officer.rank = 'INSPECTOR'
+        self.officer.save()
+        self.assertIsNone(cached_identity(self.client.session))
+        self.assertEqual(self.check()['officer']['rank'], 'INSPECTOR')
+
+    def test_per_process_cache_is_not_used_outside_debug(self):
+        self.assertTrue(self.check()['authenticated'])
+        self.assertIsNone(cached_identity(self.client.session))
+        PoliceOfficer.objects.filter(pk=self.officer.pk).update(is_active=False)
+        self.assertFalse(self.check()['officer']['is_active'])
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.officer = make_officer()
+        self.criminal = Criminal.objects.create(first_name='Lukas', last_name='Hamutenya')
+
+    def test_upserts_collapse_and_deletes_leave_tombstones(self):
+        token = changefeed.head_token()
+        crime = Crime.objects.create(
+            criminal=self.criminal, crime_type='THEFT', description='Stole a phone',
+            date_committed=date(2025, 1, 1), location='Rundu',
+        )
+        self.criminal.alias = 'Luki'
+        self.criminal.save()
+        changes, next_token, has_more = changefeed.changes_since(token, 100)
+        self.assertEqual([(change['type'], change['op']) for change in changes], [('crime', 'upsert'), ('criminal', 'upsert')])
+        self.assertEqual(changes[1]['data']['alias'], 'Luki')
+        self.assertEqual((next_token, has_more), (changefeed.head_token(), False))
+
+        crime_id = crime.pk
+        crime.delete()
+        changes, _, _ = changefeed.changes_since(next_token, 100)
+        self.assertEqual(changes, [{'seq': next_token + 1, 'type': 'crime', 'id': str(crime_id), 'op': 'delete'}])
+
+    def test_late_commits_get_later_tokens(self):
+        token = changefeed.head_token()
+        # Stands in for an insert whose transaction has not committed yet
+        pending = ChangeLogEntry.objects.create(model_name='crime', object_id=str(uuid7()), action='DELETE')
+        later = ChangeLogEntry.objects.create(model_name='criminal', object_id=str(self.criminal.pk), action='UPDATE')
+        pending_id = pending.pk
+        pending.delete()
+        head = changefeed.head_token()
+        # Commits with a lower id than an entry already handed out
+        earlier = ChangeLogEntry.objects.create(id=pending_id, model_name='crime', object_id=str(uuid7()), action='DELETE')
+        self.assertEqual(list(changefeed.settled_entries(token).values_list('pk', flat=True)), [later.pk, earlier.pk])
+        self.assertEqual(list(changefeed.settled_entries(head).values_list('pk', flat=True)), [earlier.pk])
+
+    def test_paging(self):
+        token = changefeed.head_token()
+        for n in range(3):
+            Criminal.objects.create(first_name=f'Person{n}', last_name='Test')
+        changes, next_token, has_more = changefeed.changes_since(token, 2)
+        self.assertEqual((len(changes), has_more), (2, True))
+        changes, _, has_more = changefeed.changes_since(next_token, 2)
+        self.assertEqual((len(changes), has_more), (1, False))
+
+    def test_resuming_across_an_archive_run(self):
+        token = changefeed.head_token()
+        crime = Crime.objects.create(
+            criminal=self.criminal, crime_type='FRAUD', description='Pension fraud', status='CONVICTED',
+            date_committed=date(2018, 1, 1), location='Rundu',
+        )
+        Criminal.objects.create(first_name='Maria', last_name='Kaundu')
+        changes, token, has_more = changefeed.changes_since(token, 1)
+        self.assertEqual((changes[0]['id'], changes[0]['op'], has_more), (str(crime.pk), 'upsert', True))
+
+        archive.archive_cases(date(2021, 1, 1))
+        seen = []
+        while has_more:
+            changes, token, has_more = changefeed.changes_since(token, 1)
+            seen.extend((change['type'], change['op']) for change in changes)
+        self.assertEqual(seen, [('criminal', 'upsert'), ('crime', 'archive')])
+        self.assertEqual(token, changefeed.head_token())
+
+    def test_view_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/changes/').status_code, 401)
+        self.client.force_login(self.officer.user)
+        self.assertEqual(self.client.get('/api/changes/', {'since': 0}).json()['since'], 0)
+
+    def test_hashing_evidence_is_recorded(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            evidence = CriminalEvidence.objects.create(
+                criminal=self.criminal, evidence_type='DOCUMENT', file=SimpleUploadedFile('note.txt', b'ransom note'),
+            )
+            token = changefeed.head_token()
+            tasks.hash_evidence(str(evidence.pk))
+        changes, _, _ = changefeed.changes_since(token, 100)
+        self.assertEqual([(change['id'], change['data']['file_size']) for change in changes], [(str(evidence.pk), 11)])
+
+
+class FacetTests(SimpleTestCase):
+    def row(self, **values):
+        return {
+            'threat_level': 'LOW', 'gender': 'M', 'is_incarcerated': False, 'nationality': 'Namibian',
+            'build': '', 'violent_offender': False, 'escape_risk': False, 'date_of_birth': None, **values,
+        }
+
+    def test_counts(self):
+        today = date.today()
+        counted = facets.count_facets([
+            self.row(threat_level='HIGH', is_incarcerated=True, date_of_birth=date(today.year - 30, 1, 1)),
+            self.row(date_of_birth=date(today.year - 16, 1, 1)),
+            self.row(),
+        ])
+        self.assertEqual(counted['threat_level'], {'HIGH': 1, 'LOW': 2})
+        self.assertEqual(counted['is_incarcerated'], {'true': 1, 'false': 2})
+        self.assertEqual(counted['age']['25-34'], 1)
+        self.assertEqual(counted['age']['under_18'], 1)
+        self.assertEqual(counted['age']['unknown'], 1)
+
+    def test_missing_values_and_literal_unknown_are_added_together(self):
+        counted = facets.count_facets([self.row(nationality=None), self.row(nationality=''), self.row(nationality='unknown')])
+        self.assertEqual(counted['nationality'], {'unknown': 3})
+        self.assertEqual(counted['build'], {'unknown': 3})
+
+
+class DescriptorParsingTests(SimpleTestCase):
+    def test_heights(self):
+        for text, cm in (("5'11", 180), ('5 ft 11 in', 180), ('1.80m', 180), ('180', 180), ('71"', 180), ('71', 180)):
+            self.assertEqual(descriptors.parse_height(text), cm, text)
+        self.assertIsNone(descriptors.parse_height('tall'))
+        self.assertIsNone(descriptors.parse_height('900cm'))
+
+    def test_weights(self):
+        for text, kg in (('80', 80), ('80 kg', 80), ('176 lbs', 80), ('12 st', 76)):
+            self.assertEqual(descriptors.parse_weight(text), kg, text)
+        self.assertIsNone(descriptors.parse_weight('heavy'))
+
+    def test_description(self):
+        choices = {field: Criminal._meta.get_field(field).choices for field in descriptors.INDEXED_FIELDS}
+        parsed = descriptors.parse_description('male, 175-185cm, heavyset, black hair, brown, tattoo on left arm', choices)
+        self.assertEqual(parsed['filters'], {'gender': {'M'}, 'build': {'HEAVYSET'}, 'hair_color': {'BLACK'}})
+        self.assertEqual(parsed['height'], (175, 185))
+        self.assertEqual(parsed['weight'], (None, None))
+        # "brown" alone could be eyes or hair
+        self.assertEqual(parsed['keywords'], ['brown', 'tattoo', 'arm'])
+
+
+class DescriptorIndexTests(TestCase):
+    def setUp(self):
+        self.tall = Criminal.objects.create(first_name='A', last_name='Tall', gender='M', build='HEAVYSET', height='1.90m')
+        self.short = Criminal.objects.create(first_name='B', last_name='Short', gender='M', build='SLENDER', height="5'2")
+        self.woman = Criminal.objects.create(first_name='C', last_name='Woman', gender='F', build='SLENDER', height='170')
+        self.index = descriptors.DescriptorIndex()
+        self.index.build()
+
+    def match(self, filters, height=(None, None)):
+        return set(self.index.match(filters, height) or ())
+
+    def test_match(self):
+        self.assertEqual(self.match({'gender': {'M'}}), {self.tall.pk, self.short.pk})
+        self.assertEqual(self.match({'gender': {'M'}, 'build': {'SLENDER'}}), {self.short.pk})
+        self.assertEqual(self.match({'build': {'SLENDER', 'HEAVYSET'}}, height=(180, None)), {self.tall.pk})
+        self.assertIsNone(self.index.match({}))
+        self.assertIsNone(self.index.match({'gender': {'M'}}, max_candidates=1))
+
+    def test_updates_move_only_the_changed_keys(self):
+        self.tall.build = 'SLENDER'
+        self.index.update(self.tall)
+        self.assertEqual(self.match({'build': {'HEAVYSET'}}), set())
+        self.assertEqual(self.match({'build': {'SLENDER'}}), {self.tall.pk, self.short.pk, self.woman.pk})
+        self.index.remove(self.short.pk)
+        self.assertEqual(self.match({'gender': {'M'}}), {self.tall.pk})
+
+    def test_catches_up_from_the_change_feed(self):
+        added = Criminal.objects.create(first_name='D', last_name='New', gender='F', build='MUSCULAR')
+        audit.audited_update(Criminal.objects.filter(pk=self.woman.pk), build='ATHLETIC')
+        Criminal.objects.filter(pk=self.short.pk).delete()
+        self.index.checked_at = 0
+        self.assertEqual(self.match({'gender': {'F'}}), {self.woman.pk, added.pk})
+        self.assertEqual(self.match({'build': {'ATHLETIC'}}), {self.woman.pk})
+        self.assertEqual(self.match({'build': {'SLENDER'}}), set())
+
+    def test_searches_fall_back_to_sql_until_built(self):
+        index = descriptors.DescriptorIndex()
+        with mock.patch.object(descriptors.threading, 'Thread') as thread:
+            self.assertIsNone(index.match({'gender': {'M'}}))
+        thread.return_value.start.assert_called_once_with()
+
+
+class ContactTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(
+            first_name='Ndapewa', last_name='Shilongo',
+            phone_numbers=['081 123 4567', '+27 82 555 0101'], email_addresses=['N.Shilongo@Mail.com'],
+        )
+
+    def test_normalisation(self):
+        for text in ('+264 81 123 4567', '081-123-4567', '00264811234567', '811234567'):
+            self.assertEqual(contacts.normalize(text), ('PHONE', '+264811234567'), text)
+        self.assertEqual(contacts.normalize(' mailto:Someone@Example.NA'), ('EMAIL', 'someone@example.na'))
+        self.assertIsNone(contacts.normalize('12'))
+        self.assertIsNone(contacts.normalize('not@valid'))
+
+    def test_saves_keep_the_lookup_table_in_step(self):
+        self.assertEqual(
+            set(ContactIdentifier.objects.values_list('kind', 'value')),
+            {('PHONE', '+264811234567'), ('PHONE', '+27825550101'), ('EMAIL', 'n.shilongo@mail.com')},
+        )
+        self.criminal.phone_numbers = ['0811234567']
+        self.criminal.save()
+        audit.audited_update(Criminal.objects.filter(pk=self.criminal.pk), email_addresses=[])
+        self.assertEqual(set(ContactIdentifier.objects.values_list('kind', 'value')), {('PHONE', '+264811234567')})
+
+    def test_lookup(self):
+        found = contacts.lookup(['+264811234567', 'n.shilongo@MAIL.com', '0610000000'])
+        self.assertEqual([match['criminal_id'] for match in found['+264811234567']], [str(self.criminal.pk)])
+        self.assertEqual(len(found['n.shilongo@MAIL.com']), 1)
+        self.assertEqual(found['0610000000'], [])
+        self.assertEqual(len(contacts.lookup(['+2782'], prefix=True)['+2782']), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_HEALTH_CHECK_INTERVAL=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_routers.PrimaryReplicaRouter()
+        self.health = db_routers.ReplicaHealth()
+        patcher = mock.patch.object(db_routers, 'health', self.health)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Tests record results by hand instead of running the probe thread
+        probing = mock.patch.object(db_routers.ReplicaHealth, 'ensure_probing')
+        probing.start()
+        self.addCleanup(probing.stop)
+
+    def test_reads_go_to_a_healthy_replica(self):
+        with mock.patch.object(self.health, 'check', return_value=True):
+            self.health.probe()
+        self.assertEqual(self.router.db_for_read(Criminal), 'replica1')
+        self.assertEqual(self.router.db_for_write(Criminal), 'default')
+
+    def test_pinned_reads_go_to_the_primary(self):
+        self.health._status['replica1'] = (db_routers.time.monotonic(), True)
+        with db_routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Criminal), 'default')
+        self.assertEqual(self.router.db_for_read(Criminal), 'replica1')
+
+    def test_unchecked_unhealthy_or_stale_replicas_are_skipped(self):
+        self.assertEqual(self.router.db_for_read(Criminal), 'default')
+        self.health._status['replica1'] = (db_routers.time.monotonic(), False)
+        self.assertEqual(self.router.db_for_read(Criminal), 'default')
+        self.health._status['replica1'] = (db_routers.time.monotonic() - 20, True)
+        self.assertEqual(self.router.db_for_read(Criminal), 'default')
+
+    def test_requests_never_run_the_check(self):
+        with mock.patch.object(self.health, 'check') as check:
+            self.assertFalse(self.health.is_healthy('replica1'))
+        check.assert_not_called()
+
+    def test_middleware_pins_writes_and_recent_writers(self):
+        seen = []
+        middleware = ReplicaRoutingMiddleware(lambda request: seen.append(db_routers._pinned.get()) or HttpResponse())
+        factory = RequestFactory()
+        self.assertIn(middleware.cookie_name, middleware(factory.post('/api/criminals/')).cookies)
+        middleware(factory.get('/api/criminals/'))
+        request = factory.get('/api/criminals/')
+        request.COOKIES[middleware.cookie_name] = '1'
+        middleware(request)
+        self.assertEqual(seen, [True, False, True])
+
+
+class OfficerRosterTests(TestCase):
+    def setUp(self):
+        self.sergeant = make_officer()
+        self.constable = make_officer('NAM-002', rank='CONSTABLE', is_active=False)
+        self.inspector = make_officer('NAM-003', station='Oshakati', rank='INSPECTOR')
+        self.client.force_login(self.sergeant.user)
+        criminal = Criminal.objects.create(first_name='Josef', last_name='Kapuka')
+        for status, day in (('CONVICTED', date(2019, 3, 1)), ('OPEN', date(2025, 3, 1))):
+            Crime.objects.create(
+                criminal=criminal, crime_type='ROBBERY', description='Held up a shop', status=status,
+                date_committed=day, location='Ondangwa', arresting_officer=self.constable,
+            )
+
+    def test_roster_filters(self):
+        rows = self.client.get('/api/officers/roster/', {'station': 'Windhoek Central', 'rank': 'constable,sergeant'}).json()
+        self.assertEqual([row['badge_number'] for row in rows['results']], ['NAM-001', 'NAM-002'])
+        rows = self.client.get('/api/officers/roster/', {'is_active': 'false'}).json()
+        self.assertEqual([row['badge_number'] for row in rows['results']], ['NAM-002'])
+
+    def test_station_summary_counts_active_and_archived_arrests(self):
+        archive.archive_cases(date(2021, 1, 1))
+        summary = self.client.get('/api/officers/station_summary/').json()
+        self.assertEqual([station['station'] for station in summary], ['Oshakati', 'Windhoek Central'])
+        windhoek = summary[1]
+        self.assertEqual((windhoek['headcount'], windhoek['pending_activations'], windhoek['arrests']), (2, 1, 2))
+        self.assertEqual((windhoek['by_rank']['SERGEANT'], windhoek['by_rank']['CONSTABLE']), (1, 1))
+        self.assertEqual(windhoek['arrests_per_officer'][0], {
+            'officer_id': self.constable.pk, 'badge_number': 'NAM-002', 'arrests': 2,
+        })
+
+    def test_station_summary_requires_authentication(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/officers/station_summary/').status_code, 401)
+
+
+class FastListTests(TestCase):
+    def test_rows_match_the_list_serializer(self):
+        criminal = Criminal.objects.create(
+            first_name='Martha', last_name='Nghipondoka', alias='Ma', date_of_birth=date(1990, 2, 28),
+        )
+        Crime.objects.create(
+            criminal=criminal, crime_type='FRAUD', description='Forged permits',
+            date_committed=date(2024, 1, 9), location='Swakopmund',
+        )
+        Criminal.objects.create(first_name='Paulus', last_name='Hamutenya')
+        queryset = Criminal.objects.order_by('last_name')
+        expected = CriminalListSerializer(queryset, many=True).data
+        self.assertEqual(serialize_criminal_rows(criminal_list_rows(queryset)), [dict(row) for row in expected])
+
+    def test_renderer_output_matches_json_renderer(self):
+        data = {
+            'id': uuid.UUID('01920a7c-3b5e-7c1d-9f00-123456789abc'),
+            'when': datetime(2025, 6, 1, 8, 30, tzinfo=dt_timezone.utc),
+            'day': date(2025, 6, 1),
+            'amount': Decimal('12.50'),
+            'text': 'Ōmaruru\u2028line\u2029',
+            'rows': [1, 2.5, None, True],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({1: 'non-string key'}), JSONRenderer().render({1: 'non-string key'}))
+
+
+class DossierTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.officer = make_officer()
+        self.criminal = Criminal.objects.create(first_name='Erastus', last_name='Shikongo', created_by=self.officer)
+        self.crime = Crime.objects.create(
+            criminal=self.criminal, crime_type='THEFT', description='Took a bakkie', status='CLOSED',
+            date_committed=date(2019, 8, 1), location='Otjiwarongo', arresting_officer=self.officer,
+        )
+        self.evidence = CriminalEvidence.objects.create(
+            criminal=self.criminal, evidence_type='PHOTO', description='CCTV still', collected_by=self.officer,
+        )
+
+    def test_cached_dossier_costs_one_query(self):
+        with self.assertNumQueries(6):
+            payload, version = dossier.get(self.criminal.pk)
+        self.assertEqual([entry['id'] for entry in payload['timeline']], [str(self.crime.pk)])
+        with self.assertNumQueries(1):
+            self.assertEqual(dossier.get(self.criminal.pk), (payload, version))
+        self.assertIsNone(dossier.get(uuid7()))
+
+    def test_changes_anywhere_in_the_record_move_the_fingerprint(self):
+        seen = {dossier.fingerprint(self.criminal.pk)}
+
+        def changed(message):
+            fingerprint = dossier.fingerprint(self.criminal.pk)
+            self.assertNotIn(fingerprint, seen, message)
+            seen.add(fingerprint)
+
+        self.criminal.modus_operandi = 'Hotwires bakkies at night'
+        self.criminal.save()
+        changed('narrative')
+        self.crime.status = 'CONVICTED'
+        self.crime.save()
+        changed('crime')
+        archive.archive_cases(date(2021, 1, 1))
+        changed('archive')
+        audit.audited_update(CriminalEvidence.objects.filter(pk=self.evidence.pk), sha256='ab' * 32)
+        changed('bulk update')
+        self.evidence.delete()
+        changed('delete')
+        self.officer.user.first_name = 'Hilma'
+        self.officer.user.save()
+        changed('officer name')
+
+    def test_dossier_shows_the_current_record(self):
+        payload, _ = dossier.get(self.criminal.pk)
+        self.assertEqual(payload['officers'][0]['rank'], 'SERGEANT')
+        self.officer.rank = 'INSPECTOR'
+        self.officer.save()
+        payload, _ = dossier.get(self.criminal.pk)
+        self.assertEqual(payload['officers'][0]['rank'], 'INSPECTOR')
+
+
+class CompressionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.body = ('{"name": "Windhoek Central"}' * 100).encode()
+        self.middleware = CompressionMiddleware(lambda request: HttpResponse(self.body, content_type='application/json'))
+
+    def get(self, accept_encoding):
+        return self.middleware(RequestFactory().get('/api/criminals/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_encoding('gzip;q=0.5, identity'), 'gzip')
+        self.assertIsNone(negotiate_encoding('gzip;q=0, identity'))
+        self.assertIsNone(negotiate_encoding(''))
+        self.assertEqual(negotiate_encoding('*'), next(iter(COMPRESSORS)))
+
+    def test_gzip_response(self):
+        response = self.get('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_compressed_payloads_are_reused(self):
+        first = self.get('gzip')
+        with mock.patch.dict(COMPRESSORS, {'gzip': mock.Mock(side_effect=AssertionError)}):
+            self.assertEqual(self.get('gzip').content, first.content)
+
+    def test_small_bodies_are_sent_as_is(self):
+        self.body = b'{}'
+        self.assertFalse(self.get('gzip').has_header('Content-Encoding'))
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(first_name='Helena', last_name='Nakale', fingerprint_code='FP-1')
+        self.old = Crime.objects.create(
+            criminal=self.criminal, crime_type='FRAUD', description='False invoices', status='CLOSED',
+            date_committed=date(2018, 4, 1), location='Keetmanshoop',
+        )
+        self.open = Crime.objects.create(
+            criminal=self.criminal, crime_type='THEFT', description='Copper cable',
+            date_committed=date(2025, 4, 1), location='Keetmanshoop',
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'station.sqlite3')
+
+    def rows(self, sql):
+        db = sqlite3.connect(self.path)
+        try:
+            return db.execute(sql).fetchall()
+        finally:
+            db.close()
+
+    def test_snapshot_then_delta(self):
+        snapshots.build_snapshot(self.path, thumbnails=False)
+        token = snapshots.snapshot_token(self.path)
+        self.assertEqual(self.rows('SELECT id, fingerprint_code FROM criminals'), [(str(self.criminal.pk), 'FP-1')])
+        self.assertEqual(len(self.rows('SELECT id FROM crimes')), 2)
+
+        self.criminal.fingerprint_code = 'FP-2'
+        self.criminal.save()
+        archive.archive_cases(date(2021, 1, 1))
+        self.open.delete()
+        new = Crime.objects.create(
+            criminal=self.criminal, crime_type='ASSAULT', description='Bar fight',
+            date_committed=date(2025, 9, 1), location='Luderitz',
+        )
+        delta = os.path.join(self.directory.name, 'delta.jsonl.gz')
+        info = snapshots.build_delta(delta, token, thumbnails=False)
+        self.assertGreater(info['to_token'], token)
+
+        self.assertEqual(snapshots.apply_delta(self.path, delta)['sync_token'], info['to_token'])
+        self.assertEqual(self.rows('SELECT fingerprint_code FROM criminals'), [('FP-2',)])
+        # Archived and deleted cases both leave the station's copy
+        self.assertEqual(self.rows('SELECT id, location FROM crimes'), [(str(new.pk), 'Luderitz')])
+        self.assertEqual(snapshots.apply_delta(self.path, delta)['applied'], 0)
+
+    def test_delta_from_a_later_token_is_refused(self):
+        snapshots.build_snapshot(self.path, thumbnails=False)
+        Criminal.objects.create(first_name='Ruben', last_name='Nujoma')
+        first = changefeed.head_token()
+        Criminal.objects.create(first_name='Saara', last_name='Kuugongelwa')
+        delta = os.path.join(self.directory.name, 'delta.jsonl.gz')
+        snapshots.build_delta(delta, first, thumbnails=False)
+        with self.assertRaises(snapshots.SnapshotError):
+            snapshots.apply_delta(self.path, delta)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.alive = True
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self):
+        if not self.alive:
+            raise DatabaseError('gone away')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def pool(self, **config):
+        return ConnectionPool(FakeConnection, **{'PING_AFTER': 60, **config})
+
+    def test_connections_are_reused_and_rolled_back(self):
+        pool = self.pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertIs(pool.acquire(), connection)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['in_use']), (1, 2, 1))
+
+    def test_broken_and_expired_connections_are_replaced(self):
+        pool = self.pool(PING_AFTER=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.alive = False
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        pool.release(replacement, discard=True)
+        self.assertTrue(replacement.closed)
+
+        pool = self.pool(MAX_LIFETIME=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_callers_wait_for_a_free_connection(self):
+        pool = self.pool(MAX_SIZE=1, TIMEOUT=5)
+        connection = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+        self.assertIs(pool.acquire(), connection)
+        timer.join()
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_timeout(self):
+        pool = self.pool(MAX_SIZE=1, TIMEOUT=0.01)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_forked_process_starts_empty(self):
+        pool = self.pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        pool._pid = -1  # as seen from a child process
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['size'], 1)
+
+
+class WatchlistAlertTests(TestCase):
+    def setUp(self):
+        self.officer = make_officer()
+        self.watched = Criminal.objects.create(first_name='Lukas', last_name='Haikali')
+        self.dangerous = Criminal.objects.create(first_name='Ida', last_name='Mwatile', threat_level='EXTREME')
+
+    def crime(self, criminal):
+        return Crime.objects.create(
+            criminal=criminal, crime_type='ROBBERY', description='Armed robbery',
+            date_committed=date(2025, 10, 1), location='Walvis Bay',
+        )
+
+    def test_new_crime_events(self):
+        token = changefeed.head_token()
+        crime = self.crime(self.watched)
+        crime.status = 'CLOSED'
+        crime.save()
+        events, new_token = alerts.new_crime_events(token)
+        self.assertEqual([(event['crime']['id'], event['criminal']['name']) for event in events], [
+            (str(crime.pk), str(self.watched)),
+        ])
+        self.assertGreater(new_token, token)
+        self.assertEqual(alerts.new_crime_events(new_token), ([], new_token))
+
+    def test_alerts_reach_matching_subscribers_only(self):
+        WatchlistSubscription.objects.create(officer=self.officer, criminal=self.watched)
+        other = make_officer('NAM-002')
+        WatchlistSubscription.objects.create(officer=other, threat_levels=['EXTREME'])
+        broker = alerts.Broker()
+        mine, theirs = alerts.Client(self.officer.pk, 10), alerts.Client(other.pk, 10)
+        for client in (mine, theirs):
+            async_to_sync(broker.refresh)(client)
+
+        token = changefeed.head_token()
+        self.crime(self.watched)
+        self.crime(self.dangerous)
+        for event in alerts.new_crime_events(token)[0]:
+            broker.publish(event)
+        self.assertEqual([event['criminal']['id'] for event in mine.drain()[0]], [str(self.watched.pk)])
+        self.assertEqual([event['criminal']['id'] for event in theirs.drain()[0]], [str(self.dangerous.pk)])
+
+    def test_slow_clients_drop_their_oldest_alerts(self):
+        client = alerts.Client(self.officer.pk, 2)
+        for seq in range(5):
+            client.deliver({'seq': seq})
+        self.assertEqual(client.drain(), ([{'seq': 3}, {'seq': 4}], 3))
+        self.assertEqual(alerts.sse('crime', {'seq': 4}, event_id=4), b'id: 4\nevent: crime\ndata: {"seq":4}\n\n')
+
+
+class DashboardOverviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.constable = make_officer(rank='CONSTABLE')
+        self.inspector = make_officer('NAM-002', rank='INSPECTOR')
+        make_officer('NAM-003', is_active=False)
+        criminal = Criminal.objects.create(first_name='Simon', last_name='Kaura', threat_level='HIGH', is_incarcerated=True)
+        Criminal.objects.create(first_name='Anna', last_name='Iyambo')
+        for status, day in (('OPEN', date(2025, 1, 5)), ('CONVICTED', date(2018, 1, 5)), ('CLOSED', date(2025, 2, 5))):
+            Crime.objects.create(
+                criminal=criminal, crime_type='DRUGS', description='Possession', status=status,
+                date_committed=day, location='Rehoboth',
+            )
+        archive.archive_cases(date(2021, 1, 1))
+
+    def test_overview_counts(self):
+        with self.assertNumQueries(6):
+            data = dashboard.overview(recent=2)
+        self.assertEqual(data['criminals']['total'], 2)
+        self.assertEqual((data['criminals']['incarcerated'], data['criminals']['at_large']), (1, 1))
+        self.assertEqual(data['criminals']['by_threat_level']['HIGH'], 1)
+        self.assertEqual(
+            {key: data['cases'][key] for key in ('total', 'open', 'resolved', 'archived', 'clearance_rate')},
+            {'total': 3, 'open': 1, 'resolved': 2, 'archived': 1, 'clearance_rate': 67},
+        )
+        self.assertEqual(data['cases']['open_by_type']['DRUGS'], 1)
+        self.assertEqual(data['officers'], {'total': 3, 'active': 2, 'pending_activations': 1})
+        self.assertEqual([crime['date_committed'] for crime in data['recent_crimes']], ['2025-02-05', '2025-01-05'])
+        self.assertEqual(len(data['recent_criminals']), 2)
+
+    def test_pending_activations_are_hidden_from_officers_who_cannot_activate(self):
+        self.client.force_login(self.constable.user)
+        self.assertIsNone(self.client.get('/api/dashboard/overview/').json()['officers']['pending_activations'])
+        self.client.force_login(self.inspector.user)
+        self.assertEqual(self.client.get('/api/dashboard/overview/').json()['officers']['pending_activations'], 1)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/dashboard/overview/').status_code, 401)
+
+
+class ReleaseScheduleTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 3, 1)
+
+        def inmate(last_name, facility, release, **fields):
+            return Criminal.objects.create(
+                first_name='Jonas', last_name=last_name, is_incarcerated=True,
+                current_facility=facility, expected_release_date=release, **fields,
+            )
+
+        inmate('Amutenya', 'Windhoek Correctional Facility', date(2026, 3, 10), threat_level='EXTREME')
+        inmate('Beukes', 'Windhoek Correctional Facility', date(2026, 3, 5), escape_risk=True)
+        inmate('Gawanab', 'Oluno Correctional Facility', date(2026, 3, 31))
+        inmate('Hoabeb', None, date(2026, 3, 2))
+        inmate('Later', 'Oluno Correctional Facility', date(2026, 4, 15))
+        Criminal.objects.create(first_name='Jonas', last_name='Free', expected_release_date=date(2026, 3, 3))
+
+    def test_upcoming_groups_by_facility(self):
+        groups = releases.group_by_facility(releases.upcoming(self.today, 30))
+        self.assertEqual([(group['facility'], group['total']) for group in groups], [
+            ('', 1), ('Oluno Correctional Facility', 1), ('Windhoek Correctional Facility', 2),
+        ])
+        windhoek = groups[2]
+        self.assertEqual((windhoek['high_risk'], windhoek['escape_risk']), (1, 1))
+        self.assertEqual([release['full_name'] for release in windhoek['releases']], ['Jonas Beukes', 'Jonas Amutenya'])
+        self.assertEqual(len(releases.upcoming(self.today, 30, facility='')), 1)
+
+    def test_digests_match_the_live_schedule(self):
+        self.assertEqual(releases.build_digests(self.today, 30), 3)
+        self.assertEqual(releases.build_digests(self.today, 30), 3)
+        self.assertEqual(ReleaseDigest.objects.count(), 3)
+
+        self.client.force_login(make_officer().user)
+        digest = self.client.get('/api/releases/digests/').json()
+        live = self.client.get('/api/releases/upcoming/', {'start': '2026-03-01', 'days': 30}).json()
+        self.assertEqual((digest['date'], digest['total']), ('2026-03-01', 4))
+        self.assertEqual(digest['facilities'], live['facilities'])
+        self.assertEqual(self.client.get('/api/releases/digests/', {'date': '2026-01-01'}).status_code, 404)
+
+
+def encoded_image(size=(160, 200), flip=False, quality=95):
+    image = Image.new('L', (32, 40))
+    image.putdata([(x * 7 + y * 3 + (x * y) % 13 * 9) % 256 for y in range(40) for x in range(32)])
+    image = image.resize(size)
+    if flip:
+        image = ImageOps.flip(image)
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+class MugshotTests(TestCase):
+    def test_bk_tree_matches_a_linear_scan(self):
+        rng = random.Random(44)
+        values = [rng.getrandbits(64) for _ in range(500)]
+        tree = mugshots.BKTree()
+        for number, value in enumerate(values):
+            tree.add(value, number)
+        probe = values[7] ^ 0b1011
+        for radius in (0, 3, 12, 24):
+            expected = sorted(
+                (mugshots.hamming(probe, value), number) for number, value in enumerate(values)
+                if mugshots.hamming(probe, value) <= radius
+            )
+            self.assertEqual(sorted(tree.search(probe, radius)), expected)
+
+    def test_hashes_survive_recompression_but_not_a_different_picture(self):
+        original = mugshots.hash_bytes(encoded_image())
+        retaken = mugshots.hash_bytes(encoded_image(size=(120, 150), quality=60))
+        other = mugshots.hash_bytes(encoded_image(flip=True))
+        self.assertLessEqual(mugshots.hamming(original[0], retaken[0]), mugshots.match_distance())
+        self.assertGreater(mugshots.hamming(original[0], other[0]), mugshots.match_distance())
+        for value in original:
+            self.assertEqual(mugshots.to_unsigned(mugshots.to_signed(value)), value)
+
+    def test_index_search(self):
+        criminal = Criminal.objects.create(first_name='Festus', last_name='Mbako')
+        other = Criminal.objects.create(first_name='Olga', last_name='Katjiuongua')
+        mugshots.store(criminal.pk, 'mugshot.jpg', mugshots.hash_bytes(encoded_image()))
+        mugshots.store(other.pk, 'other.jpg', mugshots.hash_bytes(encoded_image(flip=True)))
+        index = mugshots.MugshotIndex()
+        phash_value, dhash_value = mugshots.hash_bytes(encoded_image(size=(120, 150), quality=60))
+        matches = index.search(phash_value, dhash_value, mugshots.match_distance())
+        self.assertEqual([(match['criminal_id'], match['source']) for match in matches], [(criminal.pk, 'PROFILE')])
+
+
+class FullTextTests(TestCase):
+    def setUp(self):
+        self.criminal = Criminal.objects.create(first_name='Tjipe', last_name='Kazondu')
+        self.other = Criminal.objects.create(first_name='Meriam', last_name='Shiweda')
+
+    def document(self, criminal, text, title='Statement'):
+        document = CriminalDocument.objects.create(
+            criminal=criminal, document_type='ARREST_REPORT', file=f'documents/{title}.txt', title=title,
+        )
+        fulltext.index(criminal.pk, document.file.name, text, document_id=document.pk)
+        return document
+
+    def test_plain_text_is_cut_at_max_chars(self):
+        with override_settings(FULLTEXT={'MAX_CHARS': 10, 'CHUNK_SIZE': 4}):
+            self.assertEqual(fulltext.extract(io.BytesIO('Ōshikango border post'.encode()), 'note.txt'), ('Ōshikango ', True))
+        self.assertEqual(fulltext.extract(io.BytesIO(b'\xef\xbb\xbfshort'), 'note.txt'), ('short', False))
+
+    def test_docx_paragraphs(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as docx:
+            docx.writestr('word/document.xml', (
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+                '<w:p><w:r><w:t>Stolen</w:t><w:tab/><w:t>cattle</w:t></w:r></w:p><w:p><w:r><w:t>Gobabis</w:t></w:r></w:p>'
+                '</w:body></w:document>'
+            ))
+        buffer.seek(0)
+        self.assertEqual(fulltext.extract(buffer, 'report.docx'), ('Stolen\tcattle\nGobabis\n', False))
+
+    def test_bm25_ranking(self):
+        focused = self.document(self.criminal, 'Cattle stolen. The cattle were branded; cattle found at Gobabis.', 'focused')
+        passing = self.document(self.criminal, 'Long statement about a shebeen fight ' * 20 + 'and one cattle pen.', 'passing')
+        unrelated = self.document(self.other, 'Cattle auction receipt', 'receipt')
+        results = fulltext.search('cattle', criminal_id=self.criminal.pk)
+        self.assertEqual([text.document_id for _, text in results], [focused.pk, passing.pk])
+        self.assertGreater(results[0][0], results[1][0])
+        self.assertEqual(len(fulltext.search('cattle')), 3)
+        self.assertEqual(fulltext.search('the and'), [])
+
+        fulltext.index(self.other.pk, 'documents/receipt.txt', 'Fuel receipt', document_id=unrelated.pk)
+        self.assertEqual(len(fulltext.search('cattle')), 2)
+        text = 'Report. ' + 'x ' * 200 + 'the cattle were found near the pan ' + 'y ' * 100
+        self.assertEqual(fulltext.snippet(text, 'cattle', width=40), '…x x x x the cattle were found near the…')
+
+
+class SimilarityTests(TestCase):
+    def setUp(self):
+        self.burglar = Criminal.objects.create(
+            first_name='Kalumbu', last_name='Shivute',
+            modus_operandi='Smashes rear windows at night and takes laptops', weapons_preference='Crowbar',
+        )
+        self.robber = Criminal.objects.create(
+            first_name='Immanuel', last_name='Goagoseb',
+            modus_operandi='Armed robbery of fuel stations', weapons_preference='Pistol',
+        )
+        self.copycat = Criminal.objects.create(first_name='Nelago', last_name='Amadhila')
+        self.crime = Crime.objects.create(
+            criminal=self.copycat, crime_type='BURGLARY', description='Rear window smashed, laptops taken',
+            status='CONVICTED', date_committed=date(2019, 2, 1), location='Tsumeb',
+        )
+        self.index = similarity.SimilarityIndex()
+
+    def ranked(self, text, **kwargs):
+        return [criminal_id for _, criminal_id in self.index.search(text, **kwargs)]
+
+    def test_ranking(self):
+        self.assertEqual(self.ranked('smashes rear windows at night for laptops'), [self.burglar.pk, self.copycat.pk])
+        self.assertEqual(self.ranked('pistol'), [self.robber.pk])
+        self.assertEqual(self.ranked('laptops', exclude=[self.burglar.pk]), [self.copycat.pk])
+        self.assertEqual(self.ranked('the'), [])
+        self.assertEqual(
+            similarity.shared_terms('rear window laptops', [self.copycat.pk]),
+            {self.copycat.pk: ['laptops', 'rear', 'window']},
+        )
+
+    def test_numpy_and_python_scoring_agree(self):
+        query = 'smashed rear window, took laptops with a pistol'
+        with_numpy = self.index.search(query)
+        with mock.patch.object(similarity, 'numpy', None):
+            without = self.index.search(query)
+        self.assertEqual([criminal_id for _, criminal_id in with_numpy], [criminal_id for _, criminal_id in without])
+        for (score, _), (expected, _) in zip(with_numpy, without):
+            self.assertAlmostEqual(score, expected, places=5)
+
+    def test_changes_are_applied_from_the_feed(self):
+        self.assertEqual(self.ranked('pistol'), [self.robber.pk])
+        self.burglar.weapons_preference = 'Pistol'
+        self.burglar.save()
+        self.assertEqual(set(self.ranked('pistol')), {self.robber.pk, self.burglar.pk})
+        self.robber.delete()
+        archive.archive_cases(date(2021, 1, 1))
+        # Archived descriptions still describe the criminal
+        self.assertEqual(self.ranked('pistol'), [self.burglar.pk])
+        self.assertIn(self.copycat.pk, self.ranked('laptops'))
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .caching import is_shared
+
+DEFAULT_LOGIN_THROTTLE = {
+    'CACHE': 'default',
+    'WINDOW': 300,
+    'USERNAME_LIMIT': 5,
+    'IP_LIMIT': 30,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 3600,
+}
+
+METRICS = ('hashes_avoided', 'rejected_ip', 'rejected_username', 'lockouts')
+
+logger = logging.getLogger(__name__)
+
+
+class LoginRateLimiter:
+    """
+    Sliding-window login limiter keyed by client IP and by username per IP.
+
+    Attempts are counted with atomic cache increments in fixed windows; the
+    sliding estimate weights the previous window by how much of it still
+    overlaps the current one. Exceeding a limit locks the key out, and each
+    repeated lockout doubles its duration up to BACKOFF_MAX. Checks run
+    before authenticate(), so a rejected attempt never costs a password hash.
+
+    Username lockouts only apply to the address the attempts came from: a
+    stranger guessing an officer's password can't lock the officer out. The
+    counters must live in a cache shared by every worker process (see the
+    login_throttle_cache check), or each process grants its own allowance.
+    """
+    def __init__(self, **overrides):
+        config = {**DEFAULT_LOGIN_THROTTLE, **getattr(settings, 'LOGIN_THROTTLE', {}), **overrides}
+        self.cache_alias = config['CACHE']
+        self.window = config['WINDOW']
+        self.limits = {'ip': config['IP_LIMIT'], 'username': config['USERNAME_LIMIT']}
+        self.backoff_base = config['BACKOFF_BASE']
+        self.backoff_max = config['BACKOFF_MAX']
+
+    def check(self, username, ip):
+        """Count an attempt and return seconds to wait, or 0 if it may proceed"""
+        if not self.is_shared() and not settings.DEBUG:
+            # Fail closed: per-process counters can't enforce the limits
+            logger.error("Login throttle cache %r is not shared between workers; refusing logins", self.cache_alias)
+            return self.window
+        now = time.time()
+        keys = (('ip', ip), ('username', self._username_ident(username, ip)))
+
+        for scope, ident in keys:
+            wait = self._locked_for(scope, ident, now)
+            if wait:
+                self._reject(scope)
+                return wait
+
+        for scope, ident in keys:
+            if self._hit(scope, ident, now) > self.limits[scope]:
+                self._reject(scope)
+                return self._lock(scope, ident, now)
+        return 0
+
+    def reset(self, username, ip):
+        """Clear a username's counters and backoff at ip after a successful login"""
+        ident = self._username_ident(username, ip)
+        index = int(time.time() // self.window)
+        self.cache.delete_many([
+            self._key('hits', 'username', ident, index),
+            self._key('hits', 'username', ident, index - 1),
+            self._key('lock', 'username', ident),
+            self._key('strikes', 'username', ident),
+        ])
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+    
+    def is_shared(self):
+        """False when counters are per process, so each worker grants its own allowance"""
+        return is_shared(self.cache)
+    
+    def metrics(self):
+        values = self.cache.get_many([self._key('metric', name) for name in METRICS])
+        return {name: values.get(self._key('metric', name), 0) for name in METRICS}
+
+    def _hit(self, scope, ident, now):
+        index = int(now // self.window)
+        current = self._incr(self._key('hits', scope, ident, index), self.window * 2)
+        previous = self.cache.get(self._key('hits', scope, ident, index - 1), 0)
+        overlap = 1 - (now % self.window) / self.window
+        return previous * overlap + current
+
+    def _locked_for(self, scope, ident, now):
+        until = self.cache.get(self._key('lock', scope, ident))
+        return max(0, math.ceil(until - now)) if until else 0
+
+    def _lock(self, scope, ident, now):
+        # Backoff resets once a key has stayed quiet for a while
+        strikes = self._incr(self._key('strikes', scope, ident), self.backoff_max * 2)
+        duration = min(self.backoff_base * 2 ** (strikes - 1), self.backoff_max)
+        self.cache.set(self._key('lock', scope, ident), now + duration, duration)
+        self._count('lockouts')
+        return duration
+
+    def _reject(self, scope):
+        self._count('hashes_avoided')
+        self._count(f'rejected_{scope}')
+
+    def _count(self, name):
+        self._incr(self._key('metric', name), None)
+
+    def _incr(self, key, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    @staticmethod
+    def _username_ident(username, ip):
+        # Usernames are user input: hash them into a cache-safe key
+        return hashlib.sha1(f'{username.strip().lower()}|{ip}'.encode()).hexdigest()
+
+    @staticmethod
+    def _key(*parts):
+        return 'login_throttle:' + ':'.join(str(part) for part in parts)
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
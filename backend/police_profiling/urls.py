@@ -4,7 +4,10 @@ from .views import (
     PoliceOfficerViewSet, CriminalViewSet, CrimeViewSet, 
     RegisterView, LoginView, LogoutView, CheckAuthView,
     CriminalEvidenceViewSet, CriminalDocumentViewSet,
-    CSRFTokenView
+    CSRFTokenView, LoginThrottleMetricsView, ChangeFeedView,
+    DatabasePoolMetricsView, JobStatusView, WatchlistSubscriptionViewSet, WatchlistStreamView,
+    DashboardOverviewView, ContactLookupView, ReleaseScheduleView, ReleaseDigestView,
+    CrimeTrendsView, DocumentSearchView
 )
 
 router = DefaultRouter()
@@ -13,12 +16,25 @@ router.register(r'criminals', CriminalViewSet)
 router.register(r'crimes', CrimeViewSet)
 router.register(r'criminal-evidence', CriminalEvidenceViewSet)
 router.register(r'criminal-documents', CriminalDocumentViewSet)
+router.register(r'watchlist', WatchlistSubscriptionViewSet)
 
 urlpatterns = [
+    path('watchlist/stream/', WatchlistStreamView.as_view(), name='watchlist-stream'),
+    # Before the router, or crimes/<pk>/ would take 'trends' as a pk
+    path('crimes/trends/', CrimeTrendsView.as_view(), name='crime-trends'),
     path('', include(router.urls)),
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
+    path('dashboard/overview/', DashboardOverviewView.as_view(), name='dashboard-overview'),
+    path('contacts/lookup/', ContactLookupView.as_view(), name='contact-lookup'),
+    path('releases/upcoming/', ReleaseScheduleView.as_view(), name='release-schedule'),
+    path('releases/digests/', ReleaseDigestView.as_view(), name='release-digests'),
+    path('documents/search/', DocumentSearchView.as_view(), name='document-search'),
+    path('jobs/<int:pk>/', JobStatusView.as_view(), name='job-status'),
     path('auth/csrf/', CSRFTokenView.as_view(), name='auth-csrf'),
     path('auth/register/', RegisterView.as_view(), name='auth-register'),
     path('auth/login/', LoginView.as_view(), name='auth-login'),
     path('auth/logout/', LogoutView.as_view(), name='auth-logout'),
     path('auth/check/', CheckAuthView.as_view(), name='auth-check'),
+    path('auth/login-metrics/', LoginThrottleMetricsView.as_view(), name='auth-login-metrics'),
+    path('metrics/db-pool/', DatabasePoolMetricsView.as_view(), name='db-pool-metrics'),
 ]
\ No newline at end of file
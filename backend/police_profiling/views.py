@@ -1,23 +1,66 @@
+from datetime import date
+
 from django.shortcuts import render
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.contrib.auth import authenticate, login, logout
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.contrib.auth import authenticate, get_user, login, logout
 from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.middleware.csrf import get_token
-from .models import PoliceOfficer, Criminal, Crime, CriminalEvidence, CriminalDocument
+from django.utils import timezone
+from .models import PoliceOfficer, Criminal, Crime, ArchivedCrime, CriminalEvidence, CriminalDocument, AuditLogEntry, Job, WatchlistSubscription, ReleaseDigest, location_area
 from .serializers import (
     PoliceOfficerSerializer, CriminalSerializer, 
     CrimeSerializer, LoginSerializer, PoliceOfficerRegistrationSerializer,
     CriminalEvidenceSerializer, CriminalDocumentSerializer, PoliceOfficerActivationSerializer,
-    CriminalListSerializer, CriminalSearchSerializer
+    CriminalListSerializer, CriminalSearchSerializer,
+    AuditLogEntrySerializer, ArchivedCrimeSerializer, JobSerializer, WatchlistSubscriptionSerializer,
+    count_related, criminal_list_rows, serialize_criminal_rows
 )
+from .renderers import FastJSONRenderer
+from .identity import build_identity, cache_identity, cached_identity
+from .throttling import LoginRateLimiter, client_ip
+from .pagination import ArchivePagination, ChainedRows, RosterPagination
+from . import alerts, audit, changefeed, contacts, dashboard, descriptors, dossier, facets, fulltext, jobs, mugshots, releases, rollups, similarity
+from .caching import get_or_compute
+from .tasks import queue_dossier_pdf, queue_perceptual_hash, queue_text_extraction
+from police_db_system.db_backends.mysql_pool.pool import pool_stats
+
+class AuditedModelViewSet(viewsets.ModelViewSet):
+    """ModelViewSet that records creates, field-level updates and deletes in the audit log"""
+    
+    def current_officer(self):
+        user = self.request.user
+        if user.is_authenticated and hasattr(user, 'policeofficer'):
+            return user.policeofficer
+        return None
+    
+    def perform_create(self, serializer, **save_kwargs):
+        instance = serializer.save(**save_kwargs)
+        audit.record_create(instance, self.current_officer())
+    
+    def perform_update(self, serializer, **save_kwargs):
+        before = audit.snapshot(serializer.instance)
+        instance = serializer.save(**save_kwargs)
+        audit.record_update(instance, before, self.current_officer())
+    
+    def perform_destroy(self, instance):
+        # The delete and anything it cascades to are audited by a post_delete receiver
+        with audit.acting_as(self.current_officer()):
+            instance.delete()
 
 class PoliceOfficerViewSet(viewsets.ModelViewSet):
-    queryset = PoliceOfficer.objects.all()
+    queryset = PoliceOfficer.objects.select_related('user')
     serializer_class = PoliceOfficerSerializer
     
     @action(detail=True, methods=['patch'])
@@ -104,19 +147,88 @@ class PoliceOfficerViewSet(viewsets.ModelViewSet):
         
         # Filter based on current officer's permissions
         if current_officer.rank == 'COMMISSIONER':
-            pending_officers = PoliceOfficer.objects.filter(is_active=False)
+            pending_officers = self.get_queryset().filter(is_active=False)
         else:  # Inspector
-            pending_officers = PoliceOfficer.objects.filter(
+            pending_officers = self.get_queryset().filter(
                 is_active=False,
                 rank__in=['CONSTABLE', 'SERGEANT']
             )
         
         serializer = self.get_serializer(pending_officers, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def roster(self, request):
+        """Paginated roster filtered by ?station=, ?rank= (comma-separated) and ?is_active="""
+        officers = self.get_queryset().order_by('station', 'badge_number')
+        
+        station = request.GET.get('station', '')
+        rank = request.GET.get('rank', '')
+        is_active = request.GET.get('is_active', '')
+        
+        if station:
+            officers = officers.filter(station=station)
+        if rank:
+            officers = officers.filter(rank__in=rank.upper().split(','))
+        if is_active.lower() in ['true', 'false']:
+            officers = officers.filter(is_active=(is_active.lower() == 'true'))
+        
+        paginator = RosterPagination()
+        page = paginator.paginate_queryset(officers, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def station_summary(self, request):
+        """Headcount by rank, pending activations and arrests per officer for each station"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        # One query: a row per officer with their active and archived arrests
+        # (two joined Counts would multiply each other, so both are subqueries)
+        officers = (
+            PoliceOfficer.objects.order_by()
+            .values('id', 'badge_number', 'station', 'rank', 'is_active')
+            .annotate(arrests=count_related(Crime, 'arresting_officer') + count_related(ArchivedCrime, 'arresting_officer'))
+        )
+        station = request.GET.get('station', '')
+        if station:
+            officers = officers.filter(station=station)
+        
+        stations = {}
+        for officer in officers:
+            summary = stations.get(officer['station'])
+            if summary is None:
+                summary = stations[officer['station']] = {
+                    'station': officer['station'],
+                    'headcount': 0,
+                    'by_rank': {rank: 0 for rank, _ in PoliceOfficer.RANK_CHOICES},
+                    'pending_activations': 0,
+                    'arrests': 0,
+                    'arrests_per_officer': [],
+                }
+            summary['headcount'] += 1
+            summary['by_rank'][officer['rank']] = summary['by_rank'].get(officer['rank'], 0) + 1
+            summary['pending_activations'] += not officer['is_active']
+            summary['arrests'] += officer['arrests']
+            summary['arrests_per_officer'].append({
+                'officer_id': officer['id'],
+                'badge_number': officer['badge_number'],
+                'arrests': officer['arrests'],
+            })
+        
+        for summary in stations.values():
+            summary['arrests_per_officer'].sort(key=lambda item: -item['arrests'])
+        
+        return Response(sorted(stations.values(), key=lambda item: item['station']))
 
-class CriminalViewSet(viewsets.ModelViewSet):
+class CriminalViewSet(AuditedModelViewSet):
     queryset = Criminal.objects.all().order_by('-created_at')
     serializer_class = CriminalSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     
     def get_serializer_class(self):
         """Use different serializers for list vs detail views"""
@@ -124,26 +236,83 @@ class CriminalViewSet(viewsets.ModelViewSet):
             return CriminalListSerializer
         return CriminalSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('retrieve', 'update', 'partial_update', 'update_status'):
+            # Narrative fields are in their own table; only detail views read them
+            queryset = queryset.select_related('narrative')
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """List criminals through the values() fast path"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(serialize_criminal_rows(criminal_list_rows(queryset)))
+    
     def perform_create(self, serializer):
         """Automatically set created_by and last_updated_by"""
         if self.request.user.is_authenticated and hasattr(self.request.user, 'policeofficer'):
-            serializer.save(
+            super().perform_create(
+                serializer,
                 created_by=self.request.user.policeofficer,
                 last_updated_by=self.request.user.policeofficer
             )
         else:
-            serializer.save()
+            super().perform_create(serializer)
+        self.queue_picture_processing(serializer)
     
     def perform_update(self, serializer):
         """Automatically update last_updated_by"""
         if self.request.user.is_authenticated and hasattr(self.request.user, 'policeofficer'):
-            serializer.save(last_updated_by=self.request.user.policeofficer)
+            super().perform_update(serializer, last_updated_by=self.request.user.policeofficer)
         else:
-            serializer.save()
+            super().perform_update(serializer)
+        self.queue_picture_processing(serializer)
+    
+    def queue_picture_processing(self, serializer):
+        """Resize a newly uploaded profile picture in the background"""
+        criminal = serializer.instance
+        if serializer.validated_data.get('profile_picture') and criminal.profile_picture:
+            name = criminal.profile_picture.name
+            jobs.enqueue(
+                'criminals.process_profile_picture',
+                {'criminal_id': str(criminal.pk), 'name': name},
+                priority=5,
+                idempotency_key=f'profile-picture:{criminal.pk}:{name}',
+            )
+    
+    @action(detail=False, methods=['post'])
+    def export(self, request):
+        """Queue a CSV export of the register; poll the returned job for the file"""
+        filters = {}
+        if request.data.get('threat_level'):
+            filters['threat_level'] = request.data['threat_level']
+        if request.data.get('is_incarcerated') not in (None, ''):
+            filters['is_incarcerated'] = str(request.data['is_incarcerated']).lower() in ('1', 'true')
+        
+        # Retried requests with the same Idempotency-Key get the same job back
+        client_key = request.headers.get('Idempotency-Key')
+        job = jobs.enqueue(
+            'exports.criminals_csv',
+            {'filters': filters},
+            idempotency_key=f'export:{request.user.pk}:{client_key}' if client_key else None,
+            officer=self.current_officer(),
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    def search_results(self, criminals, with_facets):
+        """Search response: the plain list, or {'results', 'facets'} when facets are asked for"""
+        if not with_facets:
+            return Response(serialize_criminal_rows(criminal_list_rows(criminals)))
+        rows = list(criminal_list_rows(criminals, facets.EXTRA_COLUMNS))
+        return Response({
+            'count': len(rows),
+            'results': serialize_criminal_rows(rows),
+            'facets': facets.count_facets(rows),
+        })
     
     @action(detail=False, methods=['get', 'post'])
     def search(self, request):
-        """Enhanced search with filtering capabilities"""
+        """Enhanced search with filtering capabilities; facets=1 adds drill-down counts"""
         if request.method == 'GET':
             # Handle GET requests with query parameters
             query = request.GET.get('q', '')
@@ -171,8 +340,8 @@ class CriminalViewSet(viewsets.ModelViewSet):
             if gender:
                 criminals = criminals.filter(gender=gender)
             
-            serializer = CriminalListSerializer(criminals, many=True)
-            return Response(serializer.data)
+            with_facets = request.GET.get('facets', '').lower() in ('1', 'true')
+            return self.search_results(criminals, with_facets)
         
         else:  # POST request for complex searches
             serializer = CriminalSearchSerializer(data=request.data)
@@ -202,11 +371,171 @@ class CriminalViewSet(viewsets.ModelViewSet):
                 if gender:
                     criminals = criminals.filter(gender=gender)
                 
-                serializer = CriminalListSerializer(criminals, many=True)
-                return Response(serializer.data)
+                return self.search_results(criminals, serializer.validated_data.get('facets', False))
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['get'])
+    def descriptor_search(self, request):
+        """
+        Search by physical description: ?q= takes free witness text
+        ("male, 175-185cm, heavyset, tattoo on left arm"); gender, eye_color,
+        hair_color, build, complexion (comma-separated), height_min/max (cm),
+        weight_min/max (kg) and marks narrow it further
+        """
+        choices = {field: Criminal._meta.get_field(field).choices for field in descriptors.INDEXED_FIELDS}
+        parsed = descriptors.parse_description(request.GET.get('q', ''), choices)
+        
+        for field in descriptors.INDEXED_FIELDS:
+            values = {value.strip().upper() for value in request.GET.get(field, '').split(',') if value.strip()}
+            if values:
+                parsed['filters'][field] = values
+        try:
+            for name in ('height', 'weight'):
+                low, high = parsed[name]
+                if request.GET.get(f'{name}_min'):
+                    low = int(request.GET[f'{name}_min'])
+                if request.GET.get(f'{name}_max'):
+                    high = int(request.GET[f'{name}_max'])
+                parsed[name] = (low, high)
+            limit = min(int(request.GET.get('limit', 100)), 500)
+        except ValueError:
+            return Response(
+                {'error': 'height, weight and limit must be whole numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        parsed['keywords'] += request.GET.get('marks', '').lower().split()
+        
+        criminals = Criminal.objects.all()
+        for field, values in parsed['filters'].items():
+            criminals = criminals.filter(**{f'{field}__in': values})
+        for name, column in (('height', 'height_cm'), ('weight', 'weight_kg')):
+            low, high = parsed[name]
+            if low is not None:
+                criminals = criminals.filter(**{f'{column}__gte': low})
+            if high is not None:
+                criminals = criminals.filter(**{f'{column}__lte': high})
+        for keyword in parsed['keywords']:
+            criminals = criminals.filter(distinguishing_marks__icontains=keyword)
+        
+        # The bitmaps prune to a candidate set; SQL above re-checks every
+        # condition. A broad description (gender=M) skips them: the plain
+        # query walks created_at and stops after limit rows.
+        candidates = descriptors.index.match(
+            parsed['filters'], parsed['height'], parsed['weight'],
+            max_candidates=limit * descriptors.CANDIDATES_PER_RESULT,
+        )
+        if candidates is None:
+            rows = list(criminal_list_rows(criminals.order_by('-created_at'))[:limit])
+        else:
+            rows = []
+            for start in range(0, len(candidates), 1000):
+                chunk = criminals.filter(pk__in=candidates[start:start + 1000]).order_by('-created_at')
+                rows.extend(criminal_list_rows(chunk)[:limit])
+            rows.sort(key=lambda row: row['created_at'], reverse=True)
+            rows = rows[:limit]
+        
+        return Response({
+            'query': {
+                'filters': {field: sorted(values) for field, values in parsed['filters'].items()},
+                'height': parsed['height'],
+                'weight': parsed['weight'],
+                'keywords': parsed['keywords'],
+            },
+            'count': len(rows),
+            'results': serialize_criminal_rows(rows),
+        })
+    
+    @action(detail=False, methods=['get', 'post'])
+    def mo_search(self, request):
+        """
+        Suspects whose modus operandi, weapons preference and crime
+        descriptions resemble ?q= (or POST 'text'), best first. ?crime=<id>
+        uses that case's description instead and leaves out its own criminal.
+        """
+        params = request.GET if request.method == 'GET' else request.data
+        text = params.get('q') or params.get('text') or ''
+        exclude = []
+        if params.get('crime'):
+            try:
+                crime = Crime.objects.filter(pk=params['crime']).values('description', 'criminal_id').first()
+            except ValidationError:  # not a UUID
+                crime = None
+            if crime is None:
+                return Response(
+                    {'error': 'Crime not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            text = f"{text} {crime['description']}"
+            exclude.append(crime['criminal_id'])
+        if not text.strip():
+            return Response(
+                {'error': 'q, text or crime is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(params.get('limit', 20)), 1), 100)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'limit must be an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+        matches = similarity.index.search(text, limit, exclude)
+        criminal_ids = [criminal_id for _, criminal_id in matches]
+        rows = serialize_criminal_rows(criminal_list_rows(Criminal.objects.filter(pk__in=criminal_ids)))
+        rows = {row['id']: row for row in rows}
+        terms = similarity.shared_terms(text, criminal_ids)
+        results = [
+            {**rows[str(criminal_id)], 'score': round(score, 4), 'matched_terms': terms.get(criminal_id, [])}
+            for score, criminal_id in matches if str(criminal_id) in rows
+        ]
+        return Response({'count': len(results), 'results': results})
+    
+    @action(detail=False, methods=['post'])
+    def mugshot_match(self, request):
+        """
+        Profiles whose photos look like the uploaded one (multipart 'photo';
+        optional 'distance', the pHash bits allowed to differ, 0-20)
+        """
+        photo = request.FILES.get('photo')
+        if photo is None:
+            return Response(
+                {'error': 'photo is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            distance = min(max(int(request.data.get('distance', mugshots.match_distance())), 0), 20)
+        except ValueError:
+            return Response(
+                {'error': 'distance must be an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            phash_value, dhash_value = mugshots.hash_bytes(photo.read())
+        except Exception:
+            return Response(
+                {'error': 'photo is not a readable image'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        matches = mugshots.index.search(phash_value, dhash_value, distance)[:50]
+        rows = serialize_criminal_rows(
+            criminal_list_rows(Criminal.objects.filter(pk__in=[match['criminal_id'] for match in matches]))
+        )
+        rows = {row['id']: row for row in rows}
+        results = [
+            {**rows[str(match['criminal_id'])], **match, 'criminal_id': str(match['criminal_id'])}
+            for match in matches if str(match['criminal_id']) in rows
+        ]
+        return Response({
+            'distance': distance,
+            'phash': f'{phash_value:016x}',
+            'dhash': f'{dhash_value:016x}',
+            'count': len(results),
+            'results': results,
+        })
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get criminal statistics"""
@@ -242,6 +571,7 @@ class CriminalViewSet(viewsets.ModelViewSet):
         criminal = self.get_object()
         
         if 'is_incarcerated' in request.data:
+            before = audit.snapshot(criminal)
             criminal.is_incarcerated = request.data['is_incarcerated']
             
             # Update incarceration dates if provided
@@ -251,6 +581,7 @@ class CriminalViewSet(viewsets.ModelViewSet):
                 criminal.expected_release_date = request.data['expected_release_date']
             
             criminal.save()
+            audit.record_update(criminal, before, self.current_officer())
             serializer = self.get_serializer(criminal)
             return Response(serializer.data)
         
@@ -258,18 +589,494 @@ class CriminalViewSet(viewsets.ModelViewSet):
             {'error': 'is_incarcerated field is required'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """Audit trail of changes to this criminal record"""
+        criminal = self.get_object()
+        entries = AuditLogEntry.objects.filter(
+            model_name='Criminal', object_id=str(criminal.pk)
+        ).select_related('changed_by__user')
+        serializer = AuditLogEntrySerializer(entries, many=True)
+        return Response(serializer.data)
+    
+    def load_dossier(self):
+        """(dossier, version), from the cache when the record hasn't changed; 404 if missing"""
+        cached = dossier.get(self.kwargs['pk'])
+        if cached is None:
+            raise Http404
+        return cached
+    
+    @action(detail=True, methods=['get'])
+    def dossier(self, request, pk=None):
+        """Full dossier: profile, case timeline in date order, evidence, documents and officers involved"""
+        payload, version = self.load_dossier()
+        return Response({**payload, 'version': version})
+    
+    @action(detail=True, methods=['get'], url_path='dossier/pdf')
+    def dossier_pdf(self, request, pk=None):
+        """
+        The dossier as PDF. Served straight from storage when this version of
+        the record has been rendered; otherwise rendering is queued and the
+        job is returned (202) to poll before downloading again.
+        """
+        _, version = self.load_dossier()
+        name = dossier.pdf_name(pk, version)
+        if default_storage.exists(name):
+            return FileResponse(
+                default_storage.open(name),
+                as_attachment=True,
+                filename=f'dossier-{pk}.pdf',
+                content_type='application/pdf',
+            )
+    
+        job = queue_dossier_pdf(pk, version, officer=self.current_officer())
+        return Response(
+            {**JobSerializer(job).data, 'version': version},
+            status=status.HTTP_202_ACCEPTED
+        )
 
-class CrimeViewSet(viewsets.ModelViewSet):
+class CrimeViewSet(AuditedModelViewSet):
+    """Active cases; pass ?include_archived=1 to also read archived ones (read-only, paginated)"""
     queryset = Crime.objects.all()
     serializer_class = CrimeSerializer
+    
+    def include_archived(self):
+        return self.request.query_params.get('include_archived', '').lower() in ('1', 'true')
+    
+    def list(self, request, *args, **kwargs):
+        if not self.include_archived():
+            return super().list(request, *args, **kwargs)
+        
+        # The archive outgrows the active table, so this branch is paginated
+        active = self.filter_queryset(self.get_queryset()).select_related('criminal', 'arresting_officer__user').order_by('pk')
+        archived = ArchivedCrime.objects.select_related('criminal', 'arresting_officer__user').order_by('pk')
+        paginator = ArchivePagination()
+        page = paginator.paginate_queryset(ChainedRows(active, archived), request, view=self)
+        context = self.get_serializer_context()
+        rows = []
+        for crime in page:
+            if isinstance(crime, ArchivedCrime):
+                rows.append(ArchivedCrimeSerializer(crime, context=context).data)
+            else:
+                rows.append({**CrimeSerializer(crime, context=context).data, 'archived_at': None})
+        return paginator.get_paginated_response(rows)
+    
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not self.include_archived():
+                raise
+        archived = get_object_or_404(
+            ArchivedCrime.objects.select_related('criminal', 'arresting_officer__user'),
+            pk=kwargs['pk']
+        )
+        return Response(ArchivedCrimeSerializer(archived, context=self.get_serializer_context()).data)
 
-class CriminalEvidenceViewSet(viewsets.ModelViewSet):
+class CriminalEvidenceViewSet(AuditedModelViewSet):
     queryset = CriminalEvidence.objects.all()
     serializer_class = CriminalEvidenceSerializer
+    
+    def perform_create(self, serializer, **save_kwargs):
+        super().perform_create(serializer, **save_kwargs)
+        self.queue_hashing(serializer)
+    
+    def perform_update(self, serializer, **save_kwargs):
+        super().perform_update(serializer, **save_kwargs)
+        if 'file' in serializer.validated_data:
+            self.queue_hashing(serializer)
+    
+    def queue_hashing(self, serializer):
+        evidence = serializer.instance
+        jobs.enqueue(
+            'evidence.sha256',
+            {'evidence_id': str(evidence.pk)},
+            priority=10,
+            idempotency_key=f'evidence-sha256:{evidence.pk}:{evidence.file.name}',
+        )
+        if evidence.evidence_type == 'PHOTO':
+            queue_perceptual_hash(evidence.criminal_id, evidence.file.name, str(evidence.pk))
+            fulltext.unindex(evidence_id=str(evidence.pk))
+        else:
+            queue_text_extraction(evidence.file.name, evidence_id=str(evidence.pk))
 
-class CriminalDocumentViewSet(viewsets.ModelViewSet):
+class CriminalDocumentViewSet(AuditedModelViewSet):
     queryset = CriminalDocument.objects.all()
     serializer_class = CriminalDocumentSerializer
+    
+    def perform_create(self, serializer, **save_kwargs):
+        super().perform_create(serializer, **save_kwargs)
+        self.queue_indexing(serializer)
+    
+    def perform_update(self, serializer, **save_kwargs):
+        super().perform_update(serializer, **save_kwargs)
+        if 'file' in serializer.validated_data:
+            self.queue_indexing(serializer)
+    
+    def queue_indexing(self, serializer):
+        document = serializer.instance
+        queue_text_extraction(document.file.name, document_id=str(document.pk))
+
+class WatchlistSubscriptionViewSet(viewsets.ModelViewSet):
+    """The signed-in officer's watchlist alert rules"""
+    queryset = WatchlistSubscription.objects.all()
+    serializer_class = WatchlistSubscriptionSerializer
+    
+    def current_officer(self):
+        user = self.request.user
+        if user.is_authenticated and hasattr(user, 'policeofficer'):
+            return user.policeofficer
+        return None
+    
+    def get_queryset(self):
+        officer = self.current_officer()
+        if officer is None:
+            return WatchlistSubscription.objects.none()
+        return WatchlistSubscription.objects.filter(officer=officer).select_related('criminal')
+    
+    def create(self, request, *args, **kwargs):
+        officer = self.current_officer()
+        if officer is None:
+            return Response(
+                {'error': 'Only police officers can keep a watchlist'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criminal = serializer.validated_data.get('criminal')
+        if criminal is not None and WatchlistSubscription.objects.filter(officer=officer, criminal=criminal).exists():
+            return Response(
+                {'error': 'This criminal is already on your watchlist'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer.save(officer=officer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class WatchlistStreamView(View):
+    async def get(self, request):
+        """Server-Sent Events stream of watchlist alerts (needs an ASGI server, see asgi.py)"""
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        
+        officer = await PoliceOfficer.objects.filter(user=user, is_active=True).afirst()
+        if officer is None:
+            return JsonResponse({'error': 'Only active police officers can receive alerts'}, status=403)
+        
+        response = StreamingHttpResponse(alerts.stream(officer.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class DashboardOverviewView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    
+    def get(self, request):
+        """Counters and recent items for the dashboard landing page, in one call"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        try:
+            recent = min(max(int(request.GET.get('recent', 5)), 1), 50)
+        except ValueError:
+            return Response(
+                {'error': 'recent must be an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Shared by every officer for a few seconds and computed once per burst
+        data = get_or_compute(
+            f'dashboard_overview:{recent}',
+            lambda: dashboard.overview(recent),
+            timeout=getattr(settings, 'DASHBOARD_CACHE_SECONDS', 5),
+        )
+        
+        officer = PoliceOfficer.objects.filter(user=request.user).first()
+        if not officer or not officer.can_activate_users:
+            data = {**data, 'officers': {**data['officers'], 'pending_activations': None}}
+        return Response(data)
+
+class ContactLookupView(APIView):
+    """
+    Who owns a phone number or email address. GET ?q=<value>[&prefix=1] for
+    one value (prefix matches leading digits/characters); POST
+    {"values": [...]} to check a whole contact list in one request.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    max_batch = 5000
+    
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        prefix = request.GET.get('prefix', '').lower() in ('1', 'true')
+        return Response({
+            'query': query,
+            'normalized': None if prefix else (contacts.normalize(query) or (None, None))[1],
+            'matches': contacts.lookup([query], prefix=prefix)[query],
+        })
+    
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        values = request.data.get('values')
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            return Response(
+                {'error': 'values must be a list of phone numbers or email addresses'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(values) > self.max_batch:
+            return Response(
+                {'error': f'At most {self.max_batch} values per request'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        matches = contacts.lookup(values)
+        return Response({
+            'checked': len(values),
+            'matched': sum(1 for found in matches.values() if found),
+            'results': [
+                {'query': value, 'matches': found}
+                for value, found in matches.items() if found
+            ],
+        })
+
+class ReleaseScheduleView(APIView):
+    """Releases due from ?start= (default today) over the next ?days=, grouped by facility"""
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        try:
+            days = min(max(int(request.GET.get('days', releases.horizon())), 0), 366)
+            start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+        except ValueError:
+            return Response(
+                {'error': 'days must be an integer and start a YYYY-MM-DD date'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        groups = releases.group_by_facility(releases.upcoming(start, days, request.GET.get('facility')))
+        return Response({
+            'start': start.isoformat(),
+            'days': days,
+            'total': sum(group['total'] for group in groups),
+            'facilities': groups,
+        })
+
+class ReleaseDigestView(APIView):
+    """The nightly per-facility release digests for ?date= (default: the latest built)"""
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        digests = ReleaseDigest.objects.all()
+        if request.GET.get('facility') is not None:
+            digests = digests.filter(facility=request.GET['facility'])
+        try:
+            day = date.fromisoformat(request.GET['date']) if request.GET.get('date') else (
+                digests.order_by('-digest_date').values_list('digest_date', flat=True).first()
+            )
+        except ValueError:
+            return Response(
+                {'error': 'date must be a YYYY-MM-DD date'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        digests = list(digests.filter(digest_date=day)) if day else []
+        if not digests:
+            return Response(
+                {'error': 'No release digest has been built for that date'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({
+            'date': day.isoformat(),
+            'days': digests[0].horizon_days,
+            'generated_at': min(digest.generated_at for digest in digests).isoformat(),
+            'total': sum(digest.total for digest in digests),
+            'facilities': [
+                {
+                    'facility': digest.facility,
+                    'total': digest.total,
+                    'high_risk': digest.high_risk,
+                    'escape_risk': digest.escape_risk,
+                    'releases': digest.releases,
+                }
+                for digest in digests
+            ],
+        })
+
+class CrimeTrendsView(APIView):
+    """
+    Crime counts for ?start=..?end= per ?interval= (day, week, month, year or
+    total), split by ?group_by= (crime_type, status, area) and filtered by
+    comma-separated ?crime_type=, ?status=, ?area= (a town or suburb, matched
+    the way crime locations are reduced to areas). ?compare=1 adds the
+    same range a year earlier. Summed from the daily rollups.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        try:
+            end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+            start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end.replace(month=1, day=1)
+        except ValueError:
+            return Response(
+                {'error': 'start and end must be YYYY-MM-DD dates'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'error': 'start must not be after end'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+        interval = request.GET.get('interval', 'month')
+        group_by = [field for field in request.GET.get('group_by', '').split(',') if field]
+        if interval not in (*rollups.INTERVALS, 'total') or not set(group_by) <= set(rollups.GROUPS):
+            return Response(
+                {'error': f"interval must be one of {', '.join((*rollups.INTERVALS, 'total'))} "
+                          f"and group_by a list of {', '.join(rollups.GROUPS)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        interval = None if interval == 'total' else interval
+        filters = {}
+        for field in rollups.GROUPS:
+            values = [value.strip() for value in request.GET.get(field, '').split(',') if value.strip()]
+            if values:
+                filters[field] = [location_area(value) for value in values] if field == 'area' else [value.upper() for value in values]
+    
+        data = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'interval': interval or 'total',
+            'group_by': group_by,
+            'results': rollups.trends(start, end, interval, group_by, filters),
+        }
+        if request.GET.get('compare', '').lower() in ('1', 'true'):
+            previous_start, previous_end = rollups.year_before(start), rollups.year_before(end)
+            data['previous'] = {
+                'start': previous_start.isoformat(),
+                'end': previous_end.isoformat(),
+                'results': rollups.trends(previous_start, previous_end, interval, group_by, filters),
+            }
+        return Response(data)
+
+class DocumentSearchView(APIView):
+    """Full-text search of documents and evidence files: ?q=<words>[&criminal=<id>][&limit=20]"""
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = []
+        for score, document_text in fulltext.search(query, limit, request.GET.get('criminal') or None):
+            document, evidence = document_text.document, document_text.evidence
+            results.append({
+                'score': round(score, 4),
+                'snippet': fulltext.snippet(document_text.text, query),
+                'file': document_text.name,
+                'criminal_id': str(document_text.criminal_id),
+                'criminal_name': str(document_text.criminal),
+                'document_id': str(document.pk) if document else None,
+                'document_type': document.document_type if document else None,
+                'title': document.title if document else None,
+                'evidence_id': str(evidence.pk) if evidence else None,
+                'evidence_type': evidence.evidence_type if evidence else None,
+            })
+        return Response({'query': query, 'count': len(results), 'results': results})
+
+class JobStatusView(APIView):
+    def get(self, request, pk):
+        """Status and result of a background job (own jobs, or any for officers who can activate users)"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        job = Job.objects.filter(pk=pk).first()
+        officer = PoliceOfficer.objects.filter(user=request.user).first()
+        if job is None or not officer or (job.created_by_id != officer.pk and not officer.can_activate_users):
+            return Response(
+                {'error': 'Job not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(JobSerializer(job).data)
+
+class ChangeFeedView(APIView):
+    def get(self, request):
+        """Changes after ?since=<token>, collapsed per object with tombstones for deletes"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        try:
+            since = int(request.GET.get('since', 0))
+            limit = min(int(request.GET.get('limit', 500)), 5000)
+        except ValueError:
+            return Response(
+                {'error': 'since and limit must be integers'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        changes, next_token, has_more = changefeed.changes_since(since, max(limit, 1), request)
+        return Response({
+            'since': since,
+            'next_token': next_token,
+            'has_more': has_more,
+            'changes': changes,
+        })
 
 # CSRF Token endpoint
 class CSRFTokenView(APIView):
@@ -289,49 +1096,83 @@ class CSRFTokenView(APIView):
 # Auth views with CSRF exemption
 @method_decorator(csrf_exempt, name='dispatch')
 class LoginView(APIView):
+    rate_limiter = LoginRateLimiter()
+    
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
+            username = serializer.validated_data['username']
+            
+            # Reject floods before paying for a password hash
+            retry_after = self.rate_limiter.check(username, client_ip(request))
+            if retry_after:
+                return Response(
+                    {'error': f'Too many login attempts. Try again in {retry_after} seconds.'},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(retry_after)}
+                )
+            
             user = authenticate(
-                username=serializer.validated_data['username'],
+                username=username,
                 password=serializer.validated_data['password']
             )
             if user:
+                self.rate_limiter.reset(username, client_ip(request))
+                
                 # Check if user is a police officer and is active
-                try:
-                    officer = PoliceOfficer.objects.get(user=user)
-                    if not officer.is_active:
-                        return Response(
-                            {'error': 'Your account is pending activation by a Commissioner or Inspector'}, 
-                            status=status.HTTP_403_FORBIDDEN
-                        )
-                    
-                    # Include officer data in response
-                    officer_data = {
-                        'id': officer.id,
-                        'badge_number': officer.badge_number,
-                        'rank': officer.rank,
-                        'station': officer.station,
-                        'can_activate_users': officer.can_activate_users,
-                        'is_active': officer.is_active
-                    }
-                    
-                except PoliceOfficer.DoesNotExist:
-                    officer_data = {}
+                officer = PoliceOfficer.objects.filter(user=user).first()
+                if officer and not officer.is_active:
+                    return Response(
+                        {'error': 'Your account is pending activation by a Commissioner or Inspector'}, 
+                        status=status.HTTP_403_FORBIDDEN
+                    )
                 
                 login(request, user)
                 
-                return Response({
-                    'message': 'Login successful', 
-                    'user': user.username,
-                    'user_id': user.id,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'officer': officer_data
-                })
+                # Prime the identity cache so the following auth checks are free
+                identity = build_identity(user, officer)
+                cache_identity(user, identity)
+                
+                return Response({'message': 'Login successful', **identity})
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LoginThrottleMetricsView(APIView):
+    def get(self, request):
+        """Login limiter counters (only for officers who can activate users)"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        officer = PoliceOfficer.objects.filter(user=request.user).first()
+        if not officer or not officer.can_activate_users:
+            return Response(
+                {'error': 'You do not have permission to view login metrics'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response(LoginView.rate_limiter.metrics())
+
+class DatabasePoolMetricsView(APIView):
+    def get(self, request):
+        """Connection pool counters for this worker process (only for officers who can activate users)"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        officer = PoliceOfficer.objects.filter(user=request.user).first()
+        if not officer or not officer.can_activate_users:
+            return Response(
+                {'error': 'You do not have permission to view database metrics'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response(pool_stats())
+
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(APIView):
     def post(self, request):
@@ -357,28 +1198,16 @@ class LogoutView(APIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class CheckAuthView(APIView):
+    # The session is read directly so the common case needs no user lookup
+    authentication_classes = []
+    
     def get(self, request):
-        if request.user.is_authenticated:
-            officer_data = {}
-            try:
-                officer = PoliceOfficer.objects.get(user=request.user)
-                officer_data = {
-                    'id': officer.id,
-                    'badge_number': officer.badge_number,
-                    'rank': officer.rank,
-                    'station': officer.station,
-                    'can_activate_users': officer.can_activate_users,
-                    'is_active': officer.is_active
-                }
-            except PoliceOfficer.DoesNotExist:
-                pass
-            
-            return Response({
-                'authenticated': True, 
-                'user': request.user.username,
-                'user_id': request.user.id,
-                'first_name': request.user.first_name,
-                'last_name': request.user.last_name,
-                'officer': officer_data
-            })
-        return Response({'authenticated': False})
\ No newline at end of file
+        identity = cached_identity(request.session)
+        if identity is None:
+            user = get_user(request)
+            if not user.is_authenticated:
+                return Response({'authenticated': False})
+            identity = build_identity(user, PoliceOfficer.objects.filter(user=user).first())
+            cache_identity(user, identity)
+        
+        return Response({'authenticated': True, **identity})
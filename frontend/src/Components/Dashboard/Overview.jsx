@@ -31,69 +31,31 @@ const Overview = () => {
       setLoading(true);
       setApiStatus('connecting');
 
-      // Fetch criminals data
-      const criminalsResponse = await fetch('http://localhost:8000/api/criminals/', {
+      // One call returns every counter and the recent items
+      const response = await fetch('http://localhost:8000/api/dashboard/overview/?recent=5', {
         credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
         },
       });
 
-      if (!criminalsResponse.ok) {
-        throw new Error(`Criminals API error: ${criminalsResponse.status}`);
+      if (!response.ok) {
+        throw new Error(`Overview API error: ${response.status}`);
       }
 
-      const criminalsData = await criminalsResponse.json();
-
-      // Fetch cases data (you'll need to create this endpoint)
-      const casesResponse = await fetch('http://localhost:8000/api/crimes/', {
-        credentials: 'include',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-
-      let casesData = [];
-      if (casesResponse.ok) {
-        casesData = await casesResponse.json();
-      }
-
-      // Fetch officers data (you'll need to create this endpoint)
-      const officersResponse = await fetch('http://localhost:8000/api/officers/', {
-        credentials: 'include',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-
-      let officersData = [];
-      if (officersResponse.ok) {
-        officersData = await officersResponse.json();
-      }
-
-      // Calculate statistics
-      const totalCriminals = criminalsData.length;
-      const incarcerated = criminalsData.filter(c => c.is_incarcerated).length;
-      const atLarge = totalCriminals - incarcerated;
-      const activeCases = casesData.filter(c => c.status === 'OPEN').length;
-      const totalOfficers = officersData.length;
-
-      // Calculate clearance rate (simplified)
-      const totalCases = casesData.length;
-      const closedCases = casesData.filter(c => c.status === 'CLOSED' || c.status === 'CONVICTED').length;
-      const clearanceRate = totalCases > 0 ? Math.round((closedCases / totalCases) * 100) : 0;
+      const overview = await response.json();
 
       setStats({
-        totalCriminals,
-        activeCases,
-        officers: totalOfficers,
-        clearanceRate,
-        incarcerated,
-        atLarge
+        totalCriminals: overview.criminals.total,
+        activeCases: overview.cases.open,
+        officers: overview.officers.total,
+        clearanceRate: overview.cases.clearance_rate,
+        incarcerated: overview.criminals.incarcerated,
+        atLarge: overview.criminals.at_large
       });
 
       // Generate recent activity from the data
-      const activity = generateRecentActivity(criminalsData, casesData);
+      const activity = generateRecentActivity(overview.recent_criminals, overview.recent_crimes);
       setRecentActivity(activity);
 
       setApiStatus('connected');
@@ -124,39 +86,32 @@ const Overview = () => {
   const generateRecentActivity = (criminals, cases) => {
     const activity = [];
     
-    // Add recent criminals
-    const recentCriminals = criminals
-      .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-      .slice(0, 3);
-    
-    recentCriminals.forEach(criminal => {
+    // Recent criminals arrive newest first
+    criminals.slice(0, 3).forEach(criminal => {
       activity.push({
         id: criminal.id,
         type: 'new_criminal',
-        name: `${criminal.first_name} ${criminal.last_name}`,
-        time: formatRelativeTime(new Date(criminal.created_at)),
+        name: criminal.full_name,
+        date: new Date(criminal.created_at),
         priority: criminal.threat_level === 'HIGH' || criminal.threat_level === 'EXTREME' ? 'high' : 'medium'
       });
     });
 
-    // Add recent case updates (if cases data is available)
-    if (cases && cases.length > 0) {
-      const recentCases = cases
-        .sort((a, b) => new Date(b.updated_at || b.created_at) - new Date(a.updated_at || a.created_at))
-        .slice(0, 2);
-      
-      recentCases.forEach(caseItem => {
-        activity.push({
-          id: caseItem.id,
-          type: 'case_update',
-          name: `Case ${caseItem.case_number || `#${caseItem.id.slice(0, 8)}`}`,
-          time: formatRelativeTime(new Date(caseItem.updated_at || caseItem.created_at)),
-          priority: 'medium'
-        });
+    // Recent cases, most recently committed first
+    cases.slice(0, 2).forEach(caseItem => {
+      activity.push({
+        id: caseItem.id,
+        type: 'case_update',
+        name: `Case #${caseItem.id.slice(-8)} (${caseItem.criminal_name})`,
+        date: new Date(caseItem.date_committed),
+        priority: caseItem.status === 'OPEN' ? 'medium' : 'low'
       });
-    }
+    });
 
-    return activity.sort((a, b) => new Date(b.time) - new Date(a.time)).slice(0, 5);
+    return activity
+      .sort((a, b) => b.date - a.date)
+      .slice(0, 5)
+      .map(({ date, ...item }) => ({ ...item, time: formatRelativeTime(date) }));
   };
 
   const formatRelativeTime = (date) => {